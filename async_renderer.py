@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+async_renderer.py
+
+asyncio rendering engine on top of playwright.async_api.
+
+One Playwright driver and one Chromium browser are shared by every job;
+`concurrency` worker coroutines pull jobs from a bounded queue and each
+renders on its own short-lived BrowserContext. Memory stays flat no
+matter how many jobs are fed in, because at most `concurrency` contexts
+exist at any time and the job iterable is consumed lazily.
+
+    jobs = (RenderJob(f"file:///{BUILD_PATH}", f"out/{i}.pdf") for i in range(500))
+    results = render_batch(jobs, concurrency=8)
+
+With `assets` (a dist_assets.DistAssets) every page is served the build
+from memory and each job's `report` as its /report.json, and is checked
+to have rendered that report before it is printed (as in
+generate_pdf.verify_report()); a build that doesn't fetch /report.json
+is refused at start():
+
+    assets = DistAssets("dist")
+    jobs = (RenderJob(assets.url, f"out/{i}.pdf", report=r) for i, r in enumerate(reports))
+    results = render_batch(jobs, concurrency=8, assets=assets)
+
+With bundled=True such a build is rendered as it is instead, and each
+page is only checked to show its job's participant (as in
+generate_pdf.render_bundled()).
+"""
+
+import asyncio
+import contextvars
+import re
+import time
+from dataclasses import dataclass
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
+
+import metrics
+from browser_pool import LAUNCH_ARGS, VIEWPORT, MAX_JOBS
+from dist_assets import DistAssets, ReportMismatch
+from generate_pdf import (FOOTER_TMPL, POSTPROCESS, PRINT_CSS, READY_SCRIPT, READY_TIMEOUT, REPORT_PROBE,
+                          check_report, pdf_options, postprocess, report_name)
+
+CONCURRENCY = 8
+
+
+@dataclass
+class RenderJob:
+    source: str                  # URL to navigate to, or a raw HTML document
+    output: str                  # PDF path
+    footer: str = FOOTER_TMPL
+    report: dict | str | bytes | None = None   # served as /report.json when rendering with assets
+
+
+@dataclass
+class RenderResult:
+    job: RenderJob
+    seconds: float
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _is_html(source: str) -> bool:
+    return source.lstrip()[:1] == "<"
+
+_OPENING_TAGS = [re.compile(p, re.I) for p in (r"<head\b[^>]*>", r"<html\b[^>]*>", r"<!doctype\b[^>]*>")]
+
+def with_ready_script(html: str) -> str:
+    """
+    `html` with READY_SCRIPT inlined ahead of its own scripts. set_content()
+    isn't a navigation, so add_init_script() never runs for a raw document.
+    """
+    tag = f"<script>{READY_SCRIPT}</script>"
+    for pattern in _OPENING_TAGS:
+        match = pattern.search(html)
+        if match:
+            return html[:match.end()] + tag + html[match.end():]
+    return tag + html
+
+
+async def wait_ready(page, timeout_ms: int = READY_TIMEOUT) -> str:
+    """Async twin of generate_pdf.wait_ready()."""
+    if timeout_ms > 0:
+        try:
+            handle = await page.wait_for_function("() => window.__reportReady", timeout=timeout_ms)
+            return await handle.json_value()
+        except PlaywrightTimeoutError:
+            metrics.count("ready_fallbacks")
+    await page.wait_for_load_state("networkidle")
+    return "networkidle"
+
+
+class AsyncRenderer:
+    def __init__(self, concurrency: int = CONCURRENCY, max_jobs: int = MAX_JOBS,
+                 launch_args: list[str] | None = None, viewport: dict | None = None,
+                 headless: bool = True, verbose: bool = False, assets: DistAssets | None = None,
+                 bundled: bool = False):
+        self.concurrency = concurrency
+        self.max_jobs    = max_jobs
+        self.launch_args = list(LAUNCH_ARGS if launch_args is None else launch_args)
+        self.viewport    = dict(VIEWPORT if viewport is None else viewport)
+        self.headless    = headless
+        self.verbose     = verbose
+        self.assets      = assets
+        self.bundled     = bundled     # assets has its report compiled in: check the participant only
+        self._pw         = None
+        self._browser    = None
+        self._browser_jobs = 0
+        self._active     = 0
+        self._idle       = None
+
+    # —— LIFECYCLE —————————————————————————————————————————————————————
+
+    async def start(self):
+        if self.assets is not None and not self.bundled:
+            self.assets.require_report()
+        self._pw = await async_playwright().start()
+        self._browser = await self._launch()
+        self._idle = asyncio.Condition()
+
+    async def close(self):
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._pw is not None:
+            await self._pw.stop()
+            self._pw = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _launch(self):
+        with metrics.span("browser.launch"):
+            return await self._pw.chromium.launch(headless=self.headless, args=self.launch_args)
+
+    async def _acquire_browser(self):
+        # Relaunch after max_jobs: wait for in-flight pages on the old browser to finish first
+        async with self._idle:
+            if self.max_jobs and self._browser_jobs >= self.max_jobs:
+                await self._idle.wait_for(lambda: self._active == 0)
+                if self._browser_jobs >= self.max_jobs:
+                    await self._browser.close()
+                    self._browser = await self._launch()
+                    self._browser_jobs = 0
+            self._browser_jobs += 1
+            self._active += 1
+            return self._browser
+
+    async def _release_browser(self):
+        async with self._idle:
+            self._active -= 1
+            self._idle.notify_all()
+
+    # —— RENDERING —————————————————————————————————————————————————————
+
+    async def render(self, job: RenderJob) -> RenderResult:
+        with metrics.job(kind="render", output=job.output) as record:
+            result = await self._render(job)
+            record.set(error=result.error)
+            return result
+
+    async def _render(self, job: RenderJob) -> RenderResult:
+        start = time.perf_counter()
+        browser = await self._acquire_browser()
+        context = None
+        try:
+            with metrics.span("browser.new_page"):
+                context = await browser.new_context(viewport=self.viewport)
+                page = await context.new_page()
+            if self.assets is not None:
+                await self.assets.attach_async(page, None if self.bundled else job.report)
+            if self.verbose:
+                page.on("console", lambda msg: print(f"[browser console] {msg.type}: {msg.text}"))
+            with metrics.span("render.emulate"):
+                await page.emulate_media(media="print")
+            await page.add_init_script(READY_SCRIPT)
+            with metrics.span("render.goto"):
+                if _is_html(job.source):
+                    await page.set_content(with_ready_script(job.source), wait_until="domcontentloaded")
+                else:
+                    await page.goto(job.source, wait_until="domcontentloaded")
+            with metrics.span("render.ready"):
+                metrics.current_job().set(ready=await wait_ready(page))
+                if self.assets is not None and job.report is not None:
+                    name = report_name(job.report)
+                    if self.bundled and name is None:
+                        raise ReportMismatch("the build renders the report bundled into it, and the report "
+                                             "has no participant name to check that against")
+                    check_report(await page.evaluate(REPORT_PROBE, name), name, -1 if self.bundled else 0)
+            with metrics.span("render.style"):
+                await page.add_style_tag(content=PRINT_CSS)
+            with metrics.span("render.pdf"):
+                await page.pdf(path=job.output, **pdf_options(job.footer))
+            if POSTPROCESS:
+                with metrics.span("render.postprocess"):
+                    # CPU bound (pikepdf): keep it off the event loop
+                    await asyncio.to_thread(contextvars.copy_context().run, postprocess, job.output)
+            return RenderResult(job, time.perf_counter() - start)
+        except Exception as e:
+            return RenderResult(job, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+        finally:
+            if context is not None:
+                await context.close()
+            await self._release_browser()
+
+    async def render_all(self, jobs) -> list[RenderResult]:
+        """Render every job in `jobs` (any iterable) with at most `concurrency` pages open."""
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results = []
+
+        async def worker():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                res = await self.render(job)
+                results.append(res)
+                if self.verbose or not res.ok:
+                    mark = "✅" if res.ok else f"❌ {res.error}"
+                    print(f"{mark} {res.job.output} ({res.seconds:.2f}s)")
+
+        async def produce():
+            for job in jobs:
+                await queue.put(job)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        # a worker that dies (or is cancelled) cancels the producer and the other
+        # workers with it, rather than leaving the producer blocked on a full queue
+        async with asyncio.TaskGroup() as group:
+            for _ in range(self.concurrency):
+                group.create_task(worker())
+            group.create_task(produce())
+        return results
+
+
+async def _render_batch(jobs, concurrency: int, **kwargs) -> list[RenderResult]:
+    async with AsyncRenderer(concurrency=concurrency, **kwargs) as renderer:
+        return await renderer.render_all(jobs)
+
+
+def render_batch(jobs, concurrency: int = CONCURRENCY, **kwargs) -> list[RenderResult]:
+    """Blocking entry point: render `jobs` from a single event loop."""
+    return asyncio.run(_render_batch(jobs, concurrency, **kwargs))
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+batch.py
+
+Sharded batch pipeline over many participant reports.
+
+    python batch.py <dir | manifest.txt> [-o batch_output] [-j WORKERS]
+
+Inputs are split into shards and spread over a process pool. Every worker
+process keeps its own warm Chromium (a one-slot BrowserPool) and, per
+report, runs extraction (BeautifulSoup, CPU bound) followed by rendering,
+so both stages use every core. For each input `<name>.html` the output
+directory receives `<name>.json` and `<name>.pdf` (with --raster also
+`<name>-page-NNN.<png|webp>` previews and their `.thumb` versions, taken
+from the same page as the PDF). Inputs that share a file name (from
+different directories) are written as `<name>-<hash of the input path>`
+instead, so no report overwrites another; `summary.json` records
+throughput, failures and per-stage timings. The renderer is served dist/
+and the extracted JSON from memory (dist_assets.py), so rendering reads
+nothing back from disk. A build that doesn't fetch /report.json would
+render the same report for every input; the batch refuses to start with
+one (DistAssets.require_report()). With --hot-swap each shard is rendered on a single
+loaded page (hot_swap.py): only its first report navigates and boots the
+app, the rest are pushed into the running page.
+
+Every worker measures each report's memory delta, both its own RSS and its
+browser's (memwatch.py), into <output>/memory.jsonl; summary.json gets the
+leak report. Each worker process is replaced after REPORT_WORKER_MAX_JOBS
+reports (whole shards: the shard size is capped at that limit, and the
+pool's max_tasks_per_child is the number of shards that fit; 0 means no
+limit). A worker whose RSS stays above REPORT_WORKER_MAX_RSS_MB (even
+after a gc/malloc_trim) asks to be recycled. No new shards are handed out, the
+ones in flight finish, and the remaining shards continue on fresh worker
+processes.
+
+A worker that dies (OOM kill, crash) breaks the whole process pool. The
+reports of every shard that was in flight are queued again on a new pool,
+each as its own shard that runs alone, so the report that killed its
+worker can't take the others down with it a second time. A report whose
+worker dies MAX_ATTEMPTS times (the last time with nothing else running)
+is recorded as failed.
+
+A manifest is a text file with one HTML path per line (relative paths are
+resolved against the manifest's directory, blank lines and `#` comments
+are ignored).
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+OUTPUT_DIR   = "batch_output"
+BUILD_DIR    = os.path.abspath("dist")
+SHARD_SIZE   = 16
+WORKERS      = os.cpu_count() or 1
+MEMORY_LOG   = "memory.jsonl"     # per-report memory deltas, in the output directory
+MAX_ATTEMPTS = 2                  # tries per report whose worker process dies
+
+# —— INPUTS ——————————————————————————————————————————————————————————————
+def collect_inputs(source: str) -> list[str]:
+    """HTML files in a directory (sorted), or the paths listed in a manifest file."""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source)
+            if name.lower().endswith((".html", ".htm"))
+        )
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+def output_names(paths: list[str]) -> list[str]:
+    """
+    Output file name (without extension) per input: its own stem, or for
+    stems shared by several inputs, the stem plus a hash of the input path.
+    """
+    stems = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+    shared = Counter(stem.lower() for stem in stems)     # case-insensitive file systems too
+    names, taken = [], set()
+    for path, stem in zip(paths, stems):
+        name = stem
+        if shared[stem.lower()] > 1:
+            name = f"{stem}-{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]}"
+        base, n = name, 1
+        while name.lower() in taken:        # the same path listed twice
+            n += 1
+            name = f"{base}-{n}"
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+def shard(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# —— WORKER PROCESS ———————————————————————————————————————————————————————
+_pool = None
+_pool_error = None
+_cache = None
+_assets = None
+_memory = None
+
+def _init_worker(render: bool = True, memory_log: str | None = None):
+    """Launch this worker's browser once; a failure is reported per report instead of killing the pool."""
+    global _pool, _pool_error, _memory
+    import atexit
+    from memwatch import MemoryTracker
+    if render:
+        from browser_pool import BrowserPool
+        try:
+            _pool = BrowserPool(size=1)
+            atexit.register(_pool.close)
+        except Exception as e:
+            _pool_error = f"{type(e).__name__}: {e}"
+    _memory = MemoryTracker(_pool, memory_log, max_jobs=0)     # the job limit is max_tasks_per_child
+
+def _get_cache(cache_dir: str | None):
+    global _cache
+    if cache_dir and (_cache is None or _cache.directory != cache_dir):
+        from extract_cache import ExtractionCache
+        _cache = ExtractionCache(cache_dir)
+    return _cache if cache_dir else None
+
+def _get_assets(build_dir: str):
+    global _assets
+    if _assets is None or _assets.directory != os.path.abspath(build_dir):
+        from dist_assets import DistAssets
+        _assets = DistAssets(build_dir)
+    return _assets
+
+def _process_one(item: tuple[str, str], out_dir: str, build_dir: str, render: bool, parser: str | None,
+                 cache_dir: str | None, session=None, raster: dict | None = None) -> dict:
+    # one metrics job per report; extract.main and the render join it
+    path, name = item
+    with metrics.job(kind="batch", input=path) as record, _memory.job(input=path):
+        rec = _process(path, name, out_dir, build_dir, render, parser, cache_dir, session, raster)
+        record.set(pdf=rec["pdf"], cache_hit=rec["cache_hit"], error=rec["error"])
+        return rec
+
+def _process(path: str, name: str, out_dir: str, build_dir: str, render: bool, parser: str | None,
+             cache_dir: str | None, session=None, raster: dict | None = None) -> dict:
+    from extract import main as extract
+    from generate_pdf import FOOTER_TMPL, render_dist
+
+    json_path = os.path.join(out_dir, name + ".json")
+    pdf_path  = os.path.join(out_dir, name + ".pdf")
+    rec = {"input": path, "json": json_path, "pdf": None, "extract_s": None, "render_s": None,
+           "cache_hit": None, "error": None}
+
+    cache = _get_cache(cache_dir)
+    hits_before = cache.hits if cache else 0
+    start = time.perf_counter()
+    try:
+        text = extract(path, json_path, parser, cache)
+        rec["cache_hit"] = cache.hits > hits_before if cache else None
+    except Exception as e:
+        rec["error"] = f"extract: {type(e).__name__}: {e}"
+        metrics.count("stage_failures", stage="extract")
+        return rec
+    finally:
+        rec["extract_s"] = time.perf_counter() - start
+
+    if not render:
+        return rec
+    start = time.perf_counter()
+    try:
+        if session is not None:
+            session.render(text, pdf_path, raster=raster)
+        elif _pool is None:
+            raise RuntimeError(_pool_error or "browser pool not started")
+        else:
+            _pool.run(render_dist, text, pdf_path, FOOTER_TMPL, False, None, _get_assets(build_dir), raster=raster)
+        rec["pdf"] = pdf_path
+    except Exception as e:
+        rec["error"] = f"render: {type(e).__name__}: {e}"
+        metrics.count("stage_failures", stage="render")
+    finally:
+        rec["render_s"] = time.perf_counter() - start
+    return rec
+
+def _process_swapped(page, items: list[tuple[str, str]], out_dir: str, build_dir: str, parser: str | None,
+                     cache_dir: str | None, raster: dict | None = None) -> list[dict]:
+    # runs as one pool job: the whole shard shares this page
+    from hot_swap import HotSwapSession
+    session = HotSwapSession(page, _get_assets(build_dir))
+    return [_process_one(item, out_dir, build_dir, True, parser, cache_dir, session, raster) for item in items]
+
+def process_shard(items: list[tuple[str, str]], out_dir: str, build_dir: str, render: bool = True,
+                  parser: str | None = None, cache_dir: str | None = None, hot_swap: bool = False,
+                  raster: dict | None = None) -> tuple[list[dict], str | None]:
+    """
+    Process one shard of (input path, output name) pairs; returns its
+    records and why this worker should be recycled (or None).
+    """
+    if render and hot_swap and _pool is not None:
+        records = _pool.run(_process_swapped, items, out_dir, build_dir, parser, cache_dir, raster)
+    else:
+        records = [_process_one(item, out_dir, build_dir, render, parser, cache_dir, raster=raster)
+                   for item in items]
+    return records, _memory.over_limit()
+
+# —— SUMMARY ————————————————————————————————————————————————————————————
+def _stage_stats(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total_s": round(sum(values), 4),
+        "mean_s": round(statistics.fmean(values), 4),
+        "p50_s": round(values[len(values) // 2], 4),
+        "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max_s": round(values[-1], 4),
+    }
+
+def summarize(records: list[dict], wall_s: float, workers: int) -> dict:
+    failures = [{"input": r["input"], "error": r["error"]} for r in records if r["error"]]
+    return {
+        "reports": len(records),
+        "succeeded": len(records) - len(failures),
+        "failed": len(failures),
+        "cache_hits": sum(1 for r in records if r.get("cache_hit")),
+        "cache_misses": sum(1 for r in records if r.get("cache_hit") is False),
+        "workers": workers,
+        "wall_s": round(wall_s, 3),
+        "reports_per_s": round(len(records) / wall_s, 3) if wall_s else None,
+        "stages": {
+            "extract": _stage_stats([r["extract_s"] for r in records if r["extract_s"] is not None]),
+            "render":  _stage_stats([r["render_s"] for r in records if r["render_s"] is not None]),
+        },
+        "failures": failures,
+    }
+
+# —— MAIN ——————————————————————————————————————————————————————————————
+def _worker_died(items: list[tuple[str, str]], pending: deque, attempts: Counter, error: Exception) -> list[dict]:
+    """
+    Requeue the reports of a shard whose worker process died, one report
+    per shard at the front of the queue (run_batch runs them one at a
+    time); returns failure records for those out of attempts.
+    """
+    failed = []
+    for item in items:
+        path, name = item
+        attempts[name] += 1
+        if attempts[name] < MAX_ATTEMPTS:
+            pending.appendleft([item])
+            continue
+        metrics.count("stage_failures", stage="worker")
+        failed.append({"input": path, "json": None, "pdf": None, "extract_s": None, "render_s": None,
+                       "cache_hit": None,
+                       "error": f"worker: process died {attempts[name]} times ({type(error).__name__}: {error})"})
+    return failed
+
+def run_batch(inputs: list[str], out_dir: str = OUTPUT_DIR, workers: int = WORKERS,
+              shard_size: int = SHARD_SIZE, render: bool = True, build_dir: str = BUILD_DIR,
+              parser: str | None = None, cache_dir: str | None = None, hot_swap: bool = False,
+              raster: dict | None = None, max_jobs: int | None = None) -> dict:
+    from memwatch import MAX_JOBS, leak_report
+    if render:
+        from dist_assets import DistAssets
+        DistAssets(build_dir, print_images=False).require_report()   # before any worker starts
+    os.makedirs(out_dir, exist_ok=True)
+    memory_log = os.path.abspath(os.path.join(out_dir, MEMORY_LOG))
+    open(memory_log, "w").close()
+
+    pool_options = {"max_workers": workers, "initializer": _init_worker, "initargs": (render, memory_log),
+                    "mp_context": multiprocessing.get_context("spawn")}   # max_tasks_per_child can't fork
+    # a worker is replaced after max_jobs reports, counted in whole shards; 0 means no limit
+    max_jobs = MAX_JOBS if max_jobs is None else max_jobs
+    if max_jobs:
+        shard_size = max(1, min(shard_size, max_jobs))
+        pool_options["max_tasks_per_child"] = max(1, max_jobs // shard_size)
+    records, recycles, crashes = [], [], []
+    pending = deque(shard(list(zip(inputs, output_names(inputs))), shard_size))
+    attempts = Counter()        # output name -> worker deaths while it was in flight
+
+    start = time.perf_counter()
+    while pending:
+        # one generation of worker processes; it ends early when a worker asks
+        # to be recycled or dies
+        recycle, broken, alone = None, None, False
+        with ProcessPoolExecutor(**pool_options) as ex:
+            running = {}
+            while running or (pending and recycle is None and broken is None):
+                while (pending and recycle is None and broken is None and not alone
+                       and len(running) < workers * 2):
+                    retry = attempts[pending[0][0][1]] > 0
+                    if retry and running:
+                        break           # a retry after a worker death runs once the pool is idle
+                    items = pending.popleft()
+                    try:
+                        running[ex.submit(process_shard, items, out_dir, build_dir, render,
+                                          parser, cache_dir, hot_swap, raster)] = items
+                    except BrokenProcessPool as e:
+                        pending.appendleft(items)
+                        broken = e
+                        break
+                    alone = retry
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                alone = False
+                for fut in done:
+                    items = running.pop(fut)
+                    try:
+                        shard_records, reason = fut.result()
+                    except BrokenProcessPool as e:
+                        broken = e
+                        records.extend(_worker_died(items, pending, attempts, e))
+                        continue
+                    records.extend(shard_records)
+                    recycle = recycle or reason
+                    print(f"⏳ {len(records)}/{len(inputs)} reports done")
+        if broken is not None:
+            crashes.append({"after_reports": len(records), "error": f"{type(broken).__name__}: {broken}"})
+            metrics.count("worker_crashes")
+            print(f"💥 a worker process died after {len(records)} reports; retrying its shards on a new pool")
+        elif recycle and pending:
+            recycles.append({"after_reports": len(records), "reason": recycle})
+            metrics.count("worker_recycles", reason=recycle)
+            print(f"♻️  recycling workers ({recycle} limit) after {len(records)} reports")
+    summary = summarize(records, time.perf_counter() - start, workers)
+    summary["worker_recycles"] = recycles
+    summary["worker_crashes"] = crashes
+    summary["memory"] = leak_report(memory_log)
+
+    with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Extract and render a directory or manifest of participant reports")
+    ap.add_argument("source", help="directory of .html files, or a manifest with one path per line")
+    ap.add_argument("-o", "--output", default=OUTPUT_DIR, help="output directory")
+    ap.add_argument("-j", "--workers", type=int, default=WORKERS, help="worker processes")
+    ap.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="reports per task sent to a worker")
+    ap.add_argument("--no-pdf", action="store_true", help="only extract JSON, skip rendering")
+    ap.add_argument("--hot-swap", action="store_true", help="render each shard on one loaded page (hot_swap.py)")
+    ap.add_argument("--raster", choices=("png", "webp"), help="also write per-page previews and thumbnails")
+    ap.add_argument("--raster-dpi", type=int, help="preview resolution (default: $PDF_RASTER_DPI)")
+    ap.add_argument("--parser", choices=("html.parser", "lxml"), help="extraction tree builder (default: extract.PARSER)")
+    ap.add_argument("--cache", default=os.environ.get("REPORT_CACHE_DIR"),
+                    help="extraction cache directory shared by all workers (default: $REPORT_CACHE_DIR)")
+    args = ap.parse_args()
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        sys.exit(f"no .html inputs found in {args.source}")
+
+    raster = None
+    if args.raster:
+        raster = {"fmt": args.raster, **({"dpi": args.raster_dpi} if args.raster_dpi else {})}
+    from dist_assets import ReportMismatch
+    try:
+        summary = run_batch(inputs, args.output, args.workers, args.shard_size, render=not args.no_pdf,
+                            parser=args.parser, cache_dir=args.cache, hot_swap=args.hot_swap, raster=raster)
+    except ReportMismatch as e:
+        sys.exit(f"❌ {e}")
+    print(f"🎉 {summary['succeeded']}/{summary['reports']} reports in {summary['wall_s']:.2f}s "
+          f"({summary['reports_per_s']} reports/s), {summary['failed']} failed")
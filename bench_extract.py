@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+bench_extract.py
+
+Micro-benchmarks for the extraction pipeline, one stage at a time.
+
+    python bench_extract.py [report.html ...] [--scale 1 10 50] [-n 20]
+                            [-o bench_extract.json] [--baseline baseline.json]
+
+Stages are the parse (parse_html), the DocumentIndex build, and every
+extract_* function run on its own over a freshly built index. Each input
+is also benchmarked in scaled-up variants in which every data row (<tr>
+with <td> cells) is repeated `scale` times, so the tables the extractors
+walk grow while the template stays valid. --synthetic adds generated
+reports of the given sizes (synth_report.py), e.g. 100KB 1MB 10MB 50MB.
+
+For every input × stage the median/p95/min wall time over `-n` repeats
+and the peak Python allocation (tracemalloc, measured in a separate run
+so it doesn't distort the timings) are printed and written to `-o`. With
+--baseline, a previous results file is compared and the exit status is 1
+if any stage's median got slower than TOLERANCE (and by more than the
+NOISE_MS floor), so it can run as a CI gate:
+
+    python bench_extract.py -o bench/baseline.json          # on main
+    python bench_extract.py --baseline bench/baseline.json  # on a branch
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+
+import bs4
+
+from extract import PARSER, PARSERS, SECTIONS, DocumentIndex, extract_supplements, parse_html
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+REPORT_HTML = "Report_Participant_1-00_JANEADOE_2024-11-02.html"
+OUTPUT      = "bench_extract.json"
+SCALES      = (1, 10)
+REPEAT      = int(os.environ.get("BENCH_REPEAT", "20"))
+TOLERANCE   = float(os.environ.get("BENCH_TOLERANCE", "0.25"))   # +25% median = regression
+NOISE_MS    = float(os.environ.get("BENCH_NOISE_MS", "0.5"))     # ignore smaller absolute changes
+
+# extractor name -> fn(index); the report.json sections plus the standalone ones
+EXTRACTORS = {fn.__name__: fn for fn in SECTIONS.values()}
+EXTRACTORS[extract_supplements.__name__] = extract_supplements
+
+# —— INPUTS ——————————————————————————————————————————————————————————————
+_ROW = re.compile(rb"<tr\b[^>]*>(?:(?!<tr\b|</tr>).)*?</tr>", re.S | re.I)
+
+def scale_report(raw: bytes, factor: int) -> bytes:
+    """Repeat every innermost data row `factor` times (header rows are kept single)."""
+    if factor <= 1:
+        return raw
+    def repeat(m):
+        row = m.group(0)
+        return row * factor if b"<td" in row.lower() else row
+    return _ROW.sub(repeat, raw)
+
+def load_inputs(paths: list[str], scales, synthetic=()) -> list[tuple[str, bytes]]:
+    inputs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for factor in scales:
+            inputs.append((stem if factor == 1 else f"{stem}@x{factor}", scale_report(raw, factor)))
+    if synthetic:
+        from synth_report import generate, parse_size
+        for size in synthetic:
+            inputs.append((f"synth@{size}", generate(seed=0, size=parse_size(size))))
+    return inputs
+
+# —— MEASUREMENT —————————————————————————————————————————————————————————
+def _percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+def _summary(times: list[float], peak: int) -> dict:
+    times = sorted(times)
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "p95_ms": round(_percentile(times, 0.95) * 1000, 3),
+        "min_ms": round(times[0] * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def _peak(fn, *args) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _time(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def bench_document(raw: bytes, parser: str, repeat: int) -> dict:
+    """Timings and peak memory of each stage for one document."""
+    times = {"parse": [], "index": [], **{name: [] for name in EXTRACTORS}}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        soup = parse_html(raw, parser)
+        times["parse"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        idx = DocumentIndex(soup)
+        times["index"].append(time.perf_counter() - start)
+
+        for name, fn in EXTRACTORS.items():
+            # fresh index per extractor, so none benefits from another's memoised lookups
+            times[name].append(_time(fn, DocumentIndex(soup)))
+
+    soup = parse_html(raw, parser)
+    peaks = {
+        "parse": _peak(parse_html, raw, parser),
+        "index": _peak(DocumentIndex, soup),
+        **{name: _peak(fn, DocumentIndex(soup)) for name, fn in EXTRACTORS.items()},
+    }
+    return {stage: _summary(times[stage], peaks[stage]) for stage in times}
+
+def run(inputs: list[tuple[str, bytes]], parser: str = PARSER, repeat: int = REPEAT) -> dict:
+    results = {}
+    for label, raw in inputs:
+        print(f"⏱️  {label} ({len(raw) / 1024:.0f} KB)", file=sys.stderr)
+        results[label] = {"bytes": len(raw), "stages": bench_document(raw, parser, repeat)}
+    return {
+        "meta": {
+            "parser": parser,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "bs4": bs4.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+# —— BASELINE ————————————————————————————————————————————————————————————
+def compare(current: dict, baseline: dict, tolerance: float = TOLERANCE, noise_ms: float = NOISE_MS) -> list[dict]:
+    """Stages whose median regressed against `baseline` (inputs/stages missing from it are skipped)."""
+    regressions = []
+    for label, res in current["results"].items():
+        base = baseline.get("results", {}).get(label)
+        if not base:
+            continue
+        for stage, s in res["stages"].items():
+            b = base["stages"].get(stage)
+            if not b:
+                continue
+            delta = s["median_ms"] - b["median_ms"]
+            if delta > noise_ms and s["median_ms"] > b["median_ms"] * (1 + tolerance):
+                regressions.append({
+                    "input": label, "stage": stage,
+                    "baseline_ms": b["median_ms"], "median_ms": s["median_ms"],
+                    "ratio": round(s["median_ms"] / b["median_ms"], 2) if b["median_ms"] else None,
+                })
+    return regressions
+
+def print_results(current: dict, baseline: dict | None = None):
+    for label, res in current["results"].items():
+        base = (baseline or {}).get("results", {}).get(label, {}).get("stages", {})
+        print(f"\n{label}  ({res['bytes'] / 1024:.0f} KB)")
+        print(f"  {'stage':<30}{'median ms':>11}{'p95 ms':>10}{'peak KB':>11}{'vs base':>10}")
+        for stage, s in res["stages"].items():
+            b = base.get(stage)
+            vs = f"{s['median_ms'] / b['median_ms']:.2f}x" if b and b["median_ms"] else ""
+            print(f"  {stage:<30}{s['median_ms']:>11.2f}{s['p95_ms']:>10.2f}{s['peak_kb']:>11.0f}{vs:>10}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark parse, index and each extractor")
+    ap.add_argument("inputs", nargs="*", default=[REPORT_HTML], help="participant report .html files")
+    ap.add_argument("--scale", type=int, nargs="+", default=list(SCALES), help="row-repeat factors per input")
+    ap.add_argument("--synthetic", nargs="+", default=[], metavar="SIZE",
+                    help="also benchmark generated reports of these sizes, e.g. 100KB 1MB 10MB")
+    ap.add_argument("-n", "--repeat", type=int, default=REPEAT, help="timed runs per stage")
+    ap.add_argument("--parser", choices=PARSERS, default=PARSER)
+    ap.add_argument("-o", "--output", default=OUTPUT, help="results JSON")
+    ap.add_argument("--baseline", help="earlier results JSON to compare against (exit 1 on regression)")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed median slowdown, e.g. 0.25 = +25%%")
+    args = ap.parse_args()
+
+    current = run(load_inputs(args.inputs, args.scale, args.synthetic), args.parser, args.repeat)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        current["regressions"] = compare(current, baseline, args.tolerance)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print_results(current, baseline)
+
+    if baseline is None:
+        print(f"\n✅ results written to {args.output}")
+    elif current["regressions"]:
+        print(f"\n❌ {len(current['regressions'])} stage(s) slower than baseline (+{args.tolerance:.0%}):")
+        for r in current["regressions"]:
+            print(f"     {r['input']} / {r['stage']}: {r['baseline_ms']:.2f} -> {r['median_ms']:.2f} ms ({r['ratio']}x)")
+        sys.exit(1)
+    else:
+        print(f"\n✅ no regressions against {args.baseline}")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+bench_render.py
+
+Benchmark of the PDF rendering pipeline at increasing concurrency.
+
+    python bench_render.py [--build dist/index.html] [--report report.json]
+                           [--concurrency 1 2 4 8] [--jobs 16] [-o bench_render.json] [--csv curve.csv]
+
+For every concurrency level c a fresh BrowserPool(size=c) is started
+(launch is timed per browser), then `--jobs` renders of the build with
+`report.json` served from memory (generate_pdf.render_dist) are pushed
+through it, c at a time. Each job is split into phases:
+
+    setup     submit -> job running on a page (queueing + new context/page)
+    emulate   page.emulate_media(print)
+    goto      page.goto(..., wait_until="domcontentloaded")
+    ready     until the page signals readiness (generate_pdf.wait_ready)
+    style     page.add_style_tag(PRINT_CSS)
+    pdf       page.pdf(...)
+    total     submit -> PDF written
+
+Per phase the harness records a latency histogram (HIST_BUCKETS) plus
+p50/p95/max. A sampler thread polls the RSS of the pool's browser process
+trees (procinfo) every RSS_INTERVAL seconds. The throughput-vs-concurrency
+curve (PDFs/minute, p95 total latency and peak RSS per level) is printed,
+written with the full results to `-o`, and optionally written as CSV.
+
+--synthetic SIZE renders a generated report of that size (synth_report.py,
+extracted with extract.py) instead of --report.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from browser_pool import BrowserPool
+from dist_assets import DistAssets
+from generate_pdf import FOOTER_TMPL, render_dist
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+BUILD_PATH   = "dist/index.html"
+REPORT_JSON  = "report.json"
+OUTPUT       = "bench_render.json"
+CONCURRENCY  = (1, 2, 4, 8)
+JOBS         = 16
+RSS_INTERVAL = 0.25
+HIST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)   # seconds, upper bounds
+PHASES       = ("setup", "emulate", "goto", "ready", "style", "pdf", "total")
+
+# —— STATS ———————————————————————————————————————————————————————————————
+def latency_stats(values: list[float]) -> dict:
+    """p50/p95/max plus per-bucket counts over HIST_BUCKETS (the last bucket is +Inf)."""
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    counts = [0] * (len(HIST_BUCKETS) + 1)
+    for v in values:
+        counts[next((i for i, b in enumerate(HIST_BUCKETS) if v <= b), len(HIST_BUCKETS))] += 1
+    return {
+        "count": len(values),
+        "mean_s": round(statistics.fmean(values), 4),
+        "p50_s": round(values[len(values) // 2], 4),
+        "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+        "max_s": round(values[-1], 4),
+        "histogram": {
+            **{f"le_{b}": n for b, n in zip(HIST_BUCKETS, counts)},
+            "le_inf": counts[-1],
+        },
+    }
+
+class RssSampler(threading.Thread):
+    """Polls pool.rss() in the background; peak/mean in MB once stopped."""
+
+    def __init__(self, pool: BrowserPool, interval: float = RSS_INTERVAL):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.pool = pool
+        self.interval = interval
+        self.samples = []
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.is_set():
+            self.samples.append(self.pool.rss())
+            self._halt.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._halt.set()
+        self.join()
+        mb = [s / (1024 * 1024) for s in self.samples if s]
+        return {
+            "samples": len(mb),
+            "peak_mb": round(max(mb), 1) if mb else None,
+            "mean_mb": round(statistics.fmean(mb), 1) if mb else None,
+        }
+
+# —— ONE CONCURRENCY LEVEL ———————————————————————————————————————————————
+def _job(page, submitted: float, assets: DistAssets, report: bytes, output: str) -> dict:
+    timings = {"setup": time.perf_counter() - submitted}
+    render_dist(page, report, output, FOOTER_TMPL, False, timings, assets)
+    timings["total"] = time.perf_counter() - submitted
+    return timings
+
+def bench_level(concurrency: int, jobs: int, assets: DistAssets, report: bytes, out_dir: str) -> dict:
+    print(f"⏱️  concurrency {concurrency}: launching {concurrency} browser(s)", file=sys.stderr)
+    start = time.perf_counter()
+    # no recycling while measuring: every level runs on browsers it launched itself
+    pool = BrowserPool(size=concurrency, max_jobs=0, max_rss_mb=0)
+    warm_s = time.perf_counter() - start
+
+    sampler = RssSampler(pool)
+    sampler.start()
+    phases = {p: [] for p in PHASES}
+    errors = []
+    try:
+        start = time.perf_counter()
+        pending = []
+        for i in range(jobs):
+            output = os.path.join(out_dir, f"c{concurrency}-{i}.pdf")
+            submitted = time.perf_counter()
+            pending.append(pool.submit(_job, submitted, assets, report, output))
+        for fut in pending:
+            try:
+                timings = fut.result()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            for phase, seconds in timings.items():
+                phases[phase].append(seconds)
+        wall_s = time.perf_counter() - start
+    finally:
+        rss = sampler.stop()
+        pool.close()
+
+    done = jobs - len(errors)
+    return {
+        "concurrency": concurrency,
+        "jobs": jobs,
+        "succeeded": done,
+        "errors": errors[:10],
+        "wall_s": round(wall_s, 3),
+        "pdfs_per_min": round(done / wall_s * 60, 2) if wall_s else None,
+        "warm_pool_s": round(warm_s, 3),
+        "launch": latency_stats(pool.launch_seconds),
+        "phases": {p: latency_stats(v) for p, v in phases.items()},
+        "rss": rss,
+    }
+
+def run(levels, jobs: int = JOBS, build_path: str = BUILD_PATH, report_json: str = REPORT_JSON) -> dict:
+    assets = DistAssets(os.path.dirname(os.path.abspath(build_path)))
+    with open(report_json, "rb") as f:
+        report = f.read()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-render-") as out_dir:
+        for c in levels:
+            results.append(bench_level(c, jobs, assets, report, out_dir))
+    return {
+        "build": build_path,
+        "report": report_json,
+        "cpus": os.cpu_count(),
+        "levels": results,
+        "curve": [
+            {
+                "concurrency": r["concurrency"],
+                "pdfs_per_min": r["pdfs_per_min"],
+                "p95_total_s": r["phases"]["total"].get("p95_s"),
+                "peak_rss_mb": r["rss"]["peak_mb"],
+            }
+            for r in results
+        ],
+    }
+
+def print_curve(result: dict):
+    print(f"\n{'conc':>5}{'PDFs/min':>10}{'p95 s':>8}{'goto p50':>10}{'ready p50':>11}{'pdf p50':>9}{'launch':>8}{'RSS MB':>8}")
+    for r in result["levels"]:
+        ph = r["phases"]
+        print(f"{r['concurrency']:>5}{r['pdfs_per_min'] or 0:>10.1f}{ph['total'].get('p95_s', 0):>8.2f}"
+              f"{ph['goto'].get('p50_s', 0):>10.2f}{ph['ready'].get('p50_s', 0):>11.2f}{ph['pdf'].get('p50_s', 0):>9.2f}"
+              f"{r['launch'].get('p50_s', 0):>8.2f}{r['rss']['peak_mb'] or 0:>8.0f}")
+        for err in r["errors"][:3]:
+            print(f"      ❌ {err}")
+
+def write_csv(result: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("concurrency,pdfs_per_min,p95_total_s,peak_rss_mb\n")
+        for row in result["curve"]:
+            f.write(",".join("" if row[k] is None else str(row[k])
+                             for k in ("concurrency", "pdfs_per_min", "p95_total_s", "peak_rss_mb")) + "\n")
+
+def _synthetic_report(size: str, directory: str) -> str:
+    from extract import main as extract
+    from synth_report import generate, parse_size
+    html = os.path.join(directory, f"synth-{size}.html")
+    with open(html, "wb") as f:
+        f.write(generate(seed=0, size=parse_size(size)))
+    report_json = os.path.join(directory, f"synth-{size}.json")
+    extract(html, report_json)
+    return report_json
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Render throughput and per-phase latency vs. concurrency")
+    ap.add_argument("--build", default=BUILD_PATH, help="built viewer (index.html)")
+    ap.add_argument("--report", default=REPORT_JSON, help="report.json to render")
+    ap.add_argument("--synthetic", metavar="SIZE", help="render a generated report of this size instead, e.g. 5MB")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY), help="pool sizes to test")
+    ap.add_argument("--jobs", type=int, default=JOBS, help="PDFs rendered per concurrency level")
+    ap.add_argument("-o", "--output", default=OUTPUT, help="results JSON")
+    ap.add_argument("--csv", help="also write the throughput curve as CSV")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-render-input-") as tmp:
+        report_json = _synthetic_report(args.synthetic, tmp) if args.synthetic else args.report
+        try:
+            result = run(args.concurrency, args.jobs, args.build, report_json)
+        except Exception as e:
+            sys.exit(f"❌ render benchmark failed: {type(e).__name__}: {e}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    if args.csv:
+        write_csv(result, args.csv)
+    print_curve(result)
+    print(f"\n✅ results written to {args.output}")
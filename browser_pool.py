@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+browser_pool.py
+
+Long-lived pool of headless Chromium browsers.
+
+Launching Chromium is the most expensive part of a single PDF job, so
+instead of `sync_playwright()` + `chromium.launch()` per PDF we keep
+`size` browsers alive and hand every job a fresh, isolated
+BrowserContext/Page on one of them.
+
+Playwright's sync API is bound to the thread that started it, so each
+pool slot is a dedicated thread that owns its own Playwright driver and
+browser. Callers (any thread) just submit a callable and wait on the
+returned Future:
+
+    pool = BrowserPool(size=2)
+    pool.run(render_page, "file:///.../index.html", "out.pdf", footer)
+    pool.close()
+
+A slot relaunches its browser after `max_jobs` jobs, once the browser
+process tree grows past `max_rss_mb` (see procinfo.py), and when the
+browser has crashed or disconnected (checked before each job, and when
+opening the job's context fails with the target closed). The browser's pid
+is looked up once per launch; measuring the tree after that reads only
+the statm of its processes.
+"""
+
+import contextvars
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+
+from playwright.sync_api import Error as PlaywrightError, sync_playwright
+
+import metrics
+import procinfo
+
+# —— DEFAULTS ——————————————————————————————————————————————————————————
+LAUNCH_ARGS = [
+    "--disable-web-security",
+    "--disable-features=IsolateOrigins,site-per-process",
+    "--allow-running-insecure-content",
+    "--allow-file-access-from-files"   # allows file:// requests
+]
+VIEWPORT    = {"width": 1200, "height": 1600}
+MAX_JOBS    = 200      # relaunch a browser after this many jobs
+MAX_RSS_MB  = 1500     # ...or once its process tree is bigger than this
+LAUNCH_KEEP = 256      # launch durations kept for benchmarks (all of them go to metrics)
+
+
+class BrowserPool:
+    def __init__(self, size: int = 2, max_jobs: int = MAX_JOBS, max_rss_mb: int = MAX_RSS_MB,
+                 launch_args: list[str] | None = None, viewport: dict | None = None,
+                 headless: bool = True):
+        self.size        = size
+        self.max_jobs    = max_jobs
+        self.max_rss_mb  = max_rss_mb
+        self.launch_args = list(LAUNCH_ARGS if launch_args is None else launch_args)
+        self.viewport    = dict(VIEWPORT if viewport is None else viewport)
+        self.headless    = headless
+
+        self.launches    = 0   # total browser launches, for logging/metrics
+        self.launch_seconds = deque(maxlen=LAUNCH_KEEP)   # durations of the latest launches
+        self.jobs_done   = 0
+        self.id          = uuid.uuid4().hex[:12]
+        self._jobs       = queue.Queue()
+        self._lock       = threading.Lock()
+        self._closed     = False
+        self._errors     = []
+        self._roots      = {}  # slot marker -> pids of its browser process (found at launch)
+        self._ready      = threading.Barrier(size + 1)
+        self._threads    = [
+            threading.Thread(target=self._slot_loop, args=(i,), name=f"browser-slot-{i}", daemon=True)
+            for i in range(size)
+        ]
+        for t in self._threads:
+            t.start()
+        # wait for every slot to have a warm browser (or to have failed trying)
+        self._ready.wait()
+        if len(self._errors) == size:
+            # no slot could start a browser: fail loudly instead of hanging every job
+            self.close()
+            raise self._errors[0]
+
+    # —— PUBLIC API ————————————————————————————————————————————————————
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue `fn(page, *args, **kwargs)` to run on a fresh page."""
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        fut = Future()
+        # run in the submitter's context, so metrics spans land in the caller's job
+        self._jobs.put((fut, contextvars.copy_context(), fn, args, kwargs))
+        return fut
+
+    def run(self, fn, *args, **kwargs):
+        """Like submit(), but block until the job finishes and return its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def rss(self) -> int:
+        """Resident memory of all of this pool's browser process trees, in bytes."""
+        return sum(self._tree_rss(marker) for marker in list(self._roots))
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for _ in self._threads:
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # —— SLOT WORKER ———————————————————————————————————————————————————
+
+    def _launch(self, pw, marker: str):
+        start = time.perf_counter()
+        browser = pw.chromium.launch(headless=self.headless, args=self.launch_args + [marker])
+        seconds = time.perf_counter() - start
+        self._roots[marker] = procinfo.marked_roots(marker)
+        with self._lock:
+            self.launches += 1
+            self.launch_seconds.append(seconds)
+        metrics.observe("browser.launch", seconds)
+        return browser
+
+    @staticmethod
+    def _close_quietly(browser) -> None:
+        """Close `browser` if there is one; a crashed browser may fail to close. Returns None."""
+        if browser is not None:
+            try:
+                browser.close()
+            except PlaywrightError:
+                pass
+        return None
+
+    def _tree_rss(self, marker: str) -> int:
+        roots = self._roots.get(marker) or []
+        if not roots or not all(procinfo.has_marker(pid, marker) for pid in roots):
+            # browser died or its pid was reused: look it up again (unless the slot has closed)
+            roots = procinfo.marked_roots(marker)
+            if marker in self._roots:
+                self._roots[marker] = roots
+        return sum(procinfo.process_rss(pid) for root in roots for pid in procinfo.tree_pids(root))
+
+    def _needs_recycle(self, jobs: int, marker: str) -> bool:
+        if self.max_jobs and jobs >= self.max_jobs:
+            return True
+        if self.max_rss_mb:
+            return self._tree_rss(marker) > self.max_rss_mb * 1024 * 1024
+        return False
+
+    def _slot_loop(self, slot: int):
+        # unique switch on the browser command line so procinfo can find its process tree
+        marker = f"--report-pool-slot={self.id}-{slot}-{uuid.uuid4().hex[:8]}"
+        pw = None
+        try:
+            pw = sync_playwright().start()
+            browser = self._launch(pw, marker)
+        except BaseException as e:
+            if pw is not None:
+                pw.stop()
+            self._errors.append(e)
+            self._ready.wait()
+            return
+        self._ready.wait()
+
+        jobs = 0
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            fut, ctx, fn, args, kwargs = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+
+            context = None
+            try:
+                if browser is not None and not browser.is_connected():
+                    print(f"💥 Browser slot {slot} disconnected, relaunching")
+                    browser = self._close_quietly(browser)
+                elif browser is not None and self._needs_recycle(jobs, marker):
+                    print(f"♻️ Recycling browser slot {slot} after {jobs} jobs")
+                    browser = self._close_quietly(browser)
+                if browser is None:
+                    browser = self._launch(pw, marker)
+                    jobs = 0
+                with metrics.span("browser.new_page"):
+                    try:
+                        context = browser.new_context(viewport=self.viewport)
+                    except PlaywrightError as e:
+                        if browser.is_connected() and "closed" not in str(e):
+                            raise
+                        # died between the check above and now ("Target closed"): relaunch once
+                        print(f"💥 Browser slot {slot} closed ({e}), relaunching")
+                        browser = self._close_quietly(browser)
+                        browser = self._launch(pw, marker)
+                        jobs = 0
+                        context = browser.new_context(viewport=self.viewport)
+                    page = context.new_page()
+                fut.set_result(ctx.run(fn, page, *args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+            finally:
+                if context is not None:
+                    try:
+                        context.close()
+                    except PlaywrightError:
+                        pass        # the browser went away during the job; replaced before the next one
+                jobs += 1
+                with self._lock:
+                    self.jobs_done += 1
+
+        if browser is not None:
+            browser.close()
+        self._roots.pop(marker, None)
+        pw.stop()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+chunked_render.py
+
+Render one long report as several parts in parallel and merge them.
+
+    stats = render_chunked(report, "out.pdf", chunks=4)       # report: dict, JSON text or bytes
+    python chunked_render.py report.json out.pdf [--chunks 4]
+
+A single page.pdf() lays out and rasterizes the whole document in one
+renderer process. Here the report's top-level sections are split into
+`chunks` contiguous groups of about equal weight (group_sections(); the
+JSON size of a section stands in for its layout cost), each group is
+rendered as its own part on a separate pool page, and the parts are
+merged in order (pdf_merge.merge), which stamps the "n / N" footer
+numbers across the whole document.
+
+Each pool slot is its own browser, so parts render on separate cores;
+chunks beyond the pool size wait for a free slot, so set PDF_POOL_SIZE to
+at least PDF_CHUNKS (default: the pool size). A section is the smallest
+part, so a report of 7 sections parallelizes at most 7 ways, and the
+largest section bounds the speed-up. As in incremental_render.py, the
+viewer has to render only the sections in the report.json it is served
+and start each on a new page. That isn't checked. A build that ignores
+/report.json is refused up front (DistAssets.require_report(): the
+committed dist/ is one), and every part must have fetched its report.json
+before it is printed (generate_pdf.verify_report()).
+
+Needs pikepdf for the merge (pip install pikepdf).
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import wait
+
+import metrics
+from dist_assets import DistAssets, ReportMismatch, report_body
+from generate_pdf import POOL_SIZE, get_assets, get_pool, postprocess
+from incremental_render import render_part
+from pdf_merge import merge
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+CHUNKS = int(os.environ.get("PDF_CHUNKS", str(POOL_SIZE)))
+
+
+def group_sections(report: dict, chunks: int) -> list[list[str]]:
+    """Split the sections, in order, into at most `chunks` groups, minimizing the heaviest group."""
+    names = list(report)
+    if not names:
+        return []
+    chunks = max(1, min(chunks, len(names)))
+    offsets = [0]
+    for name in names:
+        offsets.append(offsets[-1] + len(json.dumps(report[name], ensure_ascii=False)))
+
+    best = {}   # (first section, groups left) -> (heaviest group, cut positions)
+
+    def split(i: int, k: int):
+        if k == 1:
+            return offsets[-1] - offsets[i], (len(names),)
+        if (i, k) not in best:
+            options = []
+            for j in range(i + 1, len(names) - k + 2):
+                rest, cuts = split(j, k - 1)
+                options.append((max(offsets[j] - offsets[i], rest), (j, *cuts)))
+            best[i, k] = min(options)
+        return best[i, k]
+
+    _, cuts = split(0, chunks)
+    return [names[a:b] for a, b in zip((0, *cuts), cuts)]
+
+def render_chunked(report, output: str, chunks: int = CHUNKS, assets: DistAssets | None = None,
+                   verbose: bool = True) -> dict:
+    """
+    Render `report` into `output` as `chunks` parts in parallel.
+    Returns {"groups", "pages", "seconds"}.
+    """
+    started = time.perf_counter()
+    report = json.loads(report_body(report))
+    groups = group_sections(report, chunks)
+    if not groups:
+        raise ValueError("report has no sections")
+    assets = assets or get_assets()
+    assets.require_report()
+    pool = get_pool()
+
+    with metrics.job(kind="render", output=output, mode="chunked") as record, \
+            tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output)), prefix=".parts-") as tmp:
+        parts = [os.path.join(tmp, f"part-{i:02d}.pdf") for i in range(len(groups))]
+        futures = [pool.submit(render_part, {name: report[name] for name in group}, path, assets)
+                   for group, path in zip(groups, parts)]
+        with metrics.span("render.chunks"):
+            wait(futures)       # all of them, so none is still writing into tmp on failure
+        errors = [f"{'+'.join(group)}: {type(f.exception()).__name__}: {f.exception()}"
+                  for group, f in zip(groups, futures) if f.exception() is not None]
+        if errors:
+            raise RuntimeError("chunk render failed: " + "; ".join(errors))
+
+        counts = merge(parts, output)
+        postprocess(output, verbose)
+        record.set(chunks=len(groups), pages=sum(counts))
+
+    stats = {"groups": groups, "pages": sum(counts), "seconds": time.perf_counter() - started}
+    if verbose:
+        print(f"✅ {output}: {stats['pages']} pages in {len(groups)} chunk(s) "
+              f"({' | '.join('+'.join(g) for g in groups)}) in {stats['seconds']:.2f}s")
+    return stats
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Render one report as parallel chunks merged into one PDF")
+    ap.add_argument("input", help="report.json (or participant .html, extracted first)")
+    ap.add_argument("output", help="output PDF")
+    ap.add_argument("--chunks", type=int, default=CHUNKS, help="parts to render in parallel (default: $PDF_CHUNKS)")
+    args = ap.parse_args()
+
+    if args.input.lower().endswith((".html", ".htm")):
+        from extract import extract_text
+        text = extract_text(args.input)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            text = f.read()
+    try:
+        render_chunked(text, args.output, args.chunks)
+    except (ValueError, ReportMismatch) as e:
+        sys.exit(f"❌ {e}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+compare_parsers.py
+
+Run extraction with two parser backends over a corpus and diff the
+resulting report.json byte for byte.
+
+    python compare_parsers.py reports/ [more.html ...] --baseline html.parser --candidate lxml
+
+Exit status is 0 only if every document produced identical JSON (or the
+same failure) with both backends, so this can gate switching production
+to the faster parser.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from batch import collect_inputs
+from extract import PARSERS, extract_report
+
+MAX_DIFFS = 10   # differing JSON paths printed per document
+
+
+def _run(raw: bytes, parser: str):
+    start = time.perf_counter()
+    try:
+        report = extract_report(raw, parser)
+        out = json.dumps(report, indent=2)
+        err = None
+    except Exception as e:
+        report, out, err = None, None, f"{type(e).__name__}: {e}"
+    return report, out, err, time.perf_counter() - start
+
+def json_diff(a, b, path: str = "$"):
+    """Yield the JSON paths at which `a` and `b` differ."""
+    if type(a) is not type(b):
+        yield path
+    elif isinstance(a, dict):
+        for k in list(a) + [k for k in b if k not in a]:
+            if k not in a or k not in b:
+                yield f"{path}.{k}"
+            else:
+                yield from json_diff(a[k], b[k], f"{path}.{k}")
+        if list(a) != list(b) and set(a) == set(b):
+            yield f"{path} (key order)"
+    elif isinstance(a, list):
+        for i, (x, y) in enumerate(zip(a, b)):
+            yield from json_diff(x, y, f"{path}[{i}]")
+        if len(a) != len(b):
+            yield f"{path} (length {len(a)} != {len(b)})"
+    elif a != b:
+        yield path
+
+def compare(paths: list[str], baseline: str, candidate: str) -> dict:
+    mismatches = []
+    times = {baseline: 0.0, candidate: 0.0}
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        rep_a, out_a, err_a, t_a = _run(raw, baseline)
+        rep_b, out_b, err_b, t_b = _run(raw, candidate)
+        times[baseline] += t_a
+        times[candidate] += t_b
+
+        if out_a == out_b and err_a == err_b:
+            continue
+        if err_a or err_b:
+            diffs = [f"{baseline}: {err_a or 'ok'} / {candidate}: {err_b or 'ok'}"]
+        else:
+            diffs = list(json_diff(rep_a, rep_b)) or ["(serialisation differs)"]
+        mismatches.append({"input": path, "diffs": diffs})
+        print(f"❌ {path}")
+        for d in diffs[:MAX_DIFFS]:
+            print(f"     {d}")
+
+    return {
+        "documents": len(paths),
+        "identical": len(paths) - len(mismatches),
+        "mismatches": mismatches,
+        "seconds": {k: round(v, 3) for k, v in times.items()},
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Diff report.json produced by two parser backends")
+    ap.add_argument("inputs", nargs="+", help=".html files, directories or manifests")
+    ap.add_argument("--baseline", choices=PARSERS, default="html.parser")
+    ap.add_argument("--candidate", choices=PARSERS, default="lxml")
+    ap.add_argument("--report", help="write the comparison result as JSON to this path")
+    args = ap.parse_args()
+
+    paths = []
+    for src in args.inputs:
+        paths.extend([src] if src.lower().endswith((".html", ".htm")) else collect_inputs(src))
+
+    result = compare(paths, args.baseline, args.candidate)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    secs = result["seconds"]
+    print(f"{'✅' if not result['mismatches'] else '❌'} {result['identical']}/{result['documents']} identical "
+          f"({args.baseline}: {secs[args.baseline]:.2f}s, {args.candidate}: {secs[args.candidate]:.2f}s)")
+    sys.exit(1 if result["mismatches"] else 0)
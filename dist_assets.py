@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+dist_assets.py
+
+Serve the built viewer (dist/) to Playwright pages straight from memory.
+
+Every file under dist/ is read once into a dict. Pages navigate to a
+made-up origin (ORIGIN, never resolved), and a route on that origin
+fulfils each request from the dict; `/report.json` is answered with the
+job's own, in-memory extraction result:
+
+    assets = DistAssets("dist")
+    assets.attach(page, report)          # report: dict, JSON str or bytes
+    page.goto(assets.url)
+
+No HTTP server, no port, no file:// (so no --allow-file-access-from-files
+and no web-security switches are needed) and no disk reads per render,
+however many pages render in parallel. The app's root-absolute URLs
+("/report.json", "/Stress Relief.png") resolve against ORIGIN as they
+would on the dev server. Large raster images are replaced by their
+print-optimized variants (image_assets.py) unless PDF_PRINT_IMAGES=0.
+
+Serving /report.json only helps if the build actually fetches it. A build
+with a report compiled into its bundle (like the dist/ in this repository,
+which always shows the JANEADOE sample) renders that same report for every
+job. `reads_report` is false for such a build (no script that index.html
+loads mentions /report.json), and require_report() raises ReportMismatch.
+Renderers call it before rendering and also check each page after it has
+loaded (generate_pdf.verify_report()).
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass
+from urllib.parse import unquote, urlsplit
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+DIST_DIR     = "dist"
+ORIGIN       = "http://report.local"
+INDEX        = "/index.html"
+REPORT_PATH  = "/report.json"
+PRINT_IMAGES = os.environ.get("PDF_PRINT_IMAGES", "1") != "0"
+
+_SCRIPT_SRC = re.compile(rb'<script\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.I)
+_JS_IMPORT  = re.compile(rb'["\']((?:\.{1,2}/|/)[^"\'\s]+\.js)["\']')
+
+mimetypes.add_type("text/javascript", ".js")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+
+@dataclass(frozen=True)
+class Asset:
+    body: bytes
+    content_type: str
+    etag: str
+
+    @classmethod
+    def from_bytes(cls, body: bytes, content_type: str) -> "Asset":
+        return cls(body, content_type, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+def content_type(path: str) -> str:
+    ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    return ctype + "; charset=utf-8" if ctype.startswith("text/") or ctype.endswith("json") else ctype
+
+def report_body(report) -> bytes:
+    """report.json bytes from an extraction result (dict), JSON text or bytes."""
+    if isinstance(report, bytes):
+        return report
+    if isinstance(report, str):
+        return report.encode("utf-8")
+    return json.dumps(report, indent=2).encode("utf-8")
+
+
+class ReportMismatch(RuntimeError):
+    """A build or page that doesn't render the report.json it is served."""
+
+
+def _script_paths(files: dict, path: str = INDEX) -> set[str]:
+    """URL paths of the scripts `path` loads, and of every module they import, transitively."""
+    found, todo = set(), [(path, _SCRIPT_SRC)]
+    while todo:
+        base, pattern = todo.pop()
+        for m in pattern.finditer(files[base].body):
+            ref = unquote(urlsplit(m.group(1).decode("utf-8", "replace")).path)
+            if not ref:
+                continue
+            ref = posixpath.normpath(ref if ref.startswith("/") else posixpath.join(posixpath.dirname(base), ref))
+            if ref in files and ref not in found:
+                found.add(ref)
+                todo.append((ref, _JS_IMPORT))
+    return found
+
+
+class DistAssets:
+    def __init__(self, directory: str = DIST_DIR, print_images: bool = PRINT_IMAGES):
+        self.directory = os.path.abspath(directory)
+        self.print_images = print_images
+        self.files = {}     # URL path ("/assets/index-....js") -> Asset
+        self.reads_report = False
+        self.load()
+
+    def load(self):
+        """(Re)read every file under the build directory."""
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                url_path = "/" + os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    files[url_path] = Asset.from_bytes(f.read(), content_type(path))
+        if INDEX not in files:
+            raise FileNotFoundError(f"{self.directory} has no index.html (run the viewer build first)")
+        if self.print_images:
+            from image_assets import print_variants
+            files.update(print_variants(files))
+        self.files = files
+        # the report path appears in the bundle as a string literal wherever it is fetched
+        needle = REPORT_PATH.lstrip("/").encode()
+        self.reads_report = any(needle in files[p].body for p in _script_paths(files))
+
+    @property
+    def url(self) -> str:
+        return ORIGIN + INDEX
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(a.body) for a in self.files.values())
+
+    @property
+    def build_id(self) -> str:
+        """Hash of every served file (ETags); changes whenever the build or an image variant does."""
+        h = hashlib.sha256()
+        for path in sorted(self.files):
+            h.update(f"{path}\0{self.files[path].etag}\0".encode())
+        return h.hexdigest()
+
+    def require_report(self):
+        """Raise ReportMismatch unless this build fetches /report.json (see the module docstring)."""
+        if not self.reads_report:
+            raise ReportMismatch(
+                f"{self.directory}: no script loaded by index.html requests {REPORT_PATH}, so the build "
+                "renders the report bundled into it, not the one it is served; rebuild the viewer so it "
+                "fetches /report.json")
+
+    def get(self, url: str) -> Asset | None:
+        """Asset for a URL or URL path ('/' is index.html); None if the build has no such file."""
+        path = unquote(urlsplit(url).path) or "/"
+        if path.endswith("/"):
+            path += INDEX.lstrip("/")
+        return self.files.get(path)
+
+    # —— PLAYWRIGHT ROUTING ——
+
+    def _response(self, url: str, report: Asset | None) -> dict:
+        if report is not None and unquote(urlsplit(url).path) == REPORT_PATH:
+            asset = report
+        else:
+            asset = self.get(url)
+        if asset is None:
+            return {"status": 404, "body": b"", "content_type": "text/plain"}
+        return {"status": 200, "body": asset.body, "content_type": asset.content_type,
+                "headers": {"etag": asset.etag, "cache-control": "no-cache"}}
+
+    def _report_asset(self, report) -> Asset | None:
+        return None if report is None else Asset.from_bytes(report_body(report), content_type(REPORT_PATH))
+
+    def handler(self, report=None):
+        """Route handler for the sync API; `report` (if given) is served as /report.json."""
+        report = self._report_asset(report)
+        return lambda route: route.fulfill(**self._response(route.request.url, report))
+
+    def async_handler(self, report=None):
+        """Same as handler(), for playwright.async_api pages."""
+        report = self._report_asset(report)
+
+        async def handle(route):
+            await route.fulfill(**self._response(route.request.url, report))
+        return handle
+
+    def attach(self, page, report=None):
+        """Serve this build (and `report`) to `page` (a sync Page or BrowserContext)."""
+        page.route(f"{ORIGIN}/**", self.handler(report))
+
+    def detach(self, page):
+        page.unroute(f"{ORIGIN}/**")
+
+    async def attach_async(self, page, report=None):
+        await page.route(f"{ORIGIN}/**", self.async_handler(report))
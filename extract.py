@@ -1,22 +1,524 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import os
 import re
+import sys
 import time
+from bisect import bisect_right
 
-from bs4 import BeautifulSoup, Tag, NavigableString
+from bs4 import BeautifulSoup, FeatureNotFound, Tag, NavigableString
+
+import metrics
+from extract_cache import ExtractionCache, default_cache
+from section_split import extract_parallel, extract_section, section_fragments, splits
+
+# Bump whenever extractor output changes, so cached report.json entries are not reused
+EXTRACTOR_VERSION = "1"
 
 NBSP = "\xa0"
 BULLET_CHARS = ("•", "\u2022")
 
-def extract_header(soup):
+# —— PARSING ——————————————————————————————————————————————————————————————
+# Tree builder used by main(); "lxml" is several times faster than the
+# pure-Python "html.parser". Run `python compare_parsers.py` over a corpus
+# before switching production to a different backend.
+PARSER  = os.environ.get("REPORT_PARSER", "html.parser")
+PARSERS = ("html.parser", "lxml", "html5lib")
+
+_BOMS = (
+    (b"\xef\xbb\xbf", "utf-8"),
+    (b"\xff\xfe", "utf-16-le"),
+    (b"\xfe\xff", "utf-16-be"),
+)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9._:-]+)""", re.I)
+
+def sniff_charset(raw: bytes) -> str | None:
+    """Encoding from a BOM or the document's <meta charset>, if it declares one."""
+    for bom, enc in _BOMS:
+        if raw.startswith(bom):
+            return enc
+    m = _META_CHARSET.search(raw[:4096])
+    return m.group(1).decode("ascii").lower() if m else None
+
+def parse_html(raw: bytes, parser: str | None = None) -> BeautifulSoup:
+    """
+    Parse report bytes with the chosen backend. The declared charset is
+    passed through so every backend decodes the same way instead of
+    relying on UnicodeDammit's sniffing.
+    """
+    parser = parser or PARSER
+    if parser not in PARSERS:
+        raise ValueError(f"unknown parser {parser!r}, expected one of {', '.join(PARSERS)}")
+    try:
+        return BeautifulSoup(raw, parser, from_encoding=sniff_charset(raw))
+    except FeatureNotFound:
+        raise ValueError(f"parser {parser!r} is not installed (pip install {parser})") from None
+
+def _is_status_left(c):
+    # class filter for the Green/Yellow/Red/Gray header cells, e.g. "tdBackgroundGreenLeft"
+    return c and "tdBackground" in c and c.endswith("Left")
+
+# —— DOCUMENT INDEX ——————————————————————————————————————————————————————
+class DocumentIndex:
+    """
+    One pass over the parsed document, so extractors never rescan the tree.
+
+    Every tag gets its document-order position and the position of its last
+    descendant, which turns the usual BeautifulSoup lookups into bisects:
+
+    - find_next(name)            -> next(tag, name)
+    - tag.find(name) / find_all  -> first_within(tag, name) / within(tag, name)
+    - soup.select("#id name")    -> select(id, name)
+    - find(name, id=...)         -> by_id(id, name)
+
+    Tables are also indexed by class, and their header-row text is computed
+    once on demand instead of running get_text over whole tables.
+    """
+
+    def __init__(self, soup: BeautifulSoup):
+        self.soup      = soup
+        self.order     = []    # tags in document order
+        self._end      = []    # order index of each tag's last descendant
+        self._pos      = {}    # id(tag) -> order index
+        self._names    = {}    # tag name -> [order index, ...]
+        self._ids      = {}    # id attribute -> [tag, ...]
+        self._classes  = {}    # (tag name, class) -> [tag, ...]
+        self._headings = []    # order indexes of h1/h2 (section boundaries)
+        self._table_headers = {}
+        self._cells    = {}
+        self._header   = None
+        self.status_td = None  # first tdBackground...Left cell
+        self._walk()
+
+    def close(self):
+        """Decompose the parse tree and drop the index; neither can be used afterwards."""
+        self.soup.decompose()
+        self.order, self._end, self._headings = [], [], []
+        for table in (self._pos, self._names, self._ids, self._classes, self._table_headers, self._cells):
+            table.clear()
+        self.status_td = None
+
+    def _walk(self):
+        order, ends = self.order, self._end
+        stack = [(None, iter(self.soup.contents))]
+        while stack:
+            owner, children = stack[-1]
+            for node in children:
+                if isinstance(node, Tag):
+                    i = len(order)
+                    order.append(node)
+                    ends.append(i)
+                    self._register(node, i)
+                    stack.append((i, iter(node.contents)))
+                    break
+            else:
+                stack.pop()
+                if owner is not None:
+                    ends[owner] = len(order) - 1
+
+    def _register(self, tag: Tag, i: int):
+        name = tag.name
+        self._pos[id(tag)] = i
+        self._names.setdefault(name, []).append(i)
+        if name in ("h1", "h2"):
+            self._headings.append(i)
+        tag_id = tag.get("id")
+        if tag_id is not None:
+            self._ids.setdefault(tag_id, []).append(tag)
+        classes = tag.get("class")
+        if classes:
+            for c in classes:
+                self._classes.setdefault((name, c), []).append(tag)
+            if name == "td" and self.status_td is None and any(_is_status_left(c) for c in classes):
+                self.status_td = tag
+
+    # —— lookups ——
+
+    def pos(self, tag: Tag) -> int:
+        return self._pos[id(tag)]
+
+    def contains(self, outer: Tag, tag: Tag) -> bool:
+        """True if `tag` is a descendant of `outer`."""
+        o, t = self.pos(outer), self.pos(tag)
+        return o < t <= self._end[o]
+
+    def by_id(self, tag_id: str, name: str | None = None, within: Tag | None = None) -> Tag | None:
+        """Equivalent of (within or soup).find(name, id=tag_id)."""
+        for tag in self._ids.get(tag_id, ()):
+            if (name is None or tag.name == name) and (within is None or self.contains(within, tag)):
+                return tag
+        return None
+
+    def iter_next(self, tag: Tag, name: str):
+        """Every `name` tag after `tag` in document order (find_all_next)."""
+        positions = self._names.get(name, ())
+        for i in range(bisect_right(positions, self.pos(tag)), len(positions)):
+            yield self.order[positions[i]]
+
+    def next(self, tag: Tag, name: str) -> Tag | None:
+        """Equivalent of tag.find_next(name)."""
+        return next(self.iter_next(tag, name), None)
+
+    def within(self, tag: Tag, name: str) -> list[Tag]:
+        """Equivalent of tag.find_all(name)."""
+        positions = self._names.get(name, ())
+        start = self.pos(tag)
+        lo = bisect_right(positions, start)
+        hi = bisect_right(positions, self._end[start])
+        return [self.order[positions[i]] for i in range(lo, hi)]
+
+    def select(self, tag_id: str, name: str) -> list[Tag]:
+        """Equivalent of soup.select("#<tag_id> <name>"), which spans every element with that id."""
+        found = set()
+        for tag in self._ids.get(tag_id, ()):
+            found.update(self.pos(t) for t in self.within(tag, name))
+        return [self.order[i] for i in sorted(found)]
+
+    def first_within(self, tag: Tag, name: str) -> Tag | None:
+        """Equivalent of tag.find(name)."""
+        positions = self._names.get(name, ())
+        start = self.pos(tag)
+        lo = bisect_right(positions, start)
+        if lo < len(positions) and positions[lo] <= self._end[start]:
+            return self.order[positions[lo]]
+        return None
+
+    def cells(self, tr: Tag) -> list[Tag]:
+        """Equivalent of tr.find_all("td"), memoised per row."""
+        key = id(tr)
+        if key not in self._cells:
+            self._cells[key] = self.within(tr, "td")
+        return self._cells[key]
+
+    def with_class(self, name: str, cls: str, within: Tag | None = None) -> list[Tag]:
+        """Equivalent of (within or soup).find_all(name, class_=cls)."""
+        tags = self._classes.get((name, cls), [])
+        if within is None:
+            return list(tags)
+        return [t for t in tags if self.contains(within, t)]
+
+    def next_heading(self, tag: Tag) -> int | None:
+        """Position of the first h1/h2 after `tag`, i.e. the end of its section."""
+        i = bisect_right(self._headings, self.pos(tag))
+        return self._headings[i] if i < len(self._headings) else None
+
+    def table_header_text(self, table: Tag) -> str:
+        """Normalised, lower-cased text of a table's first row (memoised)."""
+        key = id(table)
+        if key not in self._table_headers:
+            first_row = self.first_within(table, "tr")
+            text = first_row.get_text(" ", strip=True) if first_row else ""
+            self._table_headers[key] = _norm(text).lower()
+        return self._table_headers[key]
+
+    def following_table_with_headers(self, tag: Tag, headers: list[str], stop: int | None = None) -> Tag | None:
+        """First table after `tag` (and before position `stop`) whose header row mentions every header."""
+        hdrs_lower = [h.lower() for h in headers]
+        for tbl in self.iter_next(tag, "table"):
+            if stop is not None and self.pos(tbl) >= stop:
+                break
+            head_txt = self.table_header_text(tbl)
+            if all(h in head_txt for h in hdrs_lower):
+                return tbl
+        return None
+
+    @property
+    def header(self) -> dict:
+        # shared by the preface and health report sections, built once
+        if self._header is None:
+            self._header = _extract_header(self)
+        return self._header
+
+def index_document(doc) -> DocumentIndex:
+    """Accept either a parsed soup or an existing index."""
+    return doc if isinstance(doc, DocumentIndex) else DocumentIndex(doc)
+
+# —— SHARED PATTERNS ———————————————————————————————————————————————————————
+# Compiled once here rather than inside the row loops below
+_NAME_LEVEL_RE   = re.compile(r"(.+?)\s*\((.+)\)")          # "Vitamin D (low)"
+_ACTION_USAGE_RE = re.compile(r"(.+?)\s*\((.+)\)\.?")       # "Continue taking (daily)."
+_PAREN_RE        = re.compile(r"\(([^)]+)\)")
+_READING_RE      = re.compile(r"(?<![a-zA-Z])\b(\d+(?:\.\d+)?\s*\w*)\b")
+_SEVERITY_RE     = re.compile(r"(very high|high|low|very low)", re.IGNORECASE)
+_SEVERITY_LEAD_RE = re.compile(r"^(very high|high|low|very low)\s*", re.IGNORECASE)
+_TARGET_RE       = re.compile(r"target:\s*([<≥>=]*\s*[0-9.]+\s*[^\s]+)")
+_WS_RE           = re.compile(r"\s+")
+_TRAILING_AND_RE = re.compile(r"[,\s]*(?:and)?\s*$", re.I)
+_NAME_VALUE_RE   = re.compile(r"(.+?)\s*\((.+?)\)\.?\s*$")
+_FUNCTION_RE     = re.compile(
+    r'(?i)^\s*(very\s+high|high|very\s+low|low|moderately\s+high|moderately\s+low)\s+'  # group 1: severity phrase
+    r'(.+?)\s+'                                      # group 2: measurement label
+    r'(\d+(?:\.\d+)?(?:\s*\S+)*?)\s*$'               # group 3: number + optional units
+)
+
+STATUS_TITLES = {
+    "Green": "Optimal",
+    "Yellow": "Caution",
+    "Red": "At Risk",
+    "Gray": "Unknown"
+}
+
+# —— CELL / TABLE PARSERS ———————————————————————————————————————————————————
+def _status_overview(status_tbl: Tag) -> dict:
+    ths = [th.get_text(strip=True) for th in status_tbl.find_all("th")]
+    tds = status_tbl.find_all("td")
+
+    overview = {}
+    for h, td in zip(ths, tds):
+        # base value = all text nodes except those inside <small>
+        base = "".join(
+            t for t in td.contents
+            if isinstance(t, str)
+        ).strip()
+        # collect every <small> text, strip punctuation
+        ann = [s.get_text(strip=True).strip("() ") for s in td.find_all("small")]
+
+        key = "".join(ch for ch in h if ch.isalnum())
+        overview[key] = {
+            "value": base,
+            "annotations": ann
+        }
+    return overview
+
+def _status_table(idx: DocumentIndex) -> Tag | None:
+    # the first table holding a status cell is the outermost table around the first such cell
+    gyrg = None
+    if idx.status_td is not None:
+        for parent in idx.status_td.parents:
+            if parent.name == "table":
+                gyrg = parent
+    return gyrg
+
+def _status_sections(gyrg: Tag | None) -> list:
+    sections = []
+    if not gyrg:
+        return sections
+
+    rows = gyrg.find_all("tr", recursive=False)
+    i = 0
+    while i < len(rows):
+        hdr_row = rows[i]
+        hdr_td = hdr_row.find("td", class_=_is_status_left)
+        if hdr_td:
+            raw = hdr_td.get_text(" ", strip=True)
+            # e.g. "Green: These factors..."
+            key = hdr_td.find("i").get_text(strip=True).rstrip(":")
+            title = STATUS_TITLES.get(key, key)
+            desc = raw.split(":", 1)[1].strip()
+
+            # next row holds the bullet list
+            factors = []
+            if i+1 < len(rows):
+                content_td = rows[i+1].find("td")
+                nested = content_td.find("table", class_="no_border")
+                if nested:
+                    for tr in nested.find_all("tr"):
+                        for td in tr.find_all("td"):
+                            text = td.get_text(" ", strip=True)
+                            if text.startswith("•") or text.startswith("\u2022"):
+                                factors.append(text.lstrip("• ").strip())
+
+            sections.append({
+                "title": title,
+                "count": len(factors),
+                "description": desc,
+                "factors": factors
+            })
+            i += 2
+        else:
+            i += 1
+    return sections
+
+def _parse_med_reasoning(reasoning_td: Tag) -> list:
+    # get text with explicit separators for <br>
+    text = reasoning_td.get_text(separator="\n", strip=True)
+    lines = [line.strip() for line in text.split("\n") if line.strip()]
+
+    reasoning_entries = []
+    current_action = None
+    for line in lines:
+        # lines ending with ':' are the action label
+        if line.endswith(":"):
+            current_action = line.rstrip(":")
+        # bullet lines start with '•' or '-' or digits
+        elif line.startswith("•") or line.startswith("-"):
+            bullet = line.lstrip("•- ").strip()
+            # split name and level in parentheses
+            m = _NAME_LEVEL_RE.match(bullet)
+            if m:
+                name, level = m.groups()
+            else:
+                name, level = bullet, ""
+            reasoning_entries.append({
+                "action": current_action or "",
+                "name": name.strip(),
+                "currentLevel": level.strip()
+            })
+        else:
+            m2 = _ACTION_USAGE_RE.match(line)
+            if m2:
+                action_text, usage = m2.groups()
+                reasoning_entries.append({
+                    "action": action_text.strip(),
+                    "currentUsage": usage.strip()
+                })
+            else:
+                # fallback: treat any other non-bullet line as a new action
+                reasoning_entries.append({
+                    "action": line,
+                    "currentUsage": ""
+                })
+    return reasoning_entries
+
+def _parse_supplement_reasoning(reasoning_td: Tag) -> dict:
+    # get text with explicit separators for <br>
+    text = reasoning_td.get_text(separator="\n\r", strip=True)
+    current_action, reasons = text.split(":", 1) if ":" in text else [text, ""]
+    lines = [line.strip() for line in reasons.split("\n\r") if line.strip()]
+
+    reasoning_entries = []
+    for line in lines:
+        # bullet lines start with '•' or '-' or digits
+        if line.startswith("•") or line.startswith("-"):
+            bullet = line.lstrip("•- ").strip()
+            # split name and level in parentheses
+            m = _NAME_LEVEL_RE.match(bullet)
+            if m:
+                name, level = m.groups()
+            else:
+                name, level = bullet, ""
+            reasoning_entries.append({
+                "name": name.strip(),
+                "currentLevel": level.strip()
+            })
+        else:
+            m2 = _ACTION_USAGE_RE.match(line)
+            if m2:
+                action_text, usage = m2.groups()
+                reasoning_entries.append({
+                    "action": action_text.strip(),
+                    "currentUsage": usage.strip()
+                })
+            else:
+                # fallback: treat any other non-bullet line as a new action
+                reasoning_entries.append({
+                    "action": line,
+                    "currentUsage": ""
+                })
+    return {
+        "action": current_action,
+        "entries": reasoning_entries
+    }
+
+def _nutrient_deficiencies(inner_tables: list[Tag]) -> list:
+    deficiencies = []
+    for i, row in enumerate(inner_tables):
+        deficiency = {}
+        if i % 2 == 0:
+            # Even index rows are first column
+            nutrient_text = row.find_all("td")[2].get_text(" ", strip=True)
+            deficiency["nutrient"] = nutrient_text.split(",")[0].strip().strip(":")
+            deficiency["normal_range"] = nutrient_text.split(",")[1].strip().strip(":") if len(nutrient_text.split(",")) > 1 else ""
+        else:
+            # Odd index rows are second column
+            deficiency["result"] = {}
+            result_col = row.find_all("td")[2]
+            result_text = result_col.get_text(" ", strip=True)
+            # Extract nutrient_sub (text in round brackets)
+            nutrient_sub_match = _PAREN_RE.search(result_text)
+            nutrient_sub = nutrient_sub_match.group(1) if nutrient_sub_match else ""
+            # Remove nutrient_sub from result_text
+            if nutrient_sub:
+                result_text = result_text.replace(f"({nutrient_sub})", "").strip()
+
+            # Extract reading (number + units)
+            reading_match = _READING_RE.search(result_text)
+            reading = reading_match.group(1) if reading_match else ""
+            # Remove reading from desc
+            result_text = result_text.replace(reading, "").strip()
+            # Extract severity
+            severity_match = _SEVERITY_RE.match(result_text)
+            severity = severity_match.group(1).lower() if severity_match else ""
+            # Remove severity from text
+            result_text = _SEVERITY_LEAD_RE.sub("", result_text)
+
+            deficiency["result"]["severity"] = severity
+            deficiency["result"]["desc"] = result_text.strip()
+            deficiency["result"]["reading"] = reading
+            deficiency["nutrient_sub"] = nutrient_sub
+
+        # Only append if index does not exist in deficiencies array
+        if i % 2 == 0:
+            deficiencies.append(deficiency)
+        else:
+            deficiencies[-1] = {**deficiencies[-1], **deficiency}
+    return deficiencies
+
+def _cognitive_entry(tr: Tag) -> dict:
+    function = ""
+    small_text = ""
+    immediate_text = ""
+
+    td = tr.find("td", colspan="1")
+    if td:
+        # Get text only immediately inside <td> (not from children)
+        immediate_text = "".join(t for t in td.contents if isinstance(t, str)).strip()
+        # Get text from the immediate <small> tag (if present)
+        small_tag = td.find("small", recursive=False)
+        small_text = small_tag.get_text(" ", strip=True) if small_tag else ""
+
+    table = tr.find("table")
+    if table:
+        function = table.get_text(" ", strip=True).strip()
+
+    target_level = ""
+    target_match = _TARGET_RE.search(function)
+    if target_match:
+        target_level = target_match.group(1).strip()
+        function = function.replace(target_match.group(1), "").strip()
+        function = function.replace("target:", "").strip()
+
+    # if function:
+    #     m = re.search(r"([A-Za-z\s\-]+)?([0-9.]+)\s*([^\s]+)?$", function)
+    #     print("Function:", m)
+    #     if m:
+    #         current_level = m.group(2)
+    #         if m.group(3):
+    #             current_level += " " + m.group(3).strip()
+    #     else:
+    #         current_level = function
+
+    severity, measurement, value = "", "", ""
+    m = _FUNCTION_RE.match(function)
+    if m:
+        severity, measurement, value = m.groups()
+
+    img = None
+    img_tag = tr.find("img", recursive=False)
+    if img_tag and img_tag.has_attr("src"):
+        img = img_tag["src"]
+
+    return {
+        "description": immediate_text + "\n" + small_text,
+        "severity": severity.strip() if severity else "",
+        "measurement": measurement.strip() if measurement else "",
+        "currentLevel": value.strip() if value else "",
+        # "currentLevel": current_level,
+        "targetLevel": target_level,
+        "image": img
+    }
+
+# —— EXTRACTORS ——————————————————————————————————————————————————————————
+def _extract_header(idx: DocumentIndex):
     hdr = {}
     # Participant info
-    part_tbl = soup.find(id="Participant").find("table")
+    part_tbl = idx.first_within(idx.by_id("Participant"), "table")
     rows = part_tbl.find_all("tr")
     hdr["name"]      = rows[0].find_all("td")[1].get_text(strip=True)
     hdr["createdOn"] = rows[1].find_all("td")[1].get_text(strip=True)
     # Practice info
-    prac_tbl = soup.find(id="Practice").find("table")
+    prac_tbl = idx.first_within(idx.by_id("Practice"), "table")
     prow = prac_tbl.find_all("tr")
     hdr["doctor"] = prow[0].find_all("td")[1].get_text(strip=True)
     hdr["clinic"] = prow[1].find_all("td")[1].get_text(strip=True)
@@ -24,23 +526,27 @@ def extract_header(soup):
     hdr["client"] = "uMETHOD"
     return hdr
 
+def extract_header(soup):
+    return dict(index_document(soup).header)
+
 def extract_preface(soup):
-    header = extract_header(soup)
+    idx = index_document(soup)
+    header = dict(idx.header)
 
     # Purpose of This Report
     purpose_ps = []
-    for p in soup.select("#Purpose p"):
+    for p in idx.select("Purpose", "p"):
         purpose_ps.append(p.get_text(" ", strip=True))
     statistic = next((s for p in purpose_ps for s in p.split(". ") if "%" in s), "")
 
     # About RestoreU METHOD
-    about_ps = [p.get_text(" ", strip=True) for p in soup.select("#About p")]
+    about_ps = [p.get_text(" ", strip=True) for p in idx.select("About", "p")]
 
     # Reading This Report
     # intro = [p.get_text(" ", strip=True) for p in soup.select("#Reading > p")]
     # steps = [li.get_text(" ", strip=True) for li in soup.select("#Reading ol > li")]
     # Reading This Report
-    reading_h2 = soup.find("h2", id="ShdMrpReading")
+    reading_h2 = idx.by_id("ShdMrpReading", "h2")
     # grab the two intro <p>
     intro = [p.get_text(" ", strip=True) 
              for p in reading_h2.find_next_siblings("p", limit=2)]
@@ -76,78 +582,15 @@ def extract_preface(soup):
     }
 
 def extract_health_report(soup):
-    header = extract_header(soup)
+    idx = index_document(soup)
+    header = dict(idx.header)
 
     # Overview table under “YourStatus”
-    status_tbl = soup.select_one("#YourStatus table")
-    ths = [th.get_text(strip=True) for th in status_tbl.find_all("th")]
-    tds = status_tbl.find_all("td")
-
-    overview = {}
-    for h, td in zip(ths, tds):
-        # base value = all text nodes except those inside <small>
-        base = "".join(
-            t for t in td.contents
-            if isinstance(t, str)
-        ).strip()
-        # collect every <small> text, strip punctuation
-        ann = [s.get_text(strip=True).strip("() ") for s in td.find_all("small")]
-
-        key = "".join(ch for ch in h if ch.isalnum())
-        overview[key] = {
-            "value": base,
-            "annotations": ann
-        }
+    status_tbl = next(iter(idx.select("YourStatus", "table")), None)
+    overview = _status_overview(status_tbl)
 
     # Health-Status sections extraction remains unchanged…
-    sections = []  # same as before
-
-    gyrg = None
-    for tbl in soup.find_all("table"):
-        if tbl.find("td", class_=lambda c: c and "tdBackground" in c and c.endswith("Left")):
-            gyrg = tbl
-            break
-
-    if gyrg:
-        rows = gyrg.find_all("tr", recursive=False)
-        i = 0
-        title_map = {
-            "Green": "Optimal",
-            "Yellow": "Caution",
-            "Red": "At Risk",
-            "Gray": "Unknown"
-        }
-        while i < len(rows):
-            hdr_row = rows[i]
-            hdr_td = hdr_row.find("td", class_=lambda c: c and "tdBackground" in c and c.endswith("Left"))
-            if hdr_td:
-                raw = hdr_td.get_text(" ", strip=True)
-                # e.g. "Green: These factors..."
-                key = hdr_td.find("i").get_text(strip=True).rstrip(":")
-                title = title_map.get(key, key)
-                desc = raw.split(":", 1)[1].strip()
-
-                # next row holds the bullet list
-                factors = []
-                if i+1 < len(rows):
-                    content_td = rows[i+1].find("td")
-                    nested = content_td.find("table", class_="no_border")
-                    if nested:
-                        for tr in nested.find_all("tr"):
-                            for td in tr.find_all("td"):
-                                text = td.get_text(" ", strip=True)
-                                if text.startswith("•") or text.startswith("\u2022"):
-                                    factors.append(text.lstrip("• ").strip())
-
-                sections.append({
-                    "title": title,
-                    "count": len(factors),
-                    "description": desc,
-                    "factors": factors
-                })
-                i += 2
-            else:
-                i += 1
+    sections = _status_sections(_status_table(idx))
 
     return {
         "header": header,
@@ -157,14 +600,15 @@ def extract_health_report(soup):
     }
 
 def extract_action_plan(soup):
+    idx = index_document(soup)
     ap = {}
     # Locate the main ActionPlan container
-    ap_div = soup.find("div", id="ActionPlan")
+    ap_div = idx.by_id("ActionPlan", "div")
     if not ap_div:
         return None
 
     # Title
-    title_tag = ap_div.find("h1", id="ShdMrpActionPlan")
+    title_tag = idx.by_id("ShdMrpActionPlan", "h1", within=ap_div)
     ap["title"] = title_tag.get_text(" ", strip=True) if title_tag else "Your Action Plan"
 
     # Intro paragraphs
@@ -174,7 +618,7 @@ def extract_action_plan(soup):
     ]
 
     # Bullet-list steps
-    first_ul = ap_div.find("ul")
+    first_ul = idx.first_within(ap_div, "ul")
     ap["steps"] = [
         li.get_text(" ", strip=True).rstrip(",")
         for li in first_ul.find_all("li")
@@ -182,9 +626,9 @@ def extract_action_plan(soup):
 
     # Medications table
     meds = []
-    meds_hdr = soup.find("h3", id="ShdMrpMedsPrescriptions")
+    meds_hdr = idx.by_id("ShdMrpMedsPrescriptions", "h3")
     if meds_hdr:
-        meds_table = meds_hdr.find_next("table")
+        meds_table = idx.next(meds_hdr, "table")
         # iterate each data row
         for row in meds_table.find_all("tr")[1:]:
             cols = row.find_all("td")
@@ -198,45 +642,7 @@ def extract_action_plan(soup):
             guidance      = cols[4].get_text(" ", strip=True)
 
             # --- Parse reasoning column into structured entries ---
-            reasoning_td = cols[3]
-            # get text with explicit separators for <br>
-            text = reasoning_td.get_text(separator="\n", strip=True)
-            lines = [line.strip() for line in text.split("\n") if line.strip()]
-
-            reasoning_entries = []
-            current_action = None
-            for line in lines:
-                # lines ending with ':' are the action label
-                if line.endswith(":"):
-                    current_action = line.rstrip(":")
-                # bullet lines start with '•' or '-' or digits
-                elif line.startswith("•") or line.startswith("-"):
-                    bullet = line.lstrip("•- ").strip()
-                    # split name and level in parentheses
-                    m = re.match(r"(.+?)\s*\((.+)\)", bullet)
-                    if m:
-                        name, level = m.groups()
-                    else:
-                        name, level = bullet, ""
-                    reasoning_entries.append({
-                        "action": current_action or "",
-                        "name": name.strip(),
-                        "currentLevel": level.strip()
-                    })
-                else:
-                    m2 = re.match(r"(.+?)\s*\((.+)\)\.?", line)
-                    if m2:
-                        action_text, usage = m2.groups()
-                        reasoning_entries.append({
-                            "action": action_text.strip(),
-                            "currentUsage": usage.strip()
-                        })
-                    else:
-                        # fallback: treat any other non-bullet line as a new action
-                        reasoning_entries.append({
-                            "action": line,
-                            "currentUsage": ""
-                        })
+            reasoning_entries = _parse_med_reasoning(cols[3])
 
             meds.append({
                 "medication":    medication,
@@ -248,19 +654,19 @@ def extract_action_plan(soup):
 
     ap["medications"] = meds
 
-    supplements_title_tag = soup.find("h3", id="ShdMrpMedsSupplements")
+    supplements_title_tag = idx.by_id("ShdMrpMedsSupplements", "h3")
     ap["supplements"] = {}
     ap["supplements"]["title"] = supplements_title_tag.get_text(" ", strip=True) if supplements_title_tag else "Supplements"
     
     ap["supplements"]["intro"] = []
-    supplements_intro = supplements_title_tag.find_next("div").find("p")
+    supplements_intro = idx.first_within(idx.next(supplements_title_tag, "div"), "p")
     supplements_intro = supplements_intro.get_text(" ", strip=True) if supplements_intro else ""
     supplements_intro = [line.strip() for line in supplements_intro.split(".") if line.strip()]
     ap["supplements"]["intro"] = supplements_intro
 
     ap["supplements"]["meds"] = []
     if supplements_title_tag:
-        supplements_table = supplements_title_tag.find_next("table")
+        supplements_table = idx.next(supplements_title_tag, "table")
         # iterate each data row
         for row in supplements_table.find_all("tr")[1:]:
             cols = row.find_all("td")
@@ -273,49 +679,12 @@ def extract_action_plan(soup):
             guidance      = cols[3].get_text(" ", strip=True)
 
             # --- Parse reasoning column into structured entries ---
-            reasoning_td = cols[2]
-            # get text with explicit separators for <br>
-            text = reasoning_td.get_text(separator="\n\r", strip=True)
-            current_action, reasons = text.split(":", 1) if ":" in text else [text, ""]
-            lines = [line.strip() for line in reasons.split("\n\r") if line.strip()]
-
-            reasoning_entries = []
-            for line in lines:
-                # bullet lines start with '•' or '-' or digits
-                if line.startswith("•") or line.startswith("-"):
-                    bullet = line.lstrip("•- ").strip()
-                    # split name and level in parentheses
-                    m = re.match(r"(.+?)\s*\((.+)\)", bullet)
-                    if m:
-                        name, level = m.groups()
-                    else:
-                        name, level = bullet, ""
-                    reasoning_entries.append({
-                        "name": name.strip(),
-                        "currentLevel": level.strip()
-                    })
-                else:
-                    m2 = re.match(r"(.+?)\s*\((.+)\)\.?", line)
-                    if m2:
-                        action_text, usage = m2.groups()
-                        reasoning_entries.append({
-                            "action": action_text.strip(),
-                            "currentUsage": usage.strip()
-                        })
-                    else:
-                        # fallback: treat any other non-bullet line as a new action
-                        reasoning_entries.append({
-                            "action": line,
-                            "currentUsage": ""
-                        })
+            reasoning = _parse_supplement_reasoning(cols[2])
 
             ap["supplements"]["meds"].append({
                 "medication":    medication,
                 "dosageDetails": dosageDetails,
-                "reasoning": {
-                    "action": current_action,
-                    "entries": reasoning_entries
-                },
+                "reasoning":     reasoning,
                 "guidance":      guidance
             })
     
@@ -323,15 +692,16 @@ def extract_action_plan(soup):
     return ap
 
 def extract_current_medication(soup):
+    idx = index_document(soup)
     current_medication = {}
-    medications = soup.find("div", id="Medications")
-    current_medication_title = medications.find("h3", id="ShdMrtMedsCurrent")
+    medications = idx.by_id("Medications", "div")
+    current_medication_title = idx.by_id("ShdMrtMedsCurrent", "h3", within=medications)
     current_medication["title"] = current_medication_title.get_text(" ", strip=True) if current_medication_title else "Current Medication"
     
-    current_medication_intro = current_medication_title.find_next("p")
+    current_medication_intro = idx.next(current_medication_title, "p")
     current_medication["intro"] = current_medication_intro.get_text(" ", strip=True) if current_medication_intro else ""
     
-    current_medication_table = current_medication_title.find_next("table") if current_medication_title else None
+    current_medication_table = idx.next(current_medication_title, "table") if current_medication_title else None
     meds = []
     headers = []
     if current_medication_table:
@@ -356,11 +726,12 @@ def extract_current_medication(soup):
     return current_medication
 
 def extract_lifestyle(soup):
+    idx = index_document(soup)
     lifestyle = {}
-    lifestyle_title_tag = soup.find("h2", id="ShdMrpLifestyle")
+    lifestyle_title_tag = idx.by_id("ShdMrpLifestyle", "h2")
     lifestyle["title"] = lifestyle_title_tag.get_text(" ", strip=True)
 
-    lifestyle_intro = lifestyle_title_tag.find_next("div").find("p")
+    lifestyle_intro = idx.first_within(idx.next(lifestyle_title_tag, "div"), "p")
     lifestyle_intro = lifestyle_intro.get_text(" ", strip=True) if lifestyle_intro else ""
     # lifestyle_intro = [line.strip() for line in lifestyle_intro.split(".") if line.strip()]
     lifestyle["intro"] = lifestyle_intro
@@ -368,7 +739,7 @@ def extract_lifestyle(soup):
     lifestyle["recommendations"] = []
 
     # Find the recommendations table after the lifestyle_title_tag
-    recommendations_table = lifestyle_title_tag.find_next("table")
+    recommendations_table = idx.next(lifestyle_title_tag, "table")
     if recommendations_table:
         # Skip the header row (first <tr>)
         for tr in recommendations_table.find_all("tr")[1:]:
@@ -393,27 +764,28 @@ def extract_lifestyle(soup):
     return lifestyle
 
 def extract_nutrition(soup):
+    idx = index_document(soup)
     nutrition = {}
     nutrition["recommendations"] = {}
-    nutrition_header = soup.find("h2", id="ShdMrpNewDiet")
+    nutrition_header = idx.by_id("ShdMrpNewDiet", "h2")
     nutrition["recommendations"]["header"] = nutrition_header.get_text(" ", strip=True)
     
-    nutrition_header_intro = nutrition_header.find_next("p")
+    nutrition_header_intro = idx.next(nutrition_header, "p")
     nutrition["recommendations"]["header_intro"] = nutrition_header_intro.get_text(" ", strip=True) if nutrition_header_intro else ""
     
-    mind_diet_title = soup.find("h3", id="ShdMrpMINDDiet")
+    mind_diet_title = idx.by_id("ShdMrpMINDDiet", "h3")
     nutrition["mind_diet_title"] = mind_diet_title.get_text(" ", strip=True) if mind_diet_title else "MIND Diet"
-    mind_diet_intro = mind_diet_title.find_next("div").find("p")
+    mind_diet_intro = idx.first_within(idx.next(mind_diet_title, "div"), "p")
     nutrition["recommendations"]["mind_diet_intro"] = mind_diet_intro.get_text(" ", strip=True) if mind_diet_intro else ""
     
-    recommended_instructions = mind_diet_intro.find_next("p")
+    recommended_instructions = idx.next(mind_diet_intro, "p")
     nutrition["recommendations"]["recommended_instructions"] = recommended_instructions.get_text(" ", strip=True) if recommended_instructions else ""
     
     recommended_diet = {
         "headers": [],
         "entries": []
     }
-    recommended_diet_table = mind_diet_title.find_next("table")
+    recommended_diet_table = idx.next(mind_diet_title, "table")
     if recommended_diet_table:
         headers = [th.get_text(" ", strip=True) for th in recommended_diet_table.find_all("th")]
         recommended_diet["headers"] = headers
@@ -430,10 +802,10 @@ def extract_nutrition(soup):
     nutrition["recommendations"]["recommended_diet"] = recommended_diet
     
     # Discouraged Foods Section
-    discouraged_instructions = recommended_diet_table.find_next("p")
+    discouraged_instructions = idx.next(recommended_diet_table, "p")
     nutrition["recommendations"]["discouraged_instructions"] = discouraged_instructions.get_text(" ", strip=True) if discouraged_instructions else "Discouraged Foods"
 
-    discouraged_table = discouraged_instructions.find_next("table") if discouraged_instructions else None
+    discouraged_table = idx.next(discouraged_instructions, "table") if discouraged_instructions else None
     discouraged_diet = {
         "headers": [],
         "entries": []
@@ -452,70 +824,26 @@ def extract_nutrition(soup):
     nutrition["recommendations"]["discouraged_diet"] = discouraged_diet
     
     nutrition["summary"] = {}
-    summary_title = discouraged_table.find_next("h2")
+    summary_title = idx.next(discouraged_table, "h2")
     nutrition["summary"]["title"] = summary_title.get_text(" ", strip=True) if summary_title else "Summary"
     
-    outer_table = summary_title.find_next("table")
-    warning = outer_table.find("td").contents[0]
+    outer_table = idx.next(summary_title, "table")
+    warning = idx.first_within(outer_table, "td").contents[0]
     
     nutrition["summary"]["warning"] = warning.get_text(" ", strip=True) if warning else ""
     
-    nutrition["summary"]["deficiencies"] = []
-    inner_tables = outer_table.find_all("table")
-    for idx, row in enumerate(inner_tables):
-        # print("Table", row)
-        
-        deficiency = {}
-        if idx % 2 == 0:
-            # Even index rows are first column
-            nutrient_text = row.find_all("td")[2].get_text(" ", strip=True)
-            deficiency["nutrient"] = nutrient_text.split(",")[0].strip().strip(":")
-            deficiency["normal_range"] = nutrient_text.split(",")[1].strip().strip(":") if len(nutrient_text.split(",")) > 1 else ""
-        else:
-            # Odd index rows are second column
-            deficiency["result"] = {}
-            result_col = row.find_all("td")[2]
-            result_text = result_col.get_text(" ", strip=True)
-            # Extract nutrient_sub (text in round brackets)
-            nutrient_sub_match = re.search(r"\(([^)]+)\)", result_text)
-            nutrient_sub = nutrient_sub_match.group(1) if nutrient_sub_match else ""
-            # Remove nutrient_sub from result_text
-            if nutrient_sub:
-                result_text = result_text.replace(f"({nutrient_sub})", "").strip()
-                
-            # Extract reading (number + units)
-            reading_match = re.search(r"(?<![a-zA-Z])\b(\d+(?:\.\d+)?\s*\w*)\b", result_text)
-            reading = reading_match.group(1) if reading_match else ""
-            # Remove reading from desc
-            result_text = result_text.replace(reading, "").strip()
-            # Extract severity
-            severity_match = re.match(r"(very high|high|low|very low)", result_text, re.IGNORECASE)
-            severity = severity_match.group(1).lower() if severity_match else ""
-            # Remove severity from text
-            result_text = re.sub(r"^(very high|high|low|very low)\s*", "", result_text, flags=re.IGNORECASE)
-
-
-            deficiency["result"]["severity"] = severity
-            deficiency["result"]["desc"] = result_text.strip()
-            deficiency["result"]["reading"] = reading
-            deficiency["nutrient_sub"] = nutrient_sub
-
-        # Only append if index does not exist in deficiencies array
-        if idx % 2 == 0:
-            nutrition["summary"]["deficiencies"].append(deficiency)
-        else:
-            nutrition["summary"]["deficiencies"][len(nutrition["summary"]["deficiencies"]) - 1] = {**nutrition["summary"]["deficiencies"][len(nutrition["summary"]["deficiencies"]) - 1], **deficiency}
+    nutrition["summary"]["deficiencies"] = _nutrient_deficiencies(idx.within(outer_table, "table"))
 
     consumption = {}
-    advice = outer_table.find_next("p")
+    advice = idx.next(outer_table, "p")
     consumption["advice"] = advice.get_text(" ", strip=True) if advice else ""
-    consumption_table_outer = advice.find_next("table")
-    consumption_title = consumption_table_outer.find("td").contents[0]
+    consumption_table_outer = idx.next(advice, "table")
+    consumption_title = idx.first_within(consumption_table_outer, "td").contents[0]
     consumption["title"] = consumption_title.get_text(" ", strip=True) if consumption_title else "Dietary Consumption Summary"
 
     consumption["entries"] = []
-    consumption_table_inner = consumption_table_outer.find("table")
-    for idx, row in enumerate(consumption_table_inner.find_all("tr")[0:]):
+    consumption_table_inner = idx.first_within(consumption_table_outer, "table")
+    for row in idx.within(consumption_table_inner, "tr"):
         entry = {}
         # print("Row", row)
         # Extract nutrient name
@@ -534,21 +862,22 @@ def extract_nutrition(soup):
     return nutrition
 
 def extract_cognitive_function(soup):
+    idx = index_document(soup)
     # Extract the "Factors Related to Cognitive Decline" section
-    cognitive_section = soup.find("div", id="OutOfRange")
+    cognitive_section = idx.by_id("OutOfRange", "div")
     if not cognitive_section:
         return {}
 
     # Title
-    title_tag = cognitive_section.find("h1", id="ShdMrpFactors")
+    title_tag = idx.by_id("ShdMrpFactors", "h1", within=cognitive_section)
     title = title_tag.get_text(" ", strip=True) if title_tag else "Factors Related to Cognitive Decline"
 
     # Intro paragraph
-    intro_p = title_tag.find_next("p") if title_tag else None
+    intro_p = idx.next(title_tag, "p") if title_tag else None
     intro = intro_p.get_text(" ", strip=True) if intro_p else ""
 
     # Extract all tabSummary tables
-    tables = cognitive_section.find_all("table", class_="tabSummary")
+    tables = idx.with_class("table", "tabSummary", within=cognitive_section)
     factors = []
     for tbl in tables:
         # Section title
@@ -563,66 +892,7 @@ def extract_cognitive_function(soup):
 
         # Each <td> is a factor entry
         for tr in tbl.find_all("tr", recursive=False)[1:]:
-            function = ""
-            small_text = ""
-            immediate_text = ""
-            
-            td = tr.find("td", colspan="1")
-            if td:
-                # Get text only immediately inside <td> (not from children)
-                immediate_text = "".join(t for t in td.contents if isinstance(t, str)).strip()
-                # Get text from the immediate <small> tag (if present)
-                small_tag = td.find("small", recursive=False)
-                small_text = small_tag.get_text(" ", strip=True) if small_tag else ""
-
-            table = tr.find("table")
-            if table:
-                function = table.get_text(" ", strip=True).strip()
-
-            target_level = ""
-            target_match = re.search(r"target:\s*([<≥>=]*\s*[0-9.]+\s*[^\s]+)", function)
-            if target_match:
-                target_level = target_match.group(1).strip()
-                function = function.replace(target_match.group(1), "").strip()
-                function = function.replace("target:", "").strip()
-
-            current_level = ""
-            
-            # if function:
-            #     m = re.search(r"([A-Za-z\s\-]+)?([0-9.]+)\s*([^\s]+)?$", function)
-            #     print("Function:", m)
-            #     if m:
-            #         current_level = m.group(2)
-            #         if m.group(3):
-            #             current_level += " " + m.group(3).strip()
-            #     else:
-            #         current_level = function
-            
-            pattern = re.compile(
-                r'(?i)^\s*(very\s+high|high|very\s+low|low|moderately\s+high|moderately\s+low)\s+'  # group 1: severity phrase
-                r'(.+?)\s+'                                      # group 2: measurement label
-                r'(\d+(?:\.\d+)?(?:\s*\S+)*?)\s*$'               # group 3: number + optional units
-            )
-            severity, measurement, value = "", "", ""
-            m = pattern.match(function)
-            if m:
-                # print("Function:", m)
-                severity, measurement, value = m.groups()
-
-            img = None
-            img_tag = tr.find("img", recursive=False)
-            if img_tag and img_tag.has_attr("src"):
-                img = img_tag["src"]
-
-            factor["entries"].append({
-                "description": immediate_text + "\n" + small_text,
-                "severity": severity.strip() if severity else "",
-                "measurement": measurement.strip() if measurement else "",
-                "currentLevel": value.strip() if value else "",
-                # "currentLevel": current_level,
-                "targetLevel": target_level,
-                "image": img
-            })
+            factor["entries"].append(_cognitive_entry(tr))
 
         factors.append(factor)
 
@@ -636,11 +906,11 @@ def _norm(s: str) -> str:
     if not s:
         return ""
     s = s.replace(NBSP, " ")
-    s = re.sub(r"\s+", " ", s).strip()
+    s = _WS_RE.sub(" ", s).strip()
     return s
 
 def _strip_trailing_and(s: str) -> str:
-    return re.sub(r"[,\s]*(?:and)?\s*$", "", s, flags=re.I)
+    return _TRAILING_AND_RE.sub("", s)
 
 def parse_reasoning_cell(cell: Tag):
     # Turn Reasoning cell into structured records
@@ -657,7 +927,7 @@ def parse_reasoning_cell(cell: Tag):
         if ln.startswith(BULLET_CHARS) or ln.startswith("-") or ln.startswith("&bull;"):
             item = ln.lstrip("•\u2022-&bull; ").strip()
             item = _strip_trailing_and(item)
-            m = re.match(r"(.+?)\s*\((.+?)\)\.?\s*$", item)
+            m = _NAME_VALUE_RE.match(item)
             if m:
                 name, val = m.groups()
                 out.append({"action": current_action or "", "name": _norm(name), "currentValue": _norm(val)})
@@ -667,46 +937,39 @@ def parse_reasoning_cell(cell: Tag):
             out.append({"note": _norm(ln)})
     return out
 
+SUPPLEMENT_HEADERS = ["New Supplement", "Dosage Details", "Reasoning", "Guidance"]
+
 def extract_supplements(soup: BeautifulSoup):
-    root = soup.find("div", id="InterventionMeds")
+    idx = index_document(soup)
+    root = idx.by_id("InterventionMeds", "div")
     if not root:
         return None
 
-    h3 = root.find("h3", id="ShdMrpMedsSupplements")
+    h3 = idx.by_id("ShdMrpMedsSupplements", "h3", within=root)
     if not h3:
         return None
 
     title = _norm(h3.get_text(" ", strip=True))
 
     # ---- intro paragraphs between h3 and first following table (even if nested) ----
+    # Verify it's the supplements table by header text
+    supplements_table = idx.following_table_with_headers(h3, SUPPLEMENT_HEADERS)
+    stop = idx.pos(supplements_table) if supplements_table else None
+
     intro = []
-    supplements_table = None
-
-    # Walk forward through the document (across custom wrappers)
-    for el in h3.next_elements:
-        if isinstance(el, Tag) and el.name == "table":
-            # Verify it's the supplements table by header text
-            header_text = _norm(el.get_text(" ", strip=True)).lower()
-            if ("new supplement" in header_text and
-                "dosage details" in header_text and
-                "reasoning" in header_text and
-                "guidance" in header_text):
-                supplements_table = el
-                break
-        if isinstance(el, Tag) and el.name == "p":
-            if root in el.parents:
-                txt = _norm(el.get_text(" ", strip=True))
-                if txt:
-                    intro.append(txt)
+    for el in idx.iter_next(h3, "p"):
+        if stop is not None and idx.pos(el) >= stop:
+            break
+        if idx.contains(root, el):
+            txt = _norm(el.get_text(" ", strip=True))
+            if txt:
+                intro.append(txt)
 
     # Fallback: search within the section for the first table with expected headers
     if not supplements_table:
-        for tbl in root.find_all("table"):
-            header_text = _norm(tbl.get_text(" ", strip=True)).lower()
-            if ("new supplement" in header_text and
-                "dosage details" in header_text and
-                "reasoning" in header_text and
-                "guidance" in header_text):
+        hdrs_lower = [h.lower() for h in SUPPLEMENT_HEADERS]
+        for tbl in idx.within(root, "table"):
+            if all(h in idx.table_header_text(tbl) for h in hdrs_lower):
                 supplements_table = tbl
                 break
 
@@ -748,10 +1011,10 @@ def extract_supplements(soup: BeautifulSoup):
     tips = None
     if supplements_table:
         # Find the first <p> after the table containing a <b> with "Tips"
-        p = supplements_table.find_next(lambda tag: (
-            isinstance(tag, Tag) and tag.name == "p" and tag.find("b") and
-            "tips" in _norm(tag.find("b").get_text(" ", strip=True)).lower()
-        ))
+        p = next((
+            tag for tag in idx.iter_next(supplements_table, "p")
+            if tag.find("b") and "tips" in _norm(tag.find("b").get_text(" ", strip=True)).lower()
+        ), None)
         if p:
             tips_title = _norm(p.find("b").get_text(" ", strip=True))
             ul = p.find("ul")
@@ -803,17 +1066,9 @@ def _cell_paragraphs(td: Tag) -> list[str]:
     # final whitespace collapse in each paragraph
     return [re.sub(r"\s+", " ", p) for p in paras]
 
-def _find_following_table_with_headers(start: Tag, headers: list[str]) -> Tag | None:
-    hdrs_lower = [h.lower() for h in headers]
-    for el in start.next_elements:
-        if isinstance(el, Tag) and el.name == "table":
-            head_txt = _norm(el.get_text(" ", strip=True)).lower()
-            if all(h in head_txt for h in hdrs_lower):
-                return el
-        # stop if we hit a new major section
-        if isinstance(el, Tag) and el.name in {"h1", "h2"} and el is not start:
-            break
-    return None
+def _find_following_table_with_headers(idx: DocumentIndex, start: Tag, headers: list[str]) -> Tag | None:
+    # stop if we hit a new major section
+    return idx.following_table_with_headers(start, headers, stop=idx.next_heading(start))
 
 # def extract_lifestyle(soup: BeautifulSoup) -> dict | None:
 #     """
@@ -843,7 +1098,7 @@ def _find_following_table_with_headers(start: Tag, headers: list[str]) -> Tag |
 #     intro: list[str] = []
 #     # We’ll accumulate <p> text nodes until we find the target table
 #     target_headers = ["Lifestyle Area", "Your Task", "Additional Instructions"]
-#     lifestyle_table = _find_following_table_with_headers(h2, target_headers)
+#     lifestyle_table = _find_following_table_with_headers(idx, h2, target_headers)
 
 #     for el in h2.next_elements:
 #         if el is lifestyle_table:
@@ -937,35 +1192,187 @@ def _find_following_table_with_headers(start: Tag, headers: list[str]) -> Tag |
 #         "items": items
 #     }
 
-def main(path: str, output: str):
-    # Read as raw bytes so BeautifulSoup can detect encoding
-    path = "Report_Participant_1-00_JANEADOE_2024-11-02.html"
-    with open(path, 'rb') as f:
-        raw = f.read()
-
-    # Let BeautifulSoup handle the decoding
-    soup = BeautifulSoup(raw, 'html.parser')
-
-    report = {
-        "preface": extract_preface(soup),
-        "healthReport": extract_health_report(soup),
-        "actionPlan": extract_action_plan(soup),
-        "lifestyle": extract_lifestyle(soup),
-        "nutrition": extract_nutrition(soup),
-        "currentMedication": extract_current_medication(soup),
-        "cognitiveFunction": extract_cognitive_function(soup)
-        
-        # "supplements":  extract_supplements(soup),
-        # "lifestyle": extract_lifestyle(soup)
-    }
-    with open(output, "w", encoding="utf-8") as out:
-        json.dump(report, out, indent=2)
+# Top-level report.json sections, in output order
+SECTIONS = {
+    "preface": extract_preface,
+    "healthReport": extract_health_report,
+    "actionPlan": extract_action_plan,
+    "lifestyle": extract_lifestyle,
+    "nutrition": extract_nutrition,
+    "currentMedication": extract_current_medication,
+    "cognitiveFunction": extract_cognitive_function
+
+    # "supplements":  extract_supplements,
+}
+
+class Report:
+    """
+    Lazily extracted report.
+
+    Nothing is parsed until the first section is requested, and each
+    top-level section is extracted once, on first access:
+
+        report = Report.from_file("Report_Participant_....html")
+        report["cognitiveFunction"]                      # parses + runs one extractor
+        report["healthReport"]["currentStatus"]          # reuses the parsed document
+
+    to_dict()/to_json() request every section and give exactly what
+    extract.main writes.
+
+    With split=True each section parses only its own fragment of the
+    document (see section_split.py), so a consumer reading one or two
+    sections skips most of the parse as well. Only parsers that parse a
+    fragment the way they parse it in place (section_split.SPLIT_PARSERS,
+    i.e. lxml) split; with any other, split is ignored.
+    """
+
+    def __init__(self, raw: bytes, parser: str | None = None, split: bool = False):
+        self.raw = raw
+        self.parser = parser
+        self.split = split and splits(parser)
+        self._index = None
+        self._fragments = None
+        self._sections = {}
+
+    @classmethod
+    def from_file(cls, path: str, parser: str | None = None, split: bool = False) -> "Report":
+        with open(path, "rb") as f:
+            return cls(f.read(), parser, split)
+
+    @property
+    def index(self) -> DocumentIndex:
+        if self._index is None:
+            # one traversal, shared by every extractor
+            with metrics.span("parse"):
+                soup = parse_html(self.raw, self.parser)
+            with metrics.span("index"):
+                self._index = DocumentIndex(soup)
+        return self._index
+
+    def __getitem__(self, name: str):
+        if name not in self._sections:
+            if name not in SECTIONS:
+                raise KeyError(name)
+            if self.split and self._fragments is None:
+                self._fragments = section_fragments(self.raw)
+            fragment = self._fragments.get(name) if self.split else None
+            if fragment is not None:
+                with metrics.span(f"extract.{name}"):
+                    self._sections[name] = extract_section(name, fragment, self.parser)
+            else:
+                index = self.index
+                with metrics.span(f"extract.{name}"):
+                    self._sections[name] = SECTIONS[name](index)
+        return self._sections[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in SECTIONS
+
+    def __iter__(self):
+        return iter(SECTIONS)
+
+    def keys(self):
+        return SECTIONS.keys()
+
+    @property
+    def extracted(self) -> list[str]:
+        """Sections computed so far."""
+        return [name for name in SECTIONS if name in self._sections]
+
+    def to_dict(self) -> dict:
+        return {name: self[name] for name in SECTIONS}
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def close(self):
+        """
+        Free the parsed document right away (BeautifulSoup trees are full of
+        reference cycles, so they otherwise linger until a gc pass).
+        Extracted sections are kept; a later lookup parses again.
+        """
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def extract_report(raw: bytes, parser: str | None = None) -> dict:
+    with Report(raw, parser) as report:
+        return report.to_dict()
+
+def extract_text(path: str, parser: str | None = None, cache: ExtractionCache | None = None,
+                 parallel: bool = False, spec: bool = False) -> str:
+    """The report.json text for the report at `path`, without writing it anywhere."""
+    with metrics.job(kind="extract", input=path) as job:
+        # Read as raw bytes; the declared charset is honoured by parse_html
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        # Identical bytes + extractor version -> reuse the stored JSON without parsing
+        cache = cache if cache is not None else default_cache()
+        mode = "parallel" if parallel else "spec" if spec else "serial"
+        key = ExtractionCache.key(raw, EXTRACTOR_VERSION, parser or PARSER, mode) if cache else None
+        text = cache.get(key) if cache else None
+        if cache:
+            job.set(cache_hit=text is not None)
+        if text is None:
+            if parallel:
+                # sections extracted from their own fragments in worker processes
+                with metrics.span("extract.parallel"):
+                    report = extract_parallel(raw, parser)
+            elif spec:
+                # declarative spec compiled into a plan (extract_spec.py); same output
+                from extract_spec import PLAN
+                with metrics.span("parse"):
+                    soup = parse_html(raw, parser)
+                with metrics.span("extract.spec"):
+                    try:
+                        report = PLAN.run(soup)
+                    finally:
+                        soup.decompose()
+            else:
+                report = extract_report(raw, parser)
+            with metrics.span("json_encode"):
+                text = json.dumps(report, indent=2)
+            if cache:
+                cache.put(key, text)
+        return text
+
+
+def main(path: str, output: str | None = None, parser: str | None = None,
+         cache: ExtractionCache | None = None, parallel: bool = False, spec: bool = False) -> str:
+    """Extract `path` into `output` (stdout if None); returns the report.json text."""
+    with metrics.job(kind="extract", input=path):
+        text = extract_text(path, parser, cache, parallel, spec)
+        with metrics.span("json_write"):
+            if output is None:
+                # no output path: print to stdout (python extract.py report.html > report.json)
+                sys.stdout.write(text)
+                return text
+            with open(output, "w", encoding="utf-8") as out:
+                out.write(text)
+        return text
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Extract a participant HTML report into report.json")
+    ap.add_argument("input", help="participant report .html")
+    ap.add_argument("output", nargs="?", help="output .json (default: stdout)")
+    ap.add_argument("--parser", choices=PARSERS, default=PARSER, help="BeautifulSoup tree builder")
+    ap.add_argument("--cache", help="extraction cache directory (default: $REPORT_CACHE_DIR)")
+    ap.add_argument("--parallel", action="store_true", help="extract sections in parallel worker processes")
+    ap.add_argument("--spec", action="store_true", help="run the compiled extraction spec (extract_spec.py)")
+    args = ap.parse_args()
+
     total_start = time.perf_counter()
 
     # 1) build JSON
     start = time.perf_counter()
-    main()
-    print(f"✅ extract_data: {time.perf_counter() - start:.2f}s")
+    main(args.input, args.output, args.parser, ExtractionCache(args.cache) if args.cache else None,
+         args.parallel, args.spec)
+    print(f"✅ extract_data: {time.perf_counter() - start:.2f}s", file=sys.stderr)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+extract_cache.py
+
+Content-addressed on-disk cache for extract.main.
+
+Upstream often re-sends byte-identical participant HTML. The cache key is
+sha256(extractor version, parser, extraction mode, input bytes), and the value is the exact
+report.json text main() would have written, so a hit skips parsing and
+extraction entirely.
+
+- entries live in <dir>/<key[:2]>/<key>.json
+- writes go to a temp file in the same directory and are os.replace()d
+  into place, so concurrent workers never see or leave half-written entries
+- reads bump the entry's mtime; once the directory grows past `max_bytes`
+  the least recently used entries are deleted
+- hits/misses/writes/evictions are counted per process (see stats())
+
+Set REPORT_CACHE_DIR to enable it for every extract.main() call.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+
+import metrics
+
+CACHE_DIR       = os.environ.get("REPORT_CACHE_DIR")
+CACHE_MAX_BYTES = int(os.environ.get("REPORT_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+class ExtractionCache:
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits      = 0
+        self.misses    = 0
+        self.writes    = 0
+        self.evictions = 0
+        self._approx_bytes = None   # running estimate of the directory size
+        self._lock     = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # —— KEYS ——————————————————————————————————————————————————————————
+
+    @staticmethod
+    def key(raw: bytes, version: str, parser: str, mode: str = "serial") -> str:
+        # The modes (serial, spec, parallel) must produce identical JSON, but that
+        # is only checked on the synthetic corpus (synth_report.check_parity). With
+        # the mode in the key, a divergence on a real report stays within the mode
+        # that produced it instead of being served to every caller. The cost is one
+        # extra entry per mode actually used on the same input.
+        h = hashlib.sha256()
+        h.update(f"{version}\0{parser}\0{mode}\0".encode())
+        h.update(raw)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    # —— GET / PUT —————————————————————————————————————————————————————
+
+    def get(self, key: str) -> str | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            metrics.count("cache_misses")
+            return None
+        try:
+            os.utime(path)   # LRU: most recently used entries have the newest mtime
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        metrics.count("cache_hits")
+        return text
+
+    def put(self, key: str, text: str):
+        path = self._path(key)
+        shard = os.path.dirname(path)
+        os.makedirs(shard, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=shard, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            try:
+                replaced = os.path.getsize(path)     # rewriting a key doesn't grow the cache
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self.writes += 1
+            if self._approx_bytes is None:
+                self._approx_bytes = self._scan_size()
+            else:
+                self._approx_bytes += size - replaced
+            over = self.max_bytes and self._approx_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    # —— EVICTION ——————————————————————————————————————————————————————
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        out = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json") and not entry.name.startswith(".tmp-"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue   # evicted by another worker meanwhile
+                    out.append((st.st_mtime, st.st_size, entry.path))
+        return out
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        metrics.count("cache_evictions", removed)
+        with self._lock:
+            self.evictions += removed
+            self._approx_bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+_default = None
+
+def default_cache() -> ExtractionCache | None:
+    """Process-wide cache in REPORT_CACHE_DIR, or None when caching is off."""
+    global _default
+    if _default is None and CACHE_DIR:
+        _default = ExtractionCache(CACHE_DIR)
+    return _default
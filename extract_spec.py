@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+extract_spec.py
+
+Declarative description of report.json, compiled once into an execution
+plan that runs over a DocumentIndex.
+
+A spec says where every field comes from instead of how to walk the tree:
+
+    "medications": {
+        "rows": [{"id": "ShdMrpMedsPrescriptions", "tag": "h3"}, {"next": "table"}],
+        "skip": 1, "min_cells": 5,
+        "fields": {
+            "medication": {"text": [{"cell": 0}]},
+            "reasoning":  {"fn": "med_reasoning", "at": [{"cell": 3}]},
+        },
+    }
+
+Locators are lists of steps evaluated left to right; each step maps onto
+one DocumentIndex lookup:
+
+    {"id": X, "tag": T, "within": anchor}   idx.by_id(X, T, within=...)
+    {"anchor": name}                        a tag resolved in the section's "anchors"
+    {"select": [id, tag]}                   idx.select(id, tag)        -> list
+    {"class": [tag, cls], "within": anchor} idx.with_class(...)        -> list
+    {"next": tag}                           idx.next(current, tag)
+    {"first": tag}                          idx.first_within(current, tag)
+    {"all": tag}                            idx.within(current, tag)   -> list
+    {"children": tag}                       direct children            -> list
+    {"siblings": tag, "limit": n}           following siblings         -> list
+    {"sibling": tag}                        first following sibling
+    {"cell": i}                             i-th <td> of the current row (idx.cells)
+    {"content": i}                          i-th child node
+    {"index": i}                            i-th tag of a list (None past the end)
+
+Value nodes:
+
+    {"const": v}
+    {"text": locator, "default": d, "sep": " ", "rstrip": chars, "split": sep, "part": [sep, i]}
+    {"texts": locator, "rstrip": chars}
+    {"object": {field: node, ...}}
+    {"rows": locator, "skip": n, "cells": n | "min_cells": n, "fields": {...}}
+    {"attr": name, "at": locator, "default": None}
+    {"each": locator, "skip": n, "fields": {...} | "fn": name}
+    {"fn": name, "at": locator, "of": sibling field, "args": {...}}
+
+`fn` names refer to the small registry below (cell parsers shared with
+extract.py); `args` is passed to the function as is.
+
+    report = PLAN.run(soup)      # == extract.Report(raw).to_dict()
+
+PLAN is compile_spec(REPORT_SPEC), built once at import; `python
+extract.py report.html --spec` uses it.
+"""
+
+from extract import (
+    index_document,
+    _cognitive_entry, _nutrient_deficiencies, _parse_med_reasoning,
+    _parse_supplement_reasoning, _status_overview, _status_sections, _status_table,
+)
+
+# —— FUNCTION REGISTRY ————————————————————————————————————————————————————
+# fn(el, args, ctx) -> value; ctx is (idx, anchors, values-of-the-current-object)
+
+def _fn_header(el, args, ctx):
+    return dict(ctx[0].header)
+
+def _fn_sentence_with(el, args, ctx):
+    paragraphs = el or []
+    return next((s for p in paragraphs for s in p.split(args["sep"]) if args["needle"] in s), "")
+
+def _fn_titled_steps(el, args, ctx):
+    descriptions = [li.get_text(" ", strip=True) for li in el.find_all("li")]
+    titles = args["titles"]
+    return [{"title": titles[i], "description": descriptions[i]} for i in range(len(descriptions))]
+
+def _fn_status_sections(el, args, ctx):
+    return _status_sections(_status_table(ctx[0]))
+
+FUNCTIONS = {
+    "header":               _fn_header,
+    "sentence_with":        _fn_sentence_with,
+    "titled_steps":         _fn_titled_steps,
+    "status_overview":      lambda el, args, ctx: _status_overview(el),
+    "status_sections":      _fn_status_sections,
+    "med_reasoning":        lambda el, args, ctx: _parse_med_reasoning(el),
+    "supplement_reasoning": lambda el, args, ctx: _parse_supplement_reasoning(el),
+    "deficiencies":         lambda el, args, ctx: _nutrient_deficiencies(el),
+    "cognitive_entry":      lambda el, args, ctx: _cognitive_entry(el),
+}
+
+# —— COMPILER —————————————————————————————————————————————————————————————
+class SpecError(ValueError):
+    pass
+
+def _compile_step(step: dict):
+    if "id" in step:
+        tag_id, name, within = step["id"], step.get("tag"), step.get("within")
+        return lambda idx, anchors, cur: idx.by_id(tag_id, name, anchors.get(within) if within else None)
+    if "anchor" in step:
+        name = step["anchor"]
+        return lambda idx, anchors, cur: anchors.get(name)
+    if "select" in step:
+        tag_id, name = step["select"]
+        return lambda idx, anchors, cur: idx.select(tag_id, name)
+    if "class" in step:
+        name, cls = step["class"]
+        within = step.get("within")
+        return lambda idx, anchors, cur: idx.with_class(name, cls, anchors.get(within) if within else None)
+
+    # relative steps: no current element -> nothing found
+    if "next" in step:
+        name = step["next"]
+        fn = lambda idx, cur: idx.next(cur, name)
+    elif "first" in step:
+        name = step["first"]
+        fn = lambda idx, cur: idx.first_within(cur, name)
+    elif "all" in step:
+        name = step["all"]
+        fn = lambda idx, cur: idx.within(cur, name)
+    elif "children" in step:
+        name = step["children"]
+        fn = lambda idx, cur: cur.find_all(name, recursive=False)
+    elif "siblings" in step:
+        name, limit = step["siblings"], step.get("limit")
+        fn = lambda idx, cur: cur.find_next_siblings(name, limit=limit)
+    elif "sibling" in step:
+        name = step["sibling"]
+        fn = lambda idx, cur: cur.find_next_sibling(name)
+    elif "cell" in step:
+        i = step["cell"]
+        fn = lambda idx, cur: idx.cells(cur)[i]
+    elif "content" in step:
+        i = step["content"]
+        fn = lambda idx, cur: cur.contents[i]
+    elif "index" in step:
+        i = step["index"]
+        fn = lambda idx, cur: cur[i] if len(cur) > i else None
+    else:
+        raise SpecError(f"unknown locator step {step!r}")
+    return lambda idx, anchors, cur: fn(idx, cur) if cur is not None else None
+
+def _function(name: str):
+    if name not in FUNCTIONS:
+        raise SpecError(f"unknown function {name!r}")
+    return FUNCTIONS[name]
+
+def _compile_locator(steps):
+    if not steps:
+        return lambda idx, anchors, cur: cur
+    compiled = [_compile_step(s) for s in steps]
+
+    def locate(idx, anchors, cur):
+        for step in compiled:
+            cur = step(idx, anchors, cur)
+        return cur
+    return locate
+
+def _compile_text_post(node: dict):
+    posts = []
+    if "rstrip" in node:
+        chars = node["rstrip"]
+        posts.append(lambda t: t.rstrip(chars))
+    if "part" in node:
+        sep, i = node["part"]
+        def part(t):
+            parts = t.split(sep)
+            return parts[i].strip() if len(parts) > i else ""
+        posts.append(part)
+    if "split" in node:
+        sep = node["split"]
+        posts.append(lambda t: [x.strip() for x in t.split(sep) if x.strip()])
+    return posts
+
+def _compile_fields(fields: dict):
+    compiled = [(name, compile_node(node)) for name, node in fields.items()]
+
+    def build(idx, anchors, cur):
+        values = {}
+        for name, run in compiled:
+            values[name] = run(idx, anchors, cur, values)
+        return values
+    return build
+
+def compile_node(node: dict):
+    """Compile one value node into run(idx, anchors, current, sibling_values)."""
+    if "const" in node:
+        value = node["const"]
+        return lambda idx, anchors, cur, values: value
+
+    if "text" in node:
+        locate = _compile_locator(node["text"])
+        sep = node.get("sep", " ")
+        default = node.get("default", "")
+        posts = _compile_text_post(node)
+
+        def text(idx, anchors, cur, values):
+            el = locate(idx, anchors, cur)
+            t = el.get_text(sep, strip=True) if el else default
+            for post in posts:
+                t = post(t)
+            return t
+        return text
+
+    if "texts" in node:
+        locate = _compile_locator(node["texts"])
+        posts = _compile_text_post(node)
+
+        def texts(idx, anchors, cur, values):
+            out = []
+            for el in locate(idx, anchors, cur) or []:
+                t = el.get_text(" ", strip=True)
+                for post in posts:
+                    t = post(t)
+                out.append(t)
+            return out
+        return texts
+
+    if "object" in node:
+        build = _compile_fields(node["object"])
+        return lambda idx, anchors, cur, values: build(idx, anchors, cur)
+
+    if "rows" in node:
+        locate = _compile_locator(node["rows"])
+        skip = node.get("skip", 0)
+        exact, least = node.get("cells"), node.get("min_cells")
+        build = _compile_fields(node["fields"])
+
+        def rows(idx, anchors, cur, values):
+            table = locate(idx, anchors, cur)
+            if table is None:
+                return []
+            out = []
+            for tr in idx.within(table, "tr")[skip:]:
+                if exact is not None or least is not None:
+                    n = len(idx.cells(tr))
+                    if (exact is not None and n != exact) or (least is not None and n < least):
+                        continue
+                out.append(build(idx, anchors, tr))
+            return out
+        return rows
+
+    if "attr" in node:
+        locate = _compile_locator(node["at"])
+        name, default = node["attr"], node.get("default")
+
+        def attr(idx, anchors, cur, values):
+            el = locate(idx, anchors, cur)
+            return el[name] if el and el.has_attr(name) else default
+        return attr
+
+    if "each" in node:
+        locate = _compile_locator(node["each"])
+        skip = node.get("skip", 0)
+        if "fields" in node:
+            build = _compile_fields(node["fields"])
+        else:
+            fn = _function(node["fn"])
+            build = lambda idx, anchors, el: fn(el, {}, (idx, anchors, {}))
+        return lambda idx, anchors, cur, values: [
+            build(idx, anchors, el) for el in (locate(idx, anchors, cur) or [])[skip:]
+        ]
+
+    if "fn" in node:
+        fn = _function(node["fn"])
+        locate = _compile_locator(node["at"]) if "at" in node else None
+        source = node.get("of")
+        args = dict(node.get("args", {}))
+
+        def call(idx, anchors, cur, values):
+            if source is not None:
+                el = values[source]
+            elif locate is not None:
+                el = locate(idx, anchors, cur)
+            else:
+                el = cur
+            return fn(el, args, (idx, anchors, values))
+        return call
+
+    raise SpecError(f"unknown value node {node!r}")
+
+def _compile_section(spec: dict):
+    anchors = [(name, _compile_locator(steps)) for name, steps in spec.get("anchors", {}).items()]
+    required = spec.get("require")
+    missing = spec.get("missing")
+    build = _compile_fields(spec["fields"])
+
+    def run(idx):
+        resolved = {}
+        for name, locate in anchors:
+            resolved[name] = locate(idx, resolved, None)
+        if required and not resolved.get(required):
+            return missing
+        return build(idx, resolved, None)
+    return run
+
+class Plan:
+    """A compiled spec: one callable per top-level section."""
+
+    def __init__(self, sections: dict):
+        self.sections = sections
+
+    def section(self, name: str, doc):
+        return self.sections[name](index_document(doc))
+
+    def run(self, doc) -> dict:
+        idx = index_document(doc)
+        return {name: run(idx) for name, run in self.sections.items()}
+
+def compile_spec(spec: dict) -> Plan:
+    return Plan({name: _compile_section(section) for name, section in spec.items()})
+
+# —— REPORT SPEC ——————————————————————————————————————————————————————————
+def _table_block(table: str) -> dict:
+    # {"headers": [...th...], "entries": [{foodGroup, frequency}, ...]}
+    return {"object": {
+        "headers": {"texts": [{"anchor": table}, {"all": "th"}]},
+        "entries": {"rows": [{"anchor": table}], "skip": 1, "cells": 2, "fields": {
+            "foodGroup": {"text": [{"cell": 0}]},
+            "frequency": {"text": [{"cell": 1}]},
+        }},
+    }}
+
+REPORT_SPEC = {
+    "preface": {
+        "anchors": {
+            "reading": [{"id": "ShdMrpReading", "tag": "h2"}],
+        },
+        "fields": {
+            "header": {"fn": "header"},
+            "title": {"const": "Preface"},
+            "purposeParagraphs": {"texts": [{"select": ["Purpose", "p"]}]},
+            "statisticCallout": {"fn": "sentence_with", "of": "purposeParagraphs", "args": {"needle": "%", "sep": ". "}},
+            "aboutParagraphs": {"texts": [{"select": ["About", "p"]}]},
+            "reading": {"object": {
+                "intro": {"texts": [{"anchor": "reading"}, {"siblings": "p", "limit": 2}]},
+                "steps": {"fn": "titled_steps", "at": [{"anchor": "reading"}, {"sibling": "ol"}], "args": {
+                    "titles": ["Overview of Risk Factors", "Personalized Action Plan", "In-Depth Insights"],
+                }},
+            }},
+        },
+    },
+    "healthReport": {
+        "fields": {
+            "header": {"fn": "header"},
+            "title": {"const": "Current Status"},
+            "currentStatus": {"object": {
+                "overview": {"fn": "status_overview", "at": [{"select": ["YourStatus", "table"]}, {"index": 0}]},
+            }},
+            "healthStatusSections": {"fn": "status_sections"},
+        },
+    },
+    "actionPlan": {
+        "anchors": {
+            "ap": [{"id": "ActionPlan", "tag": "div"}],
+            "title": [{"id": "ShdMrpActionPlan", "tag": "h1", "within": "ap"}],
+            "supplements": [{"id": "ShdMrpMedsSupplements", "tag": "h3"}],
+        },
+        "require": "ap",
+        "missing": None,
+        "fields": {
+            "title": {"text": [{"anchor": "title"}], "default": "Your Action Plan"},
+            "intro": {"texts": [{"anchor": "ap"}, {"children": "p"}]},
+            "steps": {"texts": [{"anchor": "ap"}, {"first": "ul"}, {"all": "li"}], "rstrip": ","},
+            "medications": {
+                "rows": [{"id": "ShdMrpMedsPrescriptions", "tag": "h3"}, {"next": "table"}],
+                "skip": 1, "min_cells": 5,
+                "fields": {
+                    "medication":    {"text": [{"cell": 0}]},
+                    "dosageDetails": {"text": [{"cell": 1}]},
+                    "alreadyTaking": {"text": [{"cell": 2}]},
+                    "reasoning":     {"fn": "med_reasoning", "at": [{"cell": 3}]},
+                    "guidance":      {"text": [{"cell": 4}]},
+                },
+            },
+            "supplements": {"object": {
+                "title": {"text": [{"anchor": "supplements"}], "default": "Supplements"},
+                "intro": {"text": [{"anchor": "supplements"}, {"next": "div"}, {"first": "p"}], "split": "."},
+                "meds": {
+                    "rows": [{"anchor": "supplements"}, {"next": "table"}],
+                    "skip": 1, "min_cells": 4,
+                    "fields": {
+                        "medication":    {"text": [{"cell": 0}]},
+                        "dosageDetails": {"text": [{"cell": 1}]},
+                        "reasoning":     {"fn": "supplement_reasoning", "at": [{"cell": 2}]},
+                        "guidance":      {"text": [{"cell": 3}]},
+                    },
+                },
+            }},
+        },
+    },
+    "lifestyle": {
+        "anchors": {
+            "title": [{"id": "ShdMrpLifestyle", "tag": "h2"}],
+        },
+        "fields": {
+            "title": {"text": [{"anchor": "title"}]},
+            "intro": {"text": [{"anchor": "title"}, {"next": "div"}, {"first": "p"}]},
+            "recommendations": {
+                "rows": [{"anchor": "title"}, {"next": "table"}],
+                "skip": 1,
+                "fields": {
+                    "area": {"object": {
+                        "title": {"text": [{"cell": 0}]},
+                        "image": {"attr": "src", "at": [{"cell": 0}, {"first": "img"}]},
+                    }},
+                    "task": {"text": [{"cell": 1}]},
+                    "instructions": {"text": [{"cell": 2}], "split": "."},
+                },
+            },
+        },
+    },
+    "nutrition": {
+        "anchors": {
+            "diet":           [{"id": "ShdMrpNewDiet", "tag": "h2"}],
+            "mind":           [{"id": "ShdMrpMINDDiet", "tag": "h3"}],
+            "mind_intro":     [{"anchor": "mind"}, {"next": "div"}, {"first": "p"}],
+            "recommended":    [{"anchor": "mind"}, {"next": "table"}],
+            "discouraged_p":  [{"anchor": "recommended"}, {"next": "p"}],
+            "discouraged":    [{"anchor": "discouraged_p"}, {"next": "table"}],
+            "summary":        [{"anchor": "discouraged"}, {"next": "h2"}],
+            "summary_table":  [{"anchor": "summary"}, {"next": "table"}],
+            "advice":         [{"anchor": "summary_table"}, {"next": "p"}],
+            "consumption":    [{"anchor": "advice"}, {"next": "table"}],
+        },
+        "fields": {
+            "recommendations": {"object": {
+                "header": {"text": [{"anchor": "diet"}]},
+                "header_intro": {"text": [{"anchor": "diet"}, {"next": "p"}]},
+                "mind_diet_intro": {"text": [{"anchor": "mind_intro"}]},
+                "recommended_instructions": {"text": [{"anchor": "mind_intro"}, {"next": "p"}]},
+                "recommended_diet": _table_block("recommended"),
+                "discouraged_instructions": {"text": [{"anchor": "discouraged_p"}], "default": "Discouraged Foods"},
+                "discouraged_diet": _table_block("discouraged"),
+            }},
+            "mind_diet_title": {"text": [{"anchor": "mind"}], "default": "MIND Diet"},
+            "summary": {"object": {
+                "title": {"text": [{"anchor": "summary"}], "default": "Summary"},
+                "warning": {"text": [{"anchor": "summary_table"}, {"first": "td"}, {"content": 0}]},
+                "deficiencies": {"fn": "deficiencies", "at": [{"anchor": "summary_table"}, {"all": "table"}]},
+            }},
+            "consumption": {"object": {
+                "advice": {"text": [{"anchor": "advice"}]},
+                "title": {"text": [{"anchor": "consumption"}, {"first": "td"}, {"content": 0}],
+                          "default": "Dietary Consumption Summary"},
+                "entries": {
+                    "rows": [{"anchor": "consumption"}, {"first": "table"}],
+                    "fields": {
+                        "group":  {"text": [{"cell": 2}], "part": [":", 0]},
+                        "intake": {"text": [{"cell": 2}], "part": [":", 1]},
+                        "note":   {"text": [{"cell": 4}]},
+                    },
+                },
+            }},
+        },
+    },
+    "currentMedication": {
+        "anchors": {
+            "section": [{"id": "Medications", "tag": "div"}],
+            "title":   [{"id": "ShdMrtMedsCurrent", "tag": "h3", "within": "section"}],
+            "table":   [{"anchor": "title"}, {"next": "table"}],
+        },
+        "fields": {
+            "title": {"text": [{"anchor": "title"}], "default": "Current Medication"},
+            "intro": {"text": [{"anchor": "title"}, {"next": "p"}]},
+            "headers": {"texts": [{"anchor": "table"}, {"all": "th"}]},
+            "medications": {
+                "rows": [{"anchor": "table"}], "skip": 1, "cells": 4,
+                "fields": {
+                    "medication":     {"text": [{"cell": 0}]},
+                    "dosageDetails":  {"text": [{"cell": 1}]},
+                    "indication":     {"text": [{"cell": 2}]},
+                    "dateStarted":    {"text": [{"cell": 3}]},
+                },
+            },
+        },
+    },
+    "cognitiveFunction": {
+        "anchors": {
+            "section": [{"id": "OutOfRange", "tag": "div"}],
+            "title":   [{"id": "ShdMrpFactors", "tag": "h1", "within": "section"}],
+        },
+        "require": "section",
+        "missing": {},
+        "fields": {
+            "title": {"text": [{"anchor": "title"}], "default": "Factors Related to Cognitive Decline"},
+            "intro": {"text": [{"anchor": "title"}, {"next": "p"}]},
+            "factors": {
+                "each": [{"class": ["table", "tabSummary"], "within": "section"}],
+                "fields": {
+                    "section": {"text": [{"first": "th"}]},
+                    "entries": {"each": [{"children": "tr"}], "skip": 1, "fn": "cognitive_entry"},
+                },
+            },
+        },
+    },
+}
+
+# compiled once at import, shared by every extraction in the process
+PLAN = compile_spec(REPORT_SPEC)
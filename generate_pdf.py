@@ -1,54 +1,426 @@
 # generate_pdf.py
-from playwright.sync_api import sync_playwright
-
-def main(input_path: str, output_filename: str, footer_tmpl: str):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                "--disable-web-security",
-                "--disable-features=IsolateOrigins,site-per-process",
-                "--allow-running-insecure-content",
-                "--allow-file-access-from-files"   # allows file:// requests
-            ]
-        )
-        page = browser.new_page(viewport={"width":1200, "height":1600})
-
-         # Log every request
-        page.on("request", lambda request: print(f"➡️ {request.method} {request.url}"))
-
-        # Log every response
-        page.on("response", lambda response: print(f"⬅️ {response.status} {response.url}"))
-        
-        page.on("console", lambda msg: print(f"[browser console] {msg.type}: {msg.text}"))
-    
-        # 1. Emulate print so @page rules will be applied
-        page.emulate_media(media="print")
-        
-        # 2. Navigate and wait for your app’s CSS to settle
-        page.goto(input_path, wait_until="networkidle")
-        # page.goto("http://localhost:5173", wait_until="networkidle")
-
-        # 3. Inject zero‑margin @page rules *after* navigation
-        page.add_style_tag(content="""
-          @page { size: A4; margin-top: 0 !important; }
-        """)
-        
-        # 5. Export with zero margins
-        page.pdf(
-            path=output_filename,
-            format="A4",
-            print_background=True,
-            margin={"top":"0mm","bottom":"1mm","left":"0mm","right":"0mm"},
-            prefer_css_page_size=True,
-            display_header_footer=True,
-            footer_template=footer_tmpl
-        )
-
-        browser.close()
+import argparse
+import atexit
+import base64
+import json
+import os
+import threading
+import time
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+import metrics
+from browser_pool import BrowserPool
+from dist_assets import DistAssets, ReportMismatch, report_body
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+POOL_SIZE      = int(os.environ.get("PDF_POOL_SIZE", "2"))
+POOL_MAX_JOBS  = int(os.environ.get("PDF_POOL_MAX_JOBS", "200"))
+POOL_MAX_RSS   = int(os.environ.get("PDF_POOL_MAX_RSS_MB", "1500"))
+DEFAULT_URL    = "http://localhost:5173"
+DIST_DIR       = os.environ.get("PDF_DIST_DIR", "dist")
+READY_TIMEOUT  = int(os.environ.get("PDF_READY_TIMEOUT_MS", "15000"))   # then fall back to networkidle
+READY_QUIET_MS = int(os.environ.get("PDF_READY_QUIET_MS", "50"))
+POSTPROCESS    = os.environ.get("PDF_POSTPROCESS", "0") == "1"   # pdf_optimize.py, needs pikepdf
+LINEARIZE      = os.environ.get("PDF_LINEARIZE", "0") == "1"
+DEFAULT_OUTPUT = "medical-report-ingested.pdf"
+RASTER_DPI     = int(os.environ.get("PDF_RASTER_DPI", "96"))      # PNG/WebP previews, see render_rasters()
+THUMB_WIDTH    = int(os.environ.get("PDF_THUMB_WIDTH", "200"))    # thumbnail width in px, 0 for none
+RASTER_QUALITY = 90                                                # WebP only
+RASTER_FORMATS = ("png", "webp")
+A4_PX          = (794, 1123)                                       # A4 in CSS px (96 per inch)
+
+FOOTER_TMPL = """
+<div style="
+    font-size: 10px;
+    color: #6B7280;
+    padding-left: 58px;
+    padding-right: 58px;
+    width: 100%;
+    box-sizing: border-box;
+">
+    <div style="
+    display: flex;
+    justify-content: space-between;
+    align-items: flex-start;
+    width: 100%;
+    ">
+    <div style="line-height: 1.2;">
+        <div>uMETHOD Health, Inc.</div>
+        <div>9650 Falls of Neuse Road, Suite 138‑146</div>
+        <div>Raleigh, NC 27615</div>
+        <div style="color: #3B82F6;">support@umethod.com</div>
+    </div>
+    <div style="text-align: right; line-height: 1.2;">
+        <div>Copyright © 2013‑2025 uMETHOD Health, Inc.</div>
+        <div>All Rights Reserved. Confidential.</div>
+    </div>
+    </div>
+    <div style="
+    text-align: center;
+    margin-top: 4mm;
+    font-size: 9px;
+    ">
+    <span class="pageNumber"></span> / <span class="totalPages"></span>
+    </div>
+</div>
+"""
+
+# Injected after navigation so the app's own @page rules can't add a top margin
+PRINT_CSS = """
+  @page { size: A4; margin-top: 0 !important; }
+"""
+
+# Render-readiness protocol, installed before the app's own scripts run.
+# The app reports it has laid out the report by calling window.reportReady()
+# or dispatching a "report:ready" event. For builds that don't (the current
+# dist/), the page counts as ready once it has loaded, no fetch or response
+# body read is pending, #root has content, the DOM has not changed for
+# READY_QUIET_MS, and images and fonts are decoded. window.__reportReady then
+# holds how readiness was reached ("app" or "settled"); __reportRearm()
+# clears it before the page re-renders in place (hot_swap.py).
+# window.__reportFetches counts the page's requests for /report.json
+# (fetch or XMLHttpRequest), for verify_report().
+READY_SCRIPT = """
+(() => {
+  if (window.__reportReady !== undefined) return;
+  window.__reportReady = null;
+  const QUIET_MS = %d;
+  let pending = 0, loaded = false, timer = null, epoch = 0;
+  const signal = how => { if (!window.__reportReady) window.__reportReady = how; };
+  window.reportReady = () => signal("app");
+  window.addEventListener("report:ready", () => signal("app"));
+  window.__reportRearm = () => { window.__reportReady = null; arm(); };
+
+  const arm = () => {
+    epoch++;
+    clearTimeout(timer);
+    if (loaded && !pending && !window.__reportReady) timer = setTimeout(check, QUIET_MS);
+  };
+  const check = () => {
+    const mine = epoch;
+    const root = document.getElementById("root") || document.body;
+    if (!root || !root.firstElementChild) return;
+    const images = Array.from(document.images, img => img.decode().catch(() => null));
+    Promise.all([document.fonts.ready, ...images]).then(() => requestAnimationFrame(() => {
+      if (mine === epoch && !pending) signal("settled");
+    }));
+  };
+  const track = promise => {
+    pending++;
+    const done = () => { pending--; setTimeout(arm, 0); };
+    promise.then(done, done);
+    return promise;
+  };
+  window.__reportFetches = 0;
+  const count = url => {
+    try {
+      if (new URL(url instanceof Request ? url.url : String(url), location.href).pathname === "/report.json")
+        window.__reportFetches++;
+    } catch (e) {}
+  };
+  const fetch = window.fetch;
+  window.fetch = function (...args) { count(args[0]); return track(fetch.apply(this, args)); };
+  const open = XMLHttpRequest.prototype.open;
+  XMLHttpRequest.prototype.open = function (method, url, ...rest) { count(url); return open.call(this, method, url, ...rest); };
+  for (const name of ["json", "text", "arrayBuffer", "blob"]) {
+    const read = Response.prototype[name];
+    Response.prototype[name] = function () { return track(read.call(this)); };
+  }
+  new MutationObserver(arm).observe(document, { childList: true, subtree: true, characterData: true });
+  window.addEventListener("load", () => { loaded = true; arm(); });
+})();
+""" % READY_QUIET_MS
+
+# What verify_report() reads from a loaded page
+REPORT_PROBE = """name => ({
+  fetches: window.__reportFetches || 0,
+  shown: !name || document.body.textContent.replace(/\\s+/g, " ").includes(name),
+})"""
+
+def pdf_options(footer_tmpl: str) -> dict:
+    """page.pdf() keyword arguments shared by every renderer."""
+    return dict(
+        format="A4",
+        print_background=True,
+        margin={"top":"0mm","bottom":"1mm","left":"0mm","right":"0mm"},
+        prefer_css_page_size=True,
+        display_header_footer=True,
+        footer_template=footer_tmpl
+    )
+
+# —— SHARED BROWSER POOL ———————————————————————————————————————————————
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> BrowserPool:
+    """Process-wide pool, launched on first use and closed at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(size=POOL_SIZE, max_jobs=POOL_MAX_JOBS, max_rss_mb=POOL_MAX_RSS)
+            atexit.register(_pool.close)
+        return _pool
+
+# —— IN-MEMORY BUILD ———————————————————————————————————————————————————
+_assets = None
+
+def get_assets() -> DistAssets:
+    """Process-wide copy of DIST_DIR in memory, read on first use."""
+    global _assets
+    with _pool_lock:
+        if _assets is None:
+            _assets = DistAssets(DIST_DIR)
+        return _assets
+
+# —— RASTER PREVIEWS ————————————————————————————————————————————————————
+def _capture(cdp, clip: dict, scale: float, fmt: str) -> bytes:
+    params = {"format": fmt, "captureBeyondViewport": True, "clip": {**clip, "scale": scale}}
+    if fmt == "webp":
+        params["quality"] = RASTER_QUALITY
+    return base64.b64decode(cdp.send("Page.captureScreenshot", params)["data"])
+
+def render_rasters(page, output_base: str, fmt: str = "png", per_page: bool = True,
+                   dpi: int = RASTER_DPI, thumb_width: int = THUMB_WIDTH) -> list[str]:
+    """
+    PNG/WebP previews of a page that has already been rendered (same
+    session, no second navigation). The page is laid out at A4 width with
+    print media and captured at `dpi`: per_page writes one image per A4
+    height, <output_base>-page-001.<fmt>, ...; otherwise the whole document
+    goes into <output_base>.<fmt>. Each image gets a `thumb_width` px wide
+    <name>.thumb.<fmt> of its first A4 page. Pages are cut at A4 heights of
+    the continuous layout, so they can differ from the PDF's page breaks.
+    Returns the files written.
+    """
+    if fmt not in RASTER_FORMATS:
+        raise ValueError(f"raster format must be one of {', '.join(RASTER_FORMATS)}, not {fmt!r}")
+    width, height = A4_PX
+    viewport = page.viewport_size
+    page.set_viewport_size({"width": width, "height": height})
+    cdp = page.context.new_cdp_session(page)
+    try:
+        doc_height = page.evaluate("() => Math.ceil(document.documentElement.scrollHeight)")
+        if per_page:
+            clips = [(f"{output_base}-page-{n:03d}", {"x": 0, "y": y, "width": width, "height": min(height, doc_height - y)})
+                     for n, y in enumerate(range(0, doc_height, height), 1)]
+        else:
+            clips = [(output_base, {"x": 0, "y": 0, "width": width, "height": doc_height})]
+        files = []
+        for name, clip in clips:
+            shots = [(f"{name}.{fmt}", clip, dpi / 96)]
+            if thumb_width:
+                shots.append((f"{name}.thumb.{fmt}", {**clip, "height": min(clip["height"], height)}, thumb_width / width))
+            for path, area, scale in shots:
+                with open(path, "wb") as f:
+                    f.write(_capture(cdp, area, scale, fmt))
+                files.append(path)
+    finally:
+        cdp.detach()
+        if viewport:
+            page.set_viewport_size(viewport)
+    metrics.count("rasters_written", len(files), format=fmt)
+    return files
+
+# —— RENDERING ——————————————————————————————————————————————————————————
+def postprocess(output_filename: str, verbose: bool = False) -> dict | None:
+    """With PDF_POSTPROCESS=1, optimize the written PDF in place (pdf_optimize.optimize_pdf)."""
+    if not POSTPROCESS:
+        return None
+    from pdf_optimize import optimize_pdf
+    stats = optimize_pdf(output_filename, linearize=LINEARIZE)
+    metrics.current_job().set(pdf_bytes=stats["after"], pdf_bytes_saved=stats["saved"])
+    if verbose:
+        print(f"🗜️  {output_filename}: {stats['before']} -> {stats['after']} bytes (-{stats['saved']})")
+    return stats
+
+def report_name(report) -> str | None:
+    """The participant name (preface.header.name) of a report, whitespace collapsed; None without one."""
+    try:
+        name = json.loads(report_body(report)).get("preface", {}).get("header", {}).get("name")
+    except (ValueError, AttributeError):
+        return None
+    return " ".join(str(name).split()) or None if name else None
+
+def check_report(probe: dict, name: str | None, fetches: int = 0):
+    """Raise ReportMismatch unless `probe` (REPORT_PROBE's result) shows a new /report.json fetch and `name`."""
+    if probe["fetches"] <= fetches:
+        raise ReportMismatch("the page never requested /report.json: the viewer build renders the report "
+                             "bundled into it, not the one it was served")
+    if not probe["shown"]:
+        # the name itself stays out of the message: errors end up in job logs
+        raise ReportMismatch("the page doesn't show the participant of the report it was served")
+
+def verify_report(page, report, fetches: int = 0):
+    """
+    Check, before printing, that `page` rendered `report`: it requested
+    /report.json (more than `fetches` times so far) and its text contains
+    the report's participant name, if the report has one.
+    """
+    name = report_name(report)
+    check_report(page.evaluate(REPORT_PROBE, name), name, fetches)
+
+def wait_ready(page, timeout_ms: int = READY_TIMEOUT) -> str:
+    """
+    Block until the page signals readiness (see READY_SCRIPT) and return how
+    ("app", "settled"); after `timeout_ms`, or with READY_TIMEOUT=0, wait for
+    networkidle instead and return "networkidle".
+    """
+    if timeout_ms > 0:
+        try:
+            return page.wait_for_function("() => window.__reportReady", timeout=timeout_ms).json_value()
+        except PlaywrightTimeoutError:
+            metrics.count("ready_fallbacks")
+    page.wait_for_load_state("networkidle")
+    return "networkidle"
+
+def render_page(page, input_path: str, output_filename: str, footer_tmpl: str, verbose: bool = True,
+                timings: dict | None = None, optimize: bool = True, raster: dict | None = None,
+                report=None, fetches: int = 0):
+    """
+    Render `input_path` into `output_filename` on an already-open page.
+    With `report` (the report the page is served as /report.json) the page
+    is checked to have rendered it before printing (verify_report();
+    fetches=-1 skips the /report.json check, see render_bundled()).
+    With `raster` (render_rasters() keyword arguments, e.g. {"fmt": "webp"})
+    PNG/WebP previews are written next to the PDF from the same page.
+    If `timings` is given, the seconds spent in each step are stored in it
+    under "emulate", "goto", "ready", "style", "pdf", "raster" and, with
+    PDF_POSTPROCESS=1, "postprocess"; with metrics enabled the same steps
+    are recorded as render.<step> spans. Returns postprocess()'s stats
+    (None with optimize=False, for parts that are merged and optimized later).
+    """
+    clock = time.perf_counter
+    mark = clock()
+
+    def lap(phase: str):
+        nonlocal mark
+        if timings is not None or metrics.enabled:
+            now = clock()
+            if timings is not None:
+                timings[phase] = now - mark
+            metrics.observe(f"render.{phase}", now - mark)
+            mark = now
+
+    listeners = []
+    if verbose:
+        listeners = [
+            # Log every request
+            ("request", lambda request: print(f"➡️ {request.method} {request.url}")),
+            # Log every response
+            ("response", lambda response: print(f"⬅️ {response.status} {response.url}")),
+            ("console", lambda msg: print(f"[browser console] {msg.type}: {msg.text}")),
+        ]
+        for event, handler in listeners:
+            page.on(event, handler)
+    try:
+        return _render_steps(page, input_path, output_filename, footer_tmpl, verbose, lap, optimize, raster,
+                             report, fetches)
+    finally:
+        # pages can outlive a render (hot swap, custom pools): don't leave our handlers on them
+        for event, handler in listeners:
+            page.remove_listener(event, handler)
+
+def _render_steps(page, input_path: str, output_filename: str, footer_tmpl: str, verbose: bool, lap,
+                  optimize: bool, raster: dict | None, report, fetches: int):
+    # 1. Emulate print so @page rules will be applied
+    page.emulate_media(media="print")
+    lap("emulate")
+
+    # 2. Navigate, then wait for the app to signal it has laid out the report
+    page.add_init_script(READY_SCRIPT)
+    page.goto(input_path, wait_until="domcontentloaded")
+    lap("goto")
+    ready = wait_ready(page)
+    if report is not None:
+        verify_report(page, report, fetches)
+    lap("ready")
+    metrics.current_job().set(ready=ready)
+    if verbose:
+        print(f"🟢 ready ({ready})")
+
+    # 3. Inject zero‑margin @page rules *after* navigation
+    page.add_style_tag(content=PRINT_CSS)
+    lap("style")
+
+    # 4. Export with zero margins
+    page.pdf(path=output_filename, **pdf_options(footer_tmpl))
+    lap("pdf")
+
+    # 5. Optional previews from the same page
+    if raster is not None:
+        render_rasters(page, os.path.splitext(output_filename)[0], **raster)
+        lap("raster")
+
+    # 6. Optional size optimization (off unless PDF_POSTPROCESS=1)
+    stats = postprocess(output_filename, verbose) if optimize else None
+    if stats is not None:
+        lap("postprocess")
+    return stats
+
+def render_report(page, input_path: str, report_json: str, output_filename: str, footer_tmpl: str,
+                  verbose: bool = True, timings: dict | None = None):
+    """
+    Like render_page(), but the app's fetch of /report.json is answered with
+    `report_json` (a file path), so one build of dist/ can render any report.
+    """
+    page.route("**/report.json", lambda route: route.fulfill(path=report_json))
+    with open(report_json, "rb") as f:
+        report = f.read()
+    render_page(page, input_path, output_filename, footer_tmpl, verbose, timings, report=report)
+
+def render_dist(page, report, output_filename: str, footer_tmpl: str, verbose: bool = True,
+                timings: dict | None = None, assets: DistAssets | None = None, optimize: bool = True,
+                raster: dict | None = None):
+    """
+    Render the in-memory build (get_assets() unless `assets` is given) with
+    `report` (dict, JSON text or bytes) served as its /report.json: no
+    server, no file:// and nothing read from disk per job. Raises
+    ReportMismatch for a build that doesn't fetch /report.json, or if the
+    page doesn't show `report` (verify_report()).
+    """
+    assets = assets or get_assets()
+    assets.require_report()
+    assets.attach(page, report)
+    return render_page(page, assets.url, output_filename, footer_tmpl, verbose, timings, optimize, raster,
+                       report=report)
+
+def render_bundled(page, report, output_filename: str, footer_tmpl: str, verbose: bool = True,
+                   timings: dict | None = None, assets: DistAssets | None = None, optimize: bool = True):
+    """
+    Render a build that has its report compiled in (DistAssets.reads_report
+    is false, like the committed dist/) as it is, the way the orchestrators
+    did before render_dist(). Nothing can be served to such a build, so the
+    page is only checked to show `report`'s participant; a report without a
+    participant name, or a page showing someone else, raises ReportMismatch.
+    """
+    if report_name(report) is None:
+        raise ReportMismatch("the build renders the report bundled into it, and the report has no "
+                             "participant name to check that against")
+    assets = assets or get_assets()
+    assets.attach(page)
+    return render_page(page, assets.url, output_filename, footer_tmpl, verbose, timings, optimize,
+                       report=report, fetches=-1)
+
+def main(input_path: str, output_filename: str, footer_tmpl: str, raster: dict | None = None):
+    # Runs on a warm browser from the pool; the page's context is closed afterwards
+    with metrics.job(kind="render", input=input_path, output=output_filename):
+        get_pool().run(render_page, input_path, output_filename, footer_tmpl, raster=raster)
 
 if __name__ == "__main__":
-    main()
+    # python generate_pdf.py [url] [output.pdf] [--raster png|webp [--full-page] [--dpi N] [--thumb-width PX]]
+    ap = argparse.ArgumentParser(description="Render the viewer to PDF (and optional PNG/WebP previews)")
+    ap.add_argument("url", nargs="?", default=DEFAULT_URL)
+    ap.add_argument("output", nargs="?", default=DEFAULT_OUTPUT)
+    ap.add_argument("--raster", choices=RASTER_FORMATS, help="also write previews in this format")
+    ap.add_argument("--full-page", action="store_true", help="one image of the whole document instead of one per A4 page")
+    ap.add_argument("--dpi", type=int, default=RASTER_DPI, help="preview resolution (default: $PDF_RASTER_DPI)")
+    ap.add_argument("--thumb-width", type=int, default=THUMB_WIDTH, help="thumbnail width in px, 0 for none")
+    args = ap.parse_args()
+
+    raster = None
+    if args.raster:
+        raster = {"fmt": args.raster, "per_page": not args.full_page, "dpi": args.dpi, "thumb_width": args.thumb_width}
+    main(args.url, args.output, FOOTER_TMPL, raster)
 
 
 
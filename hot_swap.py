@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+hot_swap.py
+
+Render many reports on one loaded page: navigate and boot the app once,
+then push each following report into the running page and print again.
+
+    session = HotSwapSession(page)            # page from a BrowserPool job
+    for report, output in jobs:
+        session.render(report, output)
+
+or, as a single pool job:
+
+    get_pool().run(render_swapped, [(report, "a.pdf"), (report2, "b.pdf")])
+
+The page-side hook is window.__swapReport(jsonText). If the app exposes
+window.setReport(data) (a setter for the state it fills from
+/report.json), the hook calls it and React re-renders in place. Otherwise
+the hook mounts a fresh copy of the app's entry module on a fresh #root;
+its fetch("/report.json") is answered in the page with the new data. Both
+skip navigation, HTML/CSS/image loading and the pool's per-job page setup;
+the fallback still evaluates the (memory-cached) bundle. Readiness after
+a swap uses the same protocol as a first render (generate_pdf.wait_ready).
+
+Module instances from the fallback are never freed by the browser, so the
+page is reloaded after `max_swaps` swaps (SWAP_MAX), and after any error.
+
+Every load and swap is checked before printing (generate_pdf.verify_report()):
+the page must have requested /report.json again (except through setReport)
+and show the new report's participant. A build that ignores /report.json
+is refused up front (DistAssets.require_report()).
+"""
+
+import os
+import time
+
+import metrics
+from dist_assets import DistAssets, report_body
+from generate_pdf import (FOOTER_TMPL, PRINT_CSS, READY_SCRIPT, get_assets, pdf_options, postprocess,
+                          render_rasters, verify_report, wait_ready)
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+SWAP_MAX = int(os.environ.get("PDF_SWAP_MAX", "100"))   # reload the page after this many swaps
+
+# Installed after READY_SCRIPT (it wraps the same fetch and uses __reportRearm)
+SWAP_SCRIPT = """
+(() => {
+  if (window.__swapReport) return;
+  let swaps = 0;
+  const fetch = window.fetch;
+  window.fetch = function (input, init) {
+    const url = new URL(input instanceof Request ? input.url : String(input), location.href);
+    if (window.__reportData !== undefined && url.pathname === "/report.json") {
+      window.__reportFetches++;
+      return Promise.resolve(new Response(window.__reportData, { headers: { "content-type": "application/json" } }));
+    }
+    return fetch.apply(this, arguments);
+  };
+  window.__swapReport = text => {
+    window.__reportData = text;
+    window.__reportRearm();
+    if (typeof window.setReport === "function") {
+      window.setReport(JSON.parse(text));
+      return "hook";
+    }
+    const root = document.getElementById("root");
+    root.replaceWith(root.cloneNode(false));
+    const src = document.querySelector('script[type="module"][src]').src;
+    return import(src + (src.includes("?") ? "&" : "?") + "swap=" + ++swaps).then(() => "remount");
+  };
+})();
+"""
+
+
+class HotSwapSession:
+    def __init__(self, page, assets: DistAssets | None = None, footer_tmpl: str = FOOTER_TMPL,
+                 max_swaps: int = SWAP_MAX, verbose: bool = False):
+        self.page      = page
+        self.assets    = assets or get_assets()
+        self.assets.require_report()
+        self.footer    = footer_tmpl
+        self.max_swaps = max_swaps
+        self.verbose   = verbose
+        self.loads     = 0
+        self.swaps     = 0       # since the last load
+        self._loaded   = False
+
+    def _load(self, body: bytes, lap):
+        # first report (or a recycle): a normal navigation with `body` as /report.json
+        if self.loads:
+            self.assets.detach(self.page)
+        self.assets.attach(self.page, body)
+        if not self.loads:
+            self.page.emulate_media(media="print")
+            self.page.add_init_script(READY_SCRIPT)
+            self.page.add_init_script(SWAP_SCRIPT)
+        self.page.goto(self.assets.url, wait_until="domcontentloaded")
+        lap("goto")
+        ready = wait_ready(self.page)
+        verify_report(self.page, body)
+        lap("ready")
+        self.page.add_style_tag(content=PRINT_CSS)
+        lap("style")
+        self.loads += 1
+        self.swaps = 0
+        self._loaded = True
+        return ready
+
+    def _swap(self, body: bytes, lap):
+        fetches = self.page.evaluate("() => window.__reportFetches")
+        how = self.page.evaluate("text => window.__swapReport(text)", body.decode("utf-8"))
+        lap("swap")
+        ready = wait_ready(self.page)
+        # setReport() hands the data over without a fetch; a remount has to fetch it again
+        verify_report(self.page, body, fetches if how == "remount" else -1)
+        lap("ready")
+        self.swaps += 1
+        metrics.count("hot_swaps", mode=how)
+        return ready
+
+    def render(self, report, output: str, timings: dict | None = None, raster: dict | None = None) -> str:
+        """
+        Print `report` (dict, JSON text or bytes) to `output`; returns how
+        readiness was reached. Phases go to `timings` / render.<phase> spans
+        as in generate_pdf.render_page(): "goto", "ready", "style" on a
+        load, "swap", "ready" on a swap, then "pdf" (and "raster",
+        "postprocess"). `raster` is as in render_page().
+        """
+        clock = time.perf_counter
+        mark = clock()
+
+        def lap(phase: str):
+            nonlocal mark
+            now = clock()
+            if timings is not None:
+                timings[phase] = now - mark
+            metrics.observe(f"render.{phase}", now - mark)
+            mark = now
+
+        body = report_body(report)
+        try:
+            if not self._loaded or self.swaps >= self.max_swaps:
+                ready = self._load(body, lap)
+            else:
+                ready = self._swap(body, lap)
+            self.page.pdf(path=output, **pdf_options(self.footer))
+            lap("pdf")
+            if raster is not None:
+                render_rasters(self.page, os.path.splitext(output)[0], **raster)
+                lap("raster")
+            if postprocess(output) is not None:
+                lap("postprocess")
+        except Exception:
+            self._loaded = False        # start over from a navigation next time
+            raise
+        metrics.current_job().set(ready=ready)
+        if self.verbose:
+            print(f"✅ {output} ({'swap' if self.swaps else 'load'}, ready: {ready})")
+        return ready
+
+
+def render_swapped(page, jobs, footer_tmpl: str = FOOTER_TMPL, assets: DistAssets | None = None,
+                   verbose: bool = False) -> list[str | None]:
+    """
+    Pool job: render every (report, output) in `jobs` on this one page.
+    Returns one error string (None on success) per job; a failed job
+    doesn't stop the rest.
+    """
+    session = HotSwapSession(page, assets, footer_tmpl, verbose=verbose)
+    errors = []
+    for report, output in jobs:
+        with metrics.job(kind="render", output=output, mode="swap") as record:
+            try:
+                session.render(report, output)
+                errors.append(None)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                record.set(error=errors[-1])
+    return errors
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+image_assets.py
+
+Print-optimized variants of the raster images in dist/.
+
+The viewer ships its lifestyle cards as 500-740 KB RGBA PNGs that are
+fully opaque. Chromium decodes each of them on every render, and every PDF
+embeds them again as Flate-compressed RGB. This step re-encodes every
+raster image of at least MIN_BYTES, in its own format:
+
+- scaled down to at most MAX_PX on its long side (A4 width at PRINT_DPI),
+  so no image carries more pixels than a printed page can show
+- opaque PNGs drop their alpha channel and are quantized to PNG_COLORS
+  colours (dithered; PDF_IMAGE_COLORS=0 keeps them truecolor), images
+  with real transparency stay optimized RGBA PNGs
+- JPEGs are re-encoded at JPEG_QUALITY
+- a variant is only used when it is at least MIN_SAVING smaller
+
+The format never changes because dist_assets.DistAssets serves each
+variant under the original URL (the bundle builds image paths at runtime,
+e.g. `./${title}.png`), so the built JS and CSS don't change and a .png
+URL always answers with image/png.
+
+Variants are cached on disk by a hash of the source bytes and the settings
+(<cache>/<key[:2]>/<key>.<ext>), so a build runs once per changed image.
+Only a cache miss needs Pillow, which is optional
+(requirements-optional.txt); without it the originals are served and a
+warning is printed once per process.
+
+    python image_assets.py [dist] [--cache DIR]     # build / warm the cache, print savings
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import sys
+import tempfile
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+CACHE_DIR    = os.environ.get("PDF_IMAGE_CACHE", os.path.join(".cache", "print-images"))
+PRINT_DPI    = int(os.environ.get("PDF_IMAGE_DPI", "300"))
+MAX_PX       = round(8.27 * PRINT_DPI)    # A4 width in inches
+PNG_COLORS   = int(os.environ.get("PDF_IMAGE_COLORS", "256"))  # opaque PNGs; 0 keeps truecolor
+JPEG_QUALITY = int(os.environ.get("PDF_IMAGE_QUALITY", "85"))
+MIN_BYTES    = 32 * 1024                  # leave icons and small images alone
+MIN_SAVING   = 0.10                       # variant must be >= 10% smaller than the source
+VERSION      = "2"                        # bump when the encoding below changes
+RASTER_TYPES = {"image/png": ".png", "image/jpeg": ".jpg"}
+KEEP         = ".keep"                    # empty cache entry: the source is already good enough
+
+_warned = False                           # missing Pillow / unreadable image, reported once
+
+
+def _require_pillow():
+    try:
+        from PIL import Image
+    except ImportError:
+        raise ValueError("print-optimized images need Pillow (pip install -r requirements-optional.txt)") from None
+    return Image
+
+def cache_key(body: bytes) -> str:
+    h = hashlib.sha256()
+    h.update(f"{VERSION}\0{MAX_PX}\0{PNG_COLORS}\0{JPEG_QUALITY}\0".encode())
+    h.update(body)
+    return h.hexdigest()
+
+def encode(body: bytes) -> tuple[bytes, str]:
+    """Re-encode one image for print, keeping its format; returns (bytes, content type)."""
+    Image = _require_pillow()
+    with Image.open(io.BytesIO(body)) as img:
+        img.load()
+        fmt = img.format
+        if max(img.size) > MAX_PX:
+            img.thumbnail((MAX_PX, MAX_PX), Image.LANCZOS)
+        out = io.BytesIO()
+        if fmt == "JPEG":
+            img.convert("RGB").save(out, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=False)
+            return out.getvalue(), "image/jpeg"
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        if has_alpha:
+            alpha = img.convert("RGBA").getchannel("A")
+            has_alpha = alpha.getextrema()[0] < 255
+        if not has_alpha:
+            img = img.convert("RGB")
+            if PNG_COLORS:
+                img = img.quantize(PNG_COLORS, dither=Image.Dither.FLOYDSTEINBERG)
+        img.save(out, "PNG", optimize=True)
+        return out.getvalue(), "image/png"
+
+# —— CACHE ——————————————————————————————————————————————————————————————
+def _cached(cache_dir: str, key: str) -> tuple[bytes, str] | None:
+    for ctype, ext in [*RASTER_TYPES.items(), ("", KEEP)]:
+        path = os.path.join(cache_dir, key[:2], key + ext)
+        try:
+            with open(path, "rb") as f:
+                return f.read(), ctype
+        except FileNotFoundError:
+            continue
+    return None
+
+def _store(cache_dir: str, key: str, body: bytes, ctype: str):
+    shard = os.path.join(cache_dir, key[:2])
+    os.makedirs(shard, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=shard, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(body)
+    os.replace(tmp, os.path.join(shard, key + RASTER_TYPES.get(ctype, KEEP)))
+
+def print_variant(body: bytes, cache_dir: str = CACHE_DIR) -> tuple[bytes, str] | None:
+    """Cached print variant of `body`, or None if re-encoding doesn't pay off."""
+    key = cache_key(body)
+    hit = _cached(cache_dir, key)
+    if hit is None:
+        hit = encode(body)
+        if len(hit[0]) > len(body) * (1 - MIN_SAVING):
+            hit = (b"", "")
+        _store(cache_dir, key, *hit)
+    return hit if hit[1] else None
+
+def print_variants(files: dict, cache_dir: str = CACHE_DIR) -> dict:
+    """
+    {url path: Asset} replacements for the raster images in `files` (a
+    DistAssets.files dict). Without Pillow, images missing from the cache
+    keep their original bytes.
+    """
+    global _warned
+    from dist_assets import Asset
+    variants, skipped = {}, []
+    for path, asset in files.items():
+        if asset.content_type not in RASTER_TYPES or len(asset.body) < MIN_BYTES:
+            continue
+        try:
+            hit = print_variant(asset.body, cache_dir)
+        except (ValueError, OSError) as e:      # no Pillow, or an image it can't read
+            skipped.append((path, e))
+            continue
+        if hit is not None and hit[1] == asset.content_type:     # never a different type under the URL
+            variants[path] = Asset.from_bytes(*hit)
+    if skipped and not _warned:
+        _warned = True
+        print(f"⚠️  {len(skipped)} image(s) served as built ({skipped[0][0]}: {skipped[0][1]})", file=sys.stderr)
+    return variants
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Build print-optimized variants of the images in dist/")
+    ap.add_argument("directory", nargs="?", default="dist", help="built viewer directory")
+    ap.add_argument("--cache", default=CACHE_DIR, help="variant cache directory (default: $PDF_IMAGE_CACHE)")
+    args = ap.parse_args()
+
+    from dist_assets import DistAssets
+    assets = DistAssets(args.directory, print_images=False)
+    try:
+        _require_pillow()
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    variants = print_variants(assets.files, args.cache)
+
+    before = after = 0
+    for path, variant in sorted(variants.items()):
+        source = assets.files[path]
+        before += len(source.body)
+        after += len(variant.body)
+        print(f"🖼️  {path}: {len(source.body) / 1024:.0f} KB -> {len(variant.body) / 1024:.0f} KB ({variant.content_type})")
+    print(f"✅ {len(variants)} image(s), {before / 1024:.0f} KB -> {after / 1024:.0f} KB, cached in {args.cache}")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+incremental_render.py
+
+Re-render only the sections of a report that changed since the last
+render for the same participant, and splice them with the cached pages of
+the rest.
+
+    stats = render_incremental(report, "out/jane-doe.pdf")     # report: dict, JSON text or bytes
+    python incremental_render.py report.json out.pdf [--participant KEY]
+
+Every top-level section of report.json (preface, healthReport, actionPlan,
+lifestyle, nutrition, currentMedication, cognitiveFunction) is rendered as
+its own part, through the in-memory build (generate_pdf.render_dist), with
+a report.json that holds only that section. The parts concatenated in
+report order are the full document only if the viewer renders just the
+sections in the report.json it is served and starts each of them on a new
+page. Neither can be checked from here, so it is a requirement on the
+build. Parts are cached per participant:
+
+    <cache>/<participant>/<section>-<sha256(section JSON)[:16]>.pdf
+    <cache>/<participant>/manifest.json      build id, section digests, page counts
+
+On the next render of that participant, sections whose JSON is unchanged
+reuse their part. Changed sections are rendered in parallel on the
+browser pool, and the parts are merged into `output` with the page
+numbers stamped across the whole document (pdf_merge.py: parts are
+rendered with FOOTER_TMPL minus its "n / N" line, which merge() draws).
+Editing actionPlan.medications re-renders only actionPlan's pages.
+
+A new dist/ build (DistAssets.build_id) or footer discards all parts.
+The participant defaults to a sha256 of the name and clinic in
+preface.header (participant_key()), never the name itself.
+
+A build that ignores /report.json would repeat its own whole document in
+every part. render_incremental() refuses such a build before touching the
+cache (DistAssets.require_report(): the committed dist/ is one). Every
+part is also checked to have fetched its report.json before it is printed
+and cached (generate_pdf.verify_report()).
+
+Needs pikepdf for the merge (pip install pikepdf).
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import metrics
+from dist_assets import DistAssets, ReportMismatch, report_body
+from generate_pdf import FOOTER_TMPL, get_assets, get_pool, postprocess, render_dist
+from pdf_merge import merge, unnumbered_footer
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+CACHE_DIR      = os.environ.get("REPORT_SECTION_CACHE", os.path.join(".cache", "sections"))
+VERSION        = "1"                             # bump when part rendering changes
+SECTION_FOOTER = unnumbered_footer(FOOTER_TMPL)
+MANIFEST       = "manifest.json"
+KEY_CHARS      = 32                              # of the participant hash used as directory name
+
+
+def participant_key(report: dict) -> str:
+    """
+    Cache directory name for the participant a report belongs to: a hash of
+    the normalized name and clinic, so no patient name ends up in paths,
+    logs or backups.
+    """
+    header = report.get("preface", {}).get("header", {})
+    name = "\0".join(" ".join(str(header.get(k, "")).lower().split()) for k in ("name", "clinic"))
+    if not name.strip("\0"):
+        raise ValueError("report has no preface.header name; pass a participant key")
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()[:KEY_CHARS]
+
+def section_digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def build_key(assets: DistAssets, footer_tmpl: str = SECTION_FOOTER) -> str:
+    return hashlib.sha256(f"{VERSION}\0{assets.build_id}\0{footer_tmpl}".encode("utf-8")).hexdigest()
+
+# —— CACHE ——————————————————————————————————————————————————————————————
+def _load_manifest(folder: str) -> dict:
+    try:
+        with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_manifest(folder: str, manifest: dict):
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(folder, MANIFEST))
+
+def render_part(page, sections: dict, path: str, assets: DistAssets | None = None):
+    """Pool job: render a report made of just `sections` into the part PDF `path`."""
+    # written next to its final name and moved into place only once complete
+    tmp = path + ".tmp"
+    render_dist(page, sections, tmp, SECTION_FOOTER, verbose=False, assets=assets, optimize=False)
+    os.replace(tmp, path)
+
+# —— RENDERING ——————————————————————————————————————————————————————————
+def render_incremental(report, output: str, participant: str | None = None, cache_dir: str = CACHE_DIR,
+                       assets: DistAssets | None = None, verbose: bool = True) -> dict:
+    """
+    Render `report` into `output`, reusing the parts of unchanged sections.
+    Returns {"participant", "rendered", "reused", "pages", "seconds"}.
+    """
+    started = time.perf_counter()
+    report = json.loads(report_body(report))
+    if not report:
+        raise ValueError("report has no sections")
+    assets = assets or get_assets()
+    assets.require_report()
+    participant = participant or participant_key(report)
+    folder = os.path.join(cache_dir, participant)
+    os.makedirs(folder, exist_ok=True)
+
+    with metrics.job(kind="render", output=output, mode="incremental") as record, \
+            open(os.path.join(folder, ".lock"), "w") as lock:
+        # one render per participant at a time: the parts directory is pruned below
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        build = build_key(assets)
+        manifest = _load_manifest(folder)
+        if manifest.get("build") != build:
+            manifest = {}       # new build or footer: every part is stale
+
+        digests, parts, jobs = {}, [], {}
+        pool = get_pool()
+        for name, value in report.items():
+            digests[name] = section_digest(value)
+            path = os.path.join(folder, f"{name}-{digests[name][:16]}.pdf")
+            parts.append(path)
+            if manifest.get("sections", {}).get(name) != digests[name] or not os.path.exists(path):
+                jobs[name] = pool.submit(render_part, {name: value}, path, assets)
+        with metrics.span("render.sections"):
+            errors = []
+            for name, future in jobs.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {type(e).__name__}: {e}")
+            if errors:
+                raise RuntimeError("section render failed: " + "; ".join(errors))
+
+        counts = merge(parts, output)
+        postprocess(output, verbose)
+
+        keep = {os.path.basename(p) for p in parts}
+        for entry in os.listdir(folder):
+            if entry.endswith(".pdf") and entry not in keep:
+                os.unlink(os.path.join(folder, entry))
+        _save_manifest(folder, {"build": build, "sections": digests,
+                                "pages": dict(zip(report, counts))})
+
+        rendered = list(jobs)
+        reused = [name for name in report if name not in jobs]
+        metrics.count("sections_rendered", len(rendered))
+        metrics.count("sections_reused", len(reused))
+        record.set(rendered=len(rendered), reused=len(reused), pages=sum(counts))
+
+    stats = {"participant": participant, "rendered": rendered, "reused": reused,
+             "pages": sum(counts), "seconds": time.perf_counter() - started}
+    if verbose:
+        print(f"✅ {output}: {stats['pages']} pages, re-rendered {', '.join(rendered) or 'nothing'} "
+              f"({len(reused)} section(s) reused) in {stats['seconds']:.2f}s")
+    return stats
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Render a report, re-rendering only the sections that changed")
+    ap.add_argument("input", help="report.json (or participant .html, extracted first)")
+    ap.add_argument("output", help="output PDF")
+    ap.add_argument("--participant", help="cache key (default: a hash of preface.header name and clinic)")
+    ap.add_argument("--cache", default=CACHE_DIR, help="parts cache directory (default: $REPORT_SECTION_CACHE)")
+    args = ap.parse_args()
+
+    if args.input.lower().endswith((".html", ".htm")):
+        from extract import extract_text
+        text = extract_text(args.input)
+    else:
+        with open(args.input, encoding="utf-8") as f:
+            text = f.read()
+    try:
+        render_incremental(text, args.output, args.participant, args.cache)
+    except (ValueError, ReportMismatch) as e:
+        sys.exit(f"❌ {e}")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+memwatch.py
+
+Per-job memory accounting for long-running workers, the limits that tell
+a worker to recycle, and the leak report built from the accounting.
+
+    tracker = MemoryTracker(pool, "batch_output/memory.jsonl")
+    with tracker.job(input=path):
+        ...                              # one report
+    reason = tracker.over_limit()        # "jobs", "rss" or None
+
+    python memwatch.py batch_output/memory.jsonl
+
+Each job appends one JSONL line: the resident memory of this Python
+process and of its browser process tree (BrowserPool.rss()) after the
+job, and how much each grew during it. Every worker process writes to the
+same file (O_APPEND keeps lines whole). over_limit() reports "jobs" after
+MAX_JOBS jobs (max_jobs=0 leaves that to the caller, e.g. batch.py's
+process pool). Past MAX_RSS_MB it first collects garbage and returns freed
+heap to the OS (malloc_trim), and reports "rss" only if that didn't bring
+the process back under the limit. The caller then retires the worker
+between jobs (batch.py). Browser trees already recycle themselves in
+BrowserPool (PDF_POOL_MAX_RSS_MB).
+
+leak_report() summarizes a file per process: RSS at the first and last
+job and the growth per job, as the least-squares slope of RSS over job
+number, plus the jobs with the largest deltas. A steady slope over
+hundreds of jobs is a leak. A few large early deltas are usually caches
+and allocator arenas warming up.
+"""
+
+import argparse
+import ctypes
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+import procinfo
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+MAX_RSS_MB = int(os.environ.get("REPORT_WORKER_MAX_RSS_MB", "1024"))   # Python process, per worker
+MAX_JOBS   = int(os.environ.get("REPORT_WORKER_MAX_JOBS", "1000"))     # reports per worker process
+TOP_JOBS   = 10
+MB         = 1024 * 1024
+
+try:
+    _malloc_trim = ctypes.CDLL("libc.so.6").malloc_trim
+except (OSError, AttributeError):   # not glibc
+    _malloc_trim = None
+
+
+def python_rss() -> int:
+    return procinfo.process_rss(os.getpid())
+
+def trim() -> int:
+    """Collect garbage and hand free heap back to the OS; returns the RSS afterwards."""
+    gc.collect()
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+    return python_rss()
+
+
+class MemoryTracker:
+    def __init__(self, pool=None, path: str | None = None, max_rss_mb: int = MAX_RSS_MB, max_jobs: int = MAX_JOBS):
+        self.pool       = pool        # BrowserPool whose process trees are measured, if any
+        self.path       = path
+        self.max_rss    = max_rss_mb * MB
+        self.max_jobs   = max_jobs
+        self.jobs       = 0
+        self.trims      = 0
+        self._lock      = threading.Lock()
+
+    def sample(self) -> tuple[int, int]:
+        """(Python RSS, browser tree RSS) in bytes."""
+        return python_rss(), self.pool.rss() if self.pool is not None else 0
+
+    @contextmanager
+    def job(self, **fields):
+        """Measure one job; `fields` (input path, ...) go into its JSONL line."""
+        py_before, browser_before = self.sample()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            py_after, browser_after = self.sample()
+            with self._lock:
+                self.jobs += 1
+                record = {
+                    "pid": os.getpid(), "job": self.jobs, **fields,
+                    "seconds": round(time.perf_counter() - started, 4),
+                    "py_rss": py_after, "py_delta": py_after - py_before,
+                    "browser_rss": browser_after, "browser_delta": browser_after - browser_before,
+                }
+            metrics.current_job().set(py_rss=py_after, py_delta=record["py_delta"],
+                                      browser_delta=record["browser_delta"])
+            if self.path:
+                line = json.dumps(record, ensure_ascii=False) + "\n"
+                with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    def over_limit(self) -> str | None:
+        """Why this worker should be recycled ("jobs", "rss"), or None; tries trim() first."""
+        if self.max_jobs and self.jobs >= self.max_jobs:
+            return "jobs"
+        if python_rss() > self.max_rss:
+            self.trims += 1
+            metrics.count("memory_trims")
+            if trim() > self.max_rss:
+                return "rss"
+        return None
+
+# —— LEAK REPORT ——————————————————————————————————————————————————————————
+def _slope(points: list[tuple[int, int]]) -> float:
+    """Least-squares bytes per job."""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    var = sum((x - mx) ** 2 for x, _ in points)
+    return sum((x - mx) * (y - my) for x, y in points) / var if var else 0.0
+
+def leak_report(path: str, top: int = TOP_JOBS) -> dict:
+    """Summary of a MemoryTracker JSONL file (see the module docstring)."""
+    by_pid = {}
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                records.append(rec)
+                by_pid.setdefault(rec["pid"], []).append(rec)
+
+    processes = {}
+    for pid, recs in by_pid.items():
+        recs.sort(key=lambda r: r["job"])
+        processes[pid] = {
+            "jobs": len(recs),
+            "py_rss_first_mb": round(recs[0]["py_rss"] / MB, 1),
+            "py_rss_last_mb": round(recs[-1]["py_rss"] / MB, 1),
+            "py_kb_per_job": round(_slope([(r["job"], r["py_rss"]) for r in recs]) / 1024, 1),
+            "browser_rss_last_mb": round(recs[-1]["browser_rss"] / MB, 1),
+            "browser_kb_per_job": round(_slope([(r["job"], r["browser_rss"]) for r in recs]) / 1024, 1),
+        }
+    largest = sorted(records, key=lambda r: r["py_delta"], reverse=True)[:top]
+    return {
+        "jobs": len(records),
+        "processes": processes,
+        "largest_py_deltas": [
+            {k: r.get(k) for k in ("pid", "job", "input", "py_delta", "browser_delta")} for r in largest
+        ],
+    }
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarize per-job memory deltas (leak report)")
+    ap.add_argument("path", help="memory JSONL written by MemoryTracker")
+    ap.add_argument("--top", type=int, default=TOP_JOBS, help="jobs with the largest deltas to list")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args()
+
+    try:
+        report = leak_report(args.path, args.top)
+    except FileNotFoundError as e:
+        sys.exit(f"❌ {e}")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        sys.exit(0)
+    print(f"📊 {report['jobs']} jobs in {len(report['processes'])} process(es)")
+    for pid, p in report["processes"].items():
+        print(f"  pid {pid}: {p['jobs']} jobs, python {p['py_rss_first_mb']} -> {p['py_rss_last_mb']} MB "
+              f"({p['py_kb_per_job']:+} KB/job), browser {p['browser_rss_last_mb']} MB "
+              f"({p['browser_kb_per_job']:+} KB/job)")
+    for r in report["largest_py_deltas"]:
+        print(f"  {r['py_delta'] / 1024:+.0f} KB  pid {r['pid']} job {r['job']}  {r.get('input') or ''}")
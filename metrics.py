@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+metrics.py
+
+Named spans and counters for the extract and render hot paths, exported
+as a Prometheus text file and as one JSON line per job.
+
+    with metrics.job(kind="extract", input=path):     # one JSONL record
+        with metrics.span("parse"):
+            soup = parse_html(raw)
+        metrics.count("cache_misses")
+
+Instrumentation is off unless REPORT_METRICS_PROM and/or
+REPORT_METRICS_JSONL is set (or enable() is called); while it is off,
+span() hands back one shared no-op context manager and count()/observe()
+return immediately, so the instrumented code pays a function call per
+span and nothing else.
+
+- spans feed a process-wide histogram per name (report_span_seconds) and,
+  inside a job, the job's own {span: seconds} record
+- the current job travels in a contextvar, so spans recorded on another
+  thread (BrowserPool runs jobs in the caller's context) or in an asyncio
+  task still land in the right record; a job opened inside another job
+  joins it instead of starting a new record
+- REPORT_METRICS_PROM is rewritten atomically at most every
+  REPORT_METRICS_INTERVAL seconds and at exit; a "{pid}" in the path is
+  replaced so every worker process of batch.py writes its own file for
+  node_exporter's textfile collector
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+PROM_PATH     = os.environ.get("REPORT_METRICS_PROM")
+JSONL_PATH    = os.environ.get("REPORT_METRICS_JSONL")
+PROM_INTERVAL = float(os.environ.get("REPORT_METRICS_INTERVAL", "10"))
+PREFIX        = "report"
+BUCKETS       = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+enabled = bool(PROM_PATH or JSONL_PATH)
+
+_lock       = threading.Lock()
+_histograms = {}   # span name -> [bucket counts..., +Inf count, sum]
+_counters   = {}   # (name, ((label, value), ...)) -> value
+_last_prom  = 0.0
+_current    = contextvars.ContextVar("metrics_job", default=None)
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+_NOOP = _Noop()
+
+# —— RECORDING ———————————————————————————————————————————————————————————
+def observe(name: str, seconds: float):
+    """Record one duration for span `name`."""
+    if not enabled:
+        return
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = [0] * (len(BUCKETS) + 2)
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        h[i] += 1
+        h[-1] += seconds
+    record = _current.get()
+    if record is not None:
+        record.spans[name] = record.spans.get(name, 0.0) + seconds
+
+def count(name: str, n: float = 1, **labels):
+    """Increment counter `name` (exported as <PREFIX>_<name>_total)."""
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+    record = _current.get()
+    if record is not None:
+        label = ",".join(f"{k}={v}" for k, v in key[1])
+        record_key = f"{name}{{{label}}}" if label else name
+        record.counters[record_key] = record.counters.get(record_key, 0) + n
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def span(name: str):
+    """Context manager timing the enclosed block as span `name`."""
+    return _Span(name) if enabled else _NOOP
+
+# —— JOBS ———————————————————————————————————————————————————————————————
+class _Job:
+    def __init__(self, fields: dict):
+        self.fields = fields
+        self.spans = {}
+        self.counters = {}
+        self._token = None
+
+    def set(self, **fields):
+        """Add fields (output path, cache hit, error, ...) to the job's JSON line."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        seconds = time.perf_counter() - self._start
+        kind = self.fields.get("kind", "job")
+        if exc_type is not None:
+            self.fields.setdefault("error", f"{exc_type.__name__}: {exc}")
+        if self.fields.get("error"):
+            count("failures", kind=kind)
+        count("jobs", kind=kind)
+        observe(f"job.{kind}", seconds)
+        if JSONL_PATH:
+            _write_jsonl({
+                "ts": round(time.time(), 3),
+                "pid": os.getpid(),
+                **self.fields,
+                "seconds": round(seconds, 6),
+                "spans": {k: round(v, 6) for k, v in self.spans.items()},
+                "counters": self.counters,
+            })
+        maybe_write_prometheus()
+        return False
+
+class _JoinedJob(_Noop):
+    """A job opened inside another job: its fields are merged into the outer record."""
+    __slots__ = ("outer",)
+
+    def __init__(self, outer: _Job, fields: dict):
+        self.outer = outer
+        for k, v in fields.items():
+            outer.fields.setdefault(k, v)
+
+    def set(self, **fields):
+        self.outer.set(**fields)
+
+def job(**fields):
+    """Context manager for one unit of work (one report extracted, one PDF rendered, ...)."""
+    if not enabled:
+        return _NOOP
+    outer = _current.get()
+    if outer is not None:
+        return _JoinedJob(outer, fields)
+    return _Job(dict(fields))
+
+def current_job():
+    """The job record spans are currently attributed to, if any (supports .set())."""
+    return _current.get() or _NOOP
+
+# —— EXPORT —————————————————————————————————————————————————————————————
+def _write_jsonl(record: dict):
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _lock:
+        # O_APPEND: lines from concurrent worker processes don't interleave
+        with open(JSONL_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def snapshot() -> dict:
+    """Current histograms and counters as plain data."""
+    with _lock:
+        spans = {
+            name: {
+                "count": sum(h[:-1]),
+                "sum_s": round(h[-1], 6),
+                "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], h[:-1])),
+            }
+            for name, h in _histograms.items()
+        }
+        counters = {
+            name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else ""): value
+            for (name, labels), value in _counters.items()
+        }
+    return {"spans": spans, "counters": counters}
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + body + "}"
+
+def prometheus_text() -> str:
+    """Prometheus text exposition format of everything recorded so far."""
+    lines = []
+    with _lock:
+        if _histograms:
+            metric = f"{PREFIX}_span_seconds"
+            lines += [f"# HELP {metric} Time spent in instrumented spans.", f"# TYPE {metric} histogram"]
+            for name in sorted(_histograms):
+                h = _histograms[name]
+                cumulative = 0
+                for bound, n in zip([*map(str, BUCKETS), "+Inf"], h[:-1]):
+                    cumulative += n
+                    lines.append(f"{metric}_bucket{_labels([('span', name), ('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_sum{_labels([('span', name)])} {h[-1]:.6f}")
+                lines.append(f"{metric}_count{_labels([('span', name)])} {cumulative}")
+        by_name = {}
+        for (name, labels), value in _counters.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            metric = f"{PREFIX}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{metric}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path: str | None = None):
+    """Atomically (re)write the Prometheus text file."""
+    global _last_prom
+    path = (path or PROM_PATH).replace("{pid}", str(os.getpid()))
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # node_exporter's textfile collector reads every *.prom in the directory: the temp
+    # file must not match, and the result must be readable by the collector's user
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".prom.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _last_prom = time.monotonic()
+
+def maybe_write_prometheus():
+    if PROM_PATH and time.monotonic() - _last_prom >= PROM_INTERVAL:
+        write_prometheus()
+
+def enable(prom_path: str | None = None, jsonl_path: str | None = None):
+    """Turn instrumentation on at runtime (e.g. from a CLI flag)."""
+    global enabled, PROM_PATH, JSONL_PATH
+    PROM_PATH = prom_path or PROM_PATH
+    JSONL_PATH = jsonl_path or JSONL_PATH
+    enabled = True
+
+def _flush_at_exit():
+    if enabled and PROM_PATH:
+        try:
+            write_prometheus()
+        except OSError:
+            pass
+
+atexit.register(_flush_at_exit)
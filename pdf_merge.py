@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+pdf_merge.py
+
+Concatenate separately rendered parts of one report into a single PDF and
+number its pages across the parts.
+
+    merge(["preface.pdf", "healthReport.pdf", ...], "report.pdf")
+    python pdf_merge.py out.pdf part1.pdf part2.pdf ...
+
+Chromium fills FOOTER_TMPL's <span class="pageNumber"> / <span
+class="totalPages"> per page.pdf() call, so a part rendered on its own
+would count from 1 to its own length. Parts are therefore rendered with
+unnumbered_footer(), which keeps the footer and the height of its number
+line but leaves the numbers out, and merge() stamps "n / N" on every page
+of the result where Chromium draws it (centred, baseline NUMBER_BASELINE
+pt from the bottom, NUMBER_SIZE pt, footer grey), in Helvetica, which is
+one of the standard PDF fonts, so nothing is embedded.
+
+Identical images in different parts are merged (pdf_optimize.dedupe), and
+the result is written atomically. Needs pikepdf (pip install pikepdf).
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from contextlib import ExitStack
+
+import metrics
+from pdf_optimize import dedupe, require_pikepdf
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+# where Chromium draws FOOTER_TMPL's 9px page number line on an A4 page
+NUMBER_BASELINE = 16.17
+NUMBER_SIZE     = 6.75
+NUMBER_COLOR    = (0x6B / 255, 0x72 / 255, 0x80 / 255)    # #6B7280
+NUMBER_FONT     = "/ReportPageNumber"
+# Helvetica advance widths (1/1000 em) of the characters in "12 / 34"
+HELVETICA_WIDTHS = {**dict.fromkeys("0123456789", 556), " ": 278, "/": 278}
+
+NUMBERS = re.compile(r'<span class="pageNumber"></span>\s*/\s*<span class="totalPages"></span>')
+
+
+def unnumbered_footer(footer_tmpl: str) -> str:
+    """`footer_tmpl` without the page number spans (the line keeps its height)."""
+    footer, n = NUMBERS.subn("&nbsp;", footer_tmpl)
+    if not n:
+        raise ValueError("footer template has no pageNumber / totalPages line to replace")
+    return footer
+
+def stamp_page_numbers(pdf):
+    """Draw "n / N" on every page of `pdf` (a pikepdf.Pdf)."""
+    pikepdf = require_pikepdf()
+    font = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.Font, Subtype=pikepdf.Name.Type1,
+        BaseFont=pikepdf.Name.Helvetica, Encoding=pikepdf.Name.WinAnsiEncoding,
+    ))
+    total = len(pdf.pages)
+    r, g, b = NUMBER_COLOR
+    for n, page in enumerate(pdf.pages, 1):
+        page.add_resource(font, pikepdf.Name.Font, pikepdf.Name(NUMBER_FONT))
+        text = f"{n} / {total}"
+        width = sum(HELVETICA_WIDTHS[c] for c in text) * NUMBER_SIZE / 1000
+        box = page.mediabox
+        x = float(box[0]) + (float(box[2]) - float(box[0]) - width) / 2
+        y = float(box[1]) + NUMBER_BASELINE
+        # the page's own content is wrapped in q/Q so its graphics state can't leak into ours
+        page.contents_add(pdf.make_stream(b"q\n"), prepend=True)
+        page.contents_add(pdf.make_stream(
+            f"Q\nq BT {NUMBER_FONT} {NUMBER_SIZE} Tf {r:.4f} {g:.4f} {b:.4f} rg "
+            f"{x:.2f} {y:.2f} Td ({text}) Tj ET Q\n".encode("ascii")))
+
+def merge(parts: list[str], output: str, number: bool = True) -> list[int]:
+    """
+    Write the pages of `parts`, in order, to `output` (stamping page
+    numbers unless `number` is False). Returns the page count of each part.
+    """
+    pikepdf = require_pikepdf()
+    with metrics.span("pdf.merge"), ExitStack() as stack:
+        merged = stack.enter_context(pikepdf.new())
+        counts = []
+        for part in parts:
+            src = stack.enter_context(pikepdf.open(part))   # pages stay linked to it until save
+            merged.pages.extend(src.pages)
+            counts.append(len(src.pages))
+        dedupe(merged)
+        if number:
+            stamp_page_numbers(merged)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), prefix=".tmp-", suffix=".pdf")
+        os.close(fd)
+        try:
+            merged.save(tmp, compress_streams=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+        except Exception:
+            os.unlink(tmp)
+            raise
+    os.replace(tmp, output)
+    metrics.count("pdf_parts_merged", len(parts))
+    return counts
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Concatenate report parts into one PDF with page numbers")
+    ap.add_argument("output", help="merged PDF")
+    ap.add_argument("parts", nargs="+", help="part PDFs, in order")
+    ap.add_argument("--no-numbers", action="store_true", help="don't stamp page numbers")
+    args = ap.parse_args()
+
+    try:
+        counts = merge(args.parts, args.output, number=not args.no_numbers)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
+    print(f"✅ {args.output}: {sum(counts)} pages from {len(counts)} part(s)")
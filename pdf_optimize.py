@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+pdf_optimize.py
+
+Optional post-processing of the PDFs Chromium writes.
+
+    python pdf_optimize.py out/*.pdf [--linearize]
+
+For each document:
+
+- identical image XObjects and embedded font programs (same stream
+  dictionary, same bytes) are merged into one object and every reference
+  is pointed at it
+- identical /Font and /FontDescriptor dictionaries are merged the same
+  way (Skia writes one per page group), after which unreferenced copies
+  are dropped on save
+- Flate streams are recompressed at the highest level and objects are
+  packed into compressed object streams
+- optionally the file is linearized ("fast web view")
+
+Chromium already embeds fonts as subsets of the glyphs used, so no
+further subsetting is done here. The result replaces the input only
+when it is smaller (or linearization was asked for), and optimize_pdf()
+reports the bytes saved.
+
+Needs pikepdf (requirements-optional.txt), which is optional: the render path
+only imports it when PDF_POSTPROCESS=1 (see generate_pdf.postprocess).
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import metrics
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+FONT_FILES    = ("/FontFile", "/FontFile2", "/FontFile3")
+FLATE_LEVEL   = 9
+DEFAULT_FLATE = -1        # zlib's default, what pikepdf starts with (it has no getter)
+
+_flate_lock = threading.Lock()
+
+
+def require_pikepdf():
+    """The pikepdf module, or ValueError saying how to install it."""
+    try:
+        import pikepdf
+    except ImportError:
+        raise ValueError("PDF post-processing needs pikepdf (pip install -r requirements-optional.txt)") from None
+    return pikepdf
+
+@contextmanager
+def flate_level(pikepdf, level: int = FLATE_LEVEL):
+    """
+    Flate level for saves inside the block. pikepdf only has a process-wide
+    setting, so concurrent optimize_pdf() calls are serialized here and the
+    default is put back afterwards for every other save in the process
+    (pdf_merge, ...).
+    """
+    with _flate_lock:
+        pikepdf.settings.set_flate_compression_level(level)
+        try:
+            yield
+        finally:
+            pikepdf.settings.set_flate_compression_level(DEFAULT_FLATE)
+
+# —— DEDUPLICATION ————————————————————————————————————————————————————————
+def _digest(pikepdf, obj) -> str:
+    h = hashlib.sha256()
+    for key in sorted(obj.keys()):
+        if key != "/Length":
+            h.update(key.encode())
+            h.update(repr(obj[key]).encode())
+    if isinstance(obj, pikepdf.Stream):
+        h.update(b"\0")
+        h.update(obj.read_raw_bytes())
+    return h.hexdigest()
+
+def _shared_objects(pikepdf, pdf) -> list:
+    """Streams and dictionaries that are worth merging when identical."""
+    font_files = set()
+    for obj in pdf.objects:
+        if isinstance(obj, pikepdf.Dictionary) and obj.get("/Type") == "/FontDescriptor":
+            for key in FONT_FILES:
+                if key in obj:
+                    font_files.add(obj[key].objgen)
+    shared = []
+    for obj in pdf.objects:
+        if not obj.is_indirect:
+            continue
+        if isinstance(obj, pikepdf.Stream):
+            if obj.get("/Subtype") == "/Image" or obj.objgen in font_files:
+                shared.append(obj)
+        elif isinstance(obj, pikepdf.Dictionary) and obj.get("/Type") in ("/Font", "/FontDescriptor"):
+            shared.append(obj)
+    return shared
+
+def _repoint(pikepdf, container, replace: dict) -> int:
+    """Swap references to duplicates inside one dictionary/array (not recursing into indirect objects)."""
+    n = 0
+    items = container.items() if isinstance(container, (pikepdf.Dictionary, pikepdf.Stream)) else enumerate(container)
+    for key, value in list(items):
+        if not isinstance(value, pikepdf.Object):
+            continue                    # ints, names etc. come back as Python values
+        if value.is_indirect:
+            canonical = replace.get(value.objgen)
+            if canonical is not None:
+                container[key] = canonical
+                n += 1
+        elif isinstance(value, (pikepdf.Dictionary, pikepdf.Array)):
+            n += _repoint(pikepdf, value, replace)
+    return n
+
+def dedupe(pdf) -> int:
+    """Merge identical images, font programs and font dictionaries; returns references repointed."""
+    pikepdf = require_pikepdf()
+    total = 0
+    # font programs first, so descriptors that differed only in their FontFile reference become equal
+    for round_ in ("streams", "dicts"):
+        seen, replace = {}, {}
+        for obj in _shared_objects(pikepdf, pdf):
+            if (round_ == "streams") != isinstance(obj, pikepdf.Stream):
+                continue
+            canonical = seen.setdefault(_digest(pikepdf, obj), obj)
+            if canonical.objgen != obj.objgen:
+                replace[obj.objgen] = canonical
+        if not replace:
+            continue
+        for obj in pdf.objects:
+            if isinstance(obj, (pikepdf.Dictionary, pikepdf.Stream, pikepdf.Array)):
+                total += _repoint(pikepdf, obj, replace)
+    return total
+
+# —— OPTIMIZE ————————————————————————————————————————————————————————————
+def optimize_pdf(path: str, output: str | None = None, linearize: bool = False) -> dict:
+    """
+    Optimize `path` into `output` (default: in place, atomically). Returns
+    {"before", "after", "saved", "deduped", "replaced"}; the input is kept
+    as is if optimizing didn't make it smaller and linearize is off.
+    """
+    pikepdf = require_pikepdf()
+    output = output or path
+    before = os.path.getsize(path)
+    with metrics.span("pdf.optimize"):
+        with pikepdf.open(path) as pdf:
+            deduped = dedupe(pdf)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output)), prefix=".tmp-", suffix=".pdf")
+            os.close(fd)
+            try:
+                with flate_level(pikepdf):
+                    pdf.save(
+                        tmp,
+                        compress_streams=True,
+                        recompress_flate=True,
+                        object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                        linearize=linearize,
+                    )
+            except Exception:
+                os.unlink(tmp)
+                raise
+        after = os.path.getsize(tmp)
+        replaced = linearize or after < before
+        if replaced:
+            os.replace(tmp, output)
+        else:
+            os.unlink(tmp)
+            after = before
+            if output != path:
+                with open(path, "rb") as src, open(output, "wb") as dst:
+                    dst.write(src.read())
+    saved = before - after
+    metrics.count("pdf_bytes_saved", saved)
+    return {"before": before, "after": after, "saved": saved, "deduped": deduped, "replaced": replaced}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Recompress and deduplicate rendered PDFs in place")
+    ap.add_argument("inputs", nargs="+", help="PDF files")
+    ap.add_argument("--linearize", action="store_true", help="also linearize (fast web view)")
+    args = ap.parse_args()
+
+    before = after = 0
+    for path in args.inputs:
+        try:
+            stats = optimize_pdf(path, linearize=args.linearize)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        before += stats["before"]
+        after += stats["after"]
+        pct = stats["saved"] / stats["before"] * 100 if stats["before"] else 0
+        print(f"📄 {path}: {stats['before'] / 1024:.0f} KB -> {stats['after'] / 1024:.0f} KB "
+              f"(-{pct:.1f}%, {stats['deduped']} duplicate reference(s) merged)")
+    print(f"✅ {len(args.inputs)} PDF(s), {(before - after) / 1024:.0f} KB saved")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+procinfo.py
+
+Small /proc helpers for measuring resident memory of the renderer
+processes. Linux only (which is what the Docker image runs); on other
+platforms every lookup returns 0 / [] so callers simply skip
+memory-based decisions.
+"""
+
+import os
+
+PROC_DIR  = "/proc"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# /proc/<pid>/task/<tid>/children needs CONFIG_PROC_CHILDREN; without it trees are found from a scan
+HAS_CHILDREN = os.path.exists(f"{PROC_DIR}/{os.getpid()}/task/{os.getpid()}/children")
+
+
+def _read(path: str) -> bytes:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def _all_pids() -> list[int]:
+    try:
+        return [int(p) for p in os.listdir(PROC_DIR) if p.isdigit()]
+    except OSError:
+        return []
+
+
+def process_rss(pid: int) -> int:
+    """Resident set size of a single process in bytes (0 if unknown)."""
+    statm = _read(f"{PROC_DIR}/{pid}/statm").split()
+    if len(statm) < 2:
+        return 0
+    return int(statm[1]) * PAGE_SIZE
+
+
+def parent_map() -> dict[int, int]:
+    """pid -> ppid for every visible process."""
+    parents = {}
+    for pid in _all_pids():
+        stat = _read(f"{PROC_DIR}/{pid}/stat")
+        # comm can contain spaces/parens, the fields we want follow the last ')'
+        rest = stat[stat.rfind(b")") + 2:].split()
+        if len(rest) >= 2:
+            parents[pid] = int(rest[1])
+    return parents
+
+
+def descendants(root: int, parents: dict[int, int] | None = None) -> list[int]:
+    """All pids below `root` in the process tree (root excluded)."""
+    parents = parent_map() if parents is None else parents
+    children: dict[int, list[int]] = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+    out, stack = [], list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        out.append(pid)
+        stack.extend(children.get(pid, []))
+    return out
+
+
+def children(pid: int) -> list[int]:
+    """Direct children of `pid`, from the children file of each of its threads (needs HAS_CHILDREN)."""
+    try:
+        tasks = os.listdir(f"{PROC_DIR}/{pid}/task")
+    except OSError:
+        return []
+    return [int(c) for tid in tasks for c in _read(f"{PROC_DIR}/{pid}/task/{tid}/children").split()]
+
+
+def tree_pids(root: int) -> list[int]:
+    """
+    `root` and all of its descendants. Walks the children files from
+    `root` down where the kernel has them, otherwise reads the stat of
+    every process once (parent_map()).
+    """
+    if not HAS_CHILDREN:
+        return [root, *descendants(root)]
+    out, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        out.append(pid)
+        stack.extend(children(pid))
+    return out
+
+
+def find_pids(marker: str) -> list[int]:
+    """Pids whose command line contains `marker`."""
+    needle = marker.encode()
+    return [pid for pid in _all_pids() if needle in _read(f"{PROC_DIR}/{pid}/cmdline")]
+
+
+def tree_rss(root: int, parents: dict[int, int] | None = None) -> int:
+    """RSS of `root` plus all of its descendants, in bytes."""
+    return process_rss(root) + sum(process_rss(p) for p in descendants(root, parents))
+
+
+def has_marker(pid: int, marker: str) -> bool:
+    """Whether `pid` still runs with `marker` on its command line (False once it's gone or reused)."""
+    return marker.encode() in _read(f"{PROC_DIR}/{pid}/cmdline")
+
+
+def marked_roots(marker: str, parents: dict[int, int] | None = None) -> list[int]:
+    """Pids carrying `marker` whose parent doesn't: the roots of the marked process trees."""
+    parents = parent_map() if parents is None else parents
+    roots = find_pids(marker)
+    # a marked child of a marked root (zygotes copy argv) must not be counted twice
+    marked = set(roots)
+    return [p for p in roots if parents.get(p) not in marked]
+
+
+def marked_tree_rss(marker: str) -> int:
+    """
+    RSS of every process tree whose root carries `marker` on its command
+    line. Used for Chromium, where we tag the browser process with a
+    unique switch at launch and then sum it with its renderer/gpu children.
+    This scans all of /proc; BrowserPool keeps the roots it found at launch
+    and only walks their trees (tree_pids()).
+    """
+    parents = parent_map()
+    return sum(tree_rss(r, parents) for r in marked_roots(marker, parents))
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+render_service.py
+
+Long-running render service: a local HTTP API in front of a persistent
+job queue, drained by warm extraction and render workers.
+
+    python render_service.py [--host 127.0.0.1] [--port 8080] [--dir service_data]
+
+    POST /jobs                 body: participant HTML (text/html) or report.json
+                               (application/json) -> 202 {"id", "status", ...}
+    GET  /jobs/<id>            job status and timings
+    GET  /jobs/<id>/pdf        the finished PDF (409 until done)
+    GET  /jobs/<id>/report.json
+    GET  /stats                queue depth per status, wait/total latency p50/p95
+    GET  /metrics              Prometheus text (metrics.py plus queue depth)
+    GET  /healthz
+
+Jobs live in SQLite (<dir>/jobs.db, WAL) with their input and outputs in
+<dir>/jobs/<id>/, so queued work survives a restart; jobs that were
+running when the service stopped are queued again on startup, unless
+they have already been started MAX_ATTEMPTS times (a job that kills the
+service every time it runs is failed instead of looping forever), and
+finished jobs are deleted after KEEP_HOURS, checked every PURGE_SECONDS. WORKERS threads claim jobs oldest
+first. Extraction runs in a process pool whose processes import bs4/lxml
+once (EXTRACT_WORKERS), rendering goes through the shared warm
+BrowserPool with dist/ served from memory (generate_pdf.render_dist). Submissions beyond MAX_QUEUED get 503 with
+Retry-After, so a burst from the portal queues up to a bound instead of
+piling onto Chromium. The service won't start with a viewer build that
+doesn't fetch /report.json (DistAssets.require_report()), since every job
+would get the PDF of the report bundled into it.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from dist_assets import ReportMismatch
+from generate_pdf import FOOTER_TMPL, POOL_SIZE, get_assets, get_pool, render_dist
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+SERVICE_DIR     = os.environ.get("REPORT_SERVICE_DIR", "service_data")
+HOST            = os.environ.get("REPORT_SERVICE_HOST", "127.0.0.1")
+PORT            = int(os.environ.get("REPORT_SERVICE_PORT", "8080"))
+WORKERS         = int(os.environ.get("REPORT_SERVICE_WORKERS", str(2 * POOL_SIZE)))   # jobs in flight
+EXTRACT_WORKERS = int(os.environ.get("REPORT_SERVICE_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+MAX_QUEUED      = int(os.environ.get("REPORT_SERVICE_MAX_QUEUED", "1000"))
+MAX_BODY_BYTES  = int(os.environ.get("REPORT_SERVICE_MAX_BODY_MB", "64")) * 1024 * 1024
+KEEP_HOURS      = float(os.environ.get("REPORT_SERVICE_KEEP_HOURS", "24"))   # finished jobs; 0 keeps all
+PURGE_SECONDS   = 600                     # how often expired jobs are deleted
+MAX_ATTEMPTS    = int(os.environ.get("REPORT_SERVICE_MAX_ATTEMPTS", "3"))     # starts per job, across restarts
+STATS_WINDOW    = 500                     # finished jobs the latency stats are computed over
+STATUSES        = ("queued", "running", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    kind      TEXT NOT NULL,              -- "html" or "json"
+    status    TEXT NOT NULL,
+    created   REAL NOT NULL,
+    started   REAL,
+    finished  REAL,
+    extract_s REAL,
+    render_s  REAL,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    error     TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+"""
+
+# —— QUEUE ——————————————————————————————————————————————————————————————
+class JobStore:
+    """SQLite-backed job queue; every method is safe to call from any thread."""
+
+    def __init__(self, directory: str = SERVICE_DIR):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(os.path.join(self.directory, "jobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "jobs.db"), check_same_thread=False,
+                                   isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        columns = {r["name"] for r in self._db.execute("PRAGMA table_info(jobs)")}
+        if "max_attempts" not in columns:      # database from before the attempt cap
+            self._db.execute(f"ALTER TABLE jobs ADD COLUMN max_attempts INTEGER NOT NULL DEFAULT {MAX_ATTEMPTS}")
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # jobs interrupted by a stop/crash start over, until they have used up their attempts
+        self._db.execute(
+            "UPDATE jobs SET status = 'failed', finished = ?, error = 'interrupted ' || attempts || ' time(s), "
+            "giving up' WHERE status = 'running' AND attempts >= max_attempts", (time.time(),))
+        self._db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.directory, "jobs", job_id)
+
+    def paths(self, job_id: str) -> dict:
+        d = self.job_dir(job_id)
+        return {"html": os.path.join(d, "input.html"), "json": os.path.join(d, "report.json"),
+                "pdf": os.path.join(d, "report.pdf")}
+
+    def submit(self, kind: str, body: bytes, max_attempts: int = MAX_ATTEMPTS) -> dict:
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        with open(self.paths(job_id)[kind], "wb") as f:
+            f.write(body)
+        with self._wakeup:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, status, created, max_attempts) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, time.time(), max_attempts))
+            self._wakeup.notify()
+        metrics.count("service_submitted", kind=kind)
+        return self.get(job_id)
+
+    def claim(self, timeout: float = 1.0) -> sqlite3.Row | None:
+        """Oldest queued job, marked running; waits up to `timeout` for one to arrive."""
+        with self._wakeup:
+            row = self._next()
+            if row is None and self._wakeup.wait(timeout):
+                row = self._next()
+            return row
+
+    def _next(self):
+        row = self._db.execute(
+            "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1").fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                         (time.time(), row["id"]))
+        return row
+
+    def finish(self, job_id: str, error: str | None = None, **timings):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, finished = ?, error = ?, extract_s = ?, render_s = ? WHERE id = ?",
+                ("failed" if error else "done", time.time(), error,
+                 timings.get("extract_s"), timings.get("render_s"), job_id))
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def queued(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs (rows and files) that finished before `older_than` (epoch seconds)."""
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (older_than,))]
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+        for job_id in ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(ids)
+
+    def depth(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+    def recent(self, limit: int = STATS_WINDOW) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = 'done' ORDER BY finished DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+# —— WORKERS —————————————————————————————————————————————————————————————
+def _extract(html_path: str, json_path: str) -> str:
+    # runs in an extraction worker process (imports stay warm between jobs)
+    from extract import main as extract
+    return extract(html_path, json_path)
+
+class Workers:
+    def __init__(self, store: JobStore, workers: int = WORKERS, extract_workers: int = EXTRACT_WORKERS):
+        self.store = store
+        self.extract_pool = ProcessPoolExecutor(max_workers=extract_workers)
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._loop, name=f"render-worker-{i}", daemon=True)
+                         for i in range(workers)]
+        if KEEP_HOURS:
+            self._threads.append(threading.Thread(target=self._purge_loop, name="purge", daemon=True))
+
+    def start(self):
+        get_assets().require_report()   # load dist/ (and image variants) before the first job
+        get_pool()                      # ...and launch the browsers
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+        self.extract_pool.shutdown()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            row = self.store.claim()
+            if row is not None:
+                self._run(row)
+
+    def _purge_loop(self):
+        # on a timer, so expired jobs go even while the queue never runs dry
+        while True:
+            removed = self.store.purge(time.time() - KEEP_HOURS * 3600)
+            if removed:
+                metrics.count("service_purged", removed)
+            if self._stop.wait(PURGE_SECONDS):
+                return
+
+    def _run(self, row):
+        job_id, paths, timings, error = row["id"], self.store.paths(row["id"]), {}, None
+        with metrics.job(kind="service", id=job_id, input_kind=row["kind"]) as record:
+            try:
+                start = time.perf_counter()
+                if row["kind"] == "html":
+                    text = self.extract_pool.submit(_extract, paths["html"], paths["json"]).result()
+                    timings["extract_s"] = time.perf_counter() - start
+                else:
+                    with open(paths["json"], "rb") as f:
+                        text = f.read()
+                start = time.perf_counter()
+                get_pool().run(render_dist, text, paths["pdf"], FOOTER_TMPL, False)
+                timings["render_s"] = time.perf_counter() - start
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                record.set(error=error)
+        self.store.finish(job_id, error, **timings)
+        metrics.count("service_finished", status="failed" if error else "done")
+
+# —— STATS ——————————————————————————————————————————————————————————————
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "p50_s": round(values[len(values) // 2], 3),
+        "p95_s": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max_s": round(values[-1], 3),
+    }
+
+def stats(store: JobStore) -> dict:
+    recent = store.recent()
+    return {
+        "depth": store.depth(),
+        "workers": WORKERS,
+        "latency": {
+            "wait": _percentiles([j["started"] - j["created"] for j in recent]),
+            "extract": _percentiles([j["extract_s"] for j in recent if j["extract_s"] is not None]),
+            "render": _percentiles([j["render_s"] for j in recent if j["render_s"] is not None]),
+            "total": _percentiles([j["finished"] - j["created"] for j in recent]),
+        },
+    }
+
+# —— HTTP API ———————————————————————————————————————————————————————————
+_JOB_PATH = re.compile(r"^/jobs/([0-9a-f]{32})(/pdf|/report\.json)?$")
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ReportService/1.0"
+    store: JobStore = None
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, obj, headers=()):
+        self._send(status, json.dumps(obj, indent=2).encode("utf-8"), headers=headers)
+
+    def _file(self, path: str, content_type: str):
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            self.wfile.flush()
+            self.connection.sendfile(f)
+
+    def _job_view(self, job: dict) -> dict:
+        view = dict(job)
+        if job["status"] == "done":
+            view["pdf"] = f"/jobs/{job['id']}/pdf"
+        return view
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+        length = int(self.headers.get("Content-Length") or 0)
+        if not 0 < length <= MAX_BODY_BYTES:
+            return self._json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length else HTTPStatus.BAD_REQUEST,
+                              {"error": f"body must be 1..{MAX_BODY_BYTES} bytes"})
+        body = self.rfile.read(length)
+        kind = "json" if "json" in self.headers.get("Content-Type", "") else "html"
+        if kind == "json":
+            try:
+                json.loads(body)
+            except ValueError as e:
+                return self._json(HTTPStatus.BAD_REQUEST, {"error": f"invalid report JSON: {e}"})
+        if self.store.queued() >= MAX_QUEUED:
+            metrics.count("service_rejected")
+            return self._json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "queue full"}, [("Retry-After", "5")])
+        job = self.store.submit(kind, body)
+        self._json(HTTPStatus.ACCEPTED, self._job_view(job), [("Location", f"/jobs/{job['id']}")])
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/healthz":
+            return self._json(HTTPStatus.OK, {"ok": True})
+        if path == "/stats":
+            return self._json(HTTPStatus.OK, stats(self.store))
+        if path == "/metrics":
+            depth = self.store.depth()
+            lines = [f"# TYPE {metrics.PREFIX}_queue_jobs gauge"]
+            lines += [f'{metrics.PREFIX}_queue_jobs{{status="{s}"}} {n}' for s, n in depth.items()]
+            body = metrics.prometheus_text() + "\n".join(lines) + "\n"
+            return self._send(HTTPStatus.OK, body.encode("utf-8"), "text/plain; version=0.0.4")
+        m = _JOB_PATH.match(path)
+        job = self.store.get(m.group(1)) if m else None
+        if job is None:
+            return self._json(HTTPStatus.NOT_FOUND, {"error": "no such job"})
+        if not m.group(2):
+            return self._json(HTTPStatus.OK, self._job_view(job))
+        want = "pdf" if m.group(2) == "/pdf" else "json"
+        file_path = self.store.paths(job["id"])[want]
+        if job["status"] != "done" or not os.path.exists(file_path):
+            return self._json(HTTPStatus.CONFLICT, {"error": f"job is {job['status']}", "status": job["status"]})
+        self._file(file_path, "application/pdf" if want == "pdf" else "application/json")
+
+    def log_message(self, fmt, *args):
+        pass
+
+def serve(host: str = HOST, port: int = PORT, directory: str = SERVICE_DIR, workers: int = WORKERS):
+    metrics.enable()      # /metrics reports from memory even without REPORT_METRICS_* files
+    store = JobStore(directory)
+    pool = Workers(store, workers)
+    pool.start()
+    handler = type("Handler", (_Handler,), {"store": store})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    print(f"🚀 Render service on http://{host}:{port} ({workers} workers, queue in {store.directory})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        pool.stop()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="HTTP job queue for report extraction and rendering")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--dir", default=SERVICE_DIR, help="queue database and job files")
+    ap.add_argument("-w", "--workers", type=int, default=WORKERS, help="jobs processed concurrently")
+    args = ap.parse_args()
+    try:
+        serve(args.host, args.port, args.dir, args.workers)
+    except ReportMismatch as e:
+        sys.exit(f"❌ {e}")
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+report_daemon.py
+
+Resident worker for one-off extractions and renders, plus the thin client
+that talks to it.
+
+    python report_daemon.py serve &                          # start the daemon
+    python report_daemon.py extract report.html [report.json]
+    python report_daemon.py render report.html out.pdf       # .html is extracted first
+    python report_daemon.py render report.json out.pdf
+    python report_daemon.py ping | stop
+
+A cold `python extract.py` + `python generate_pdf.py` pays for importing
+bs4/lxml/Playwright, reading dist/ and launching Chromium on every call.
+The daemon does that once: it imports the extractor, loads dist/ into
+memory (generate_pdf.get_assets) and starts the warm BrowserPool
+(generate_pdf.get_pool), then answers requests on a Unix socket
+(SOCKET_PATH, mode 0600). A render is then one extraction plus one page
+from a warm browser. Like render_service, the daemon won't start with a
+viewer build that doesn't fetch /report.json (DistAssets.require_report()).
+
+The client side of this module imports only the standard library. If no
+daemon is listening (no socket, or a stale one), or with --local, the
+request runs in-process through the same handle() the daemon uses, so
+output is identical either way, just slower.
+
+Protocol: one JSON object per line each way, one request per connection:
+{"cmd": "extract" | "render" | "ping" | "stop", ...} ->
+{"ok": true, ...} or {"ok": false, "error": "..."}. Paths are made
+absolute by the client, since the daemon's cwd may differ.
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+SOCKET_PATH = os.environ.get("REPORT_DAEMON_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"report-daemon-{os.getuid()}.sock")
+TIMEOUT     = float(os.environ.get("REPORT_DAEMON_TIMEOUT", "300"))   # seconds per request
+HTML_EXTS   = (".html", ".htm")
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket."""
+
+# —— REQUESTS (shared by the daemon and the in-process fallback) ————————————
+def _report_text(path: str, parser: str | None = None, spec: bool = False) -> str:
+    from extract import extract_text
+    if path.lower().endswith(HTML_EXTS):
+        return extract_text(path, parser, spec=spec)
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def handle(request: dict) -> dict:
+    """Run one request and return its response (never raises)."""
+    cmd = request.get("cmd")
+    started = time.perf_counter()
+    try:
+        if cmd == "ping":
+            response = {"pid": os.getpid()}
+        elif cmd == "extract":
+            text = _report_text(request["input"], request.get("parser"), request.get("spec", False))
+            if request.get("output"):
+                with open(request["output"], "w", encoding="utf-8") as out:
+                    out.write(text)
+                response = {"output": request["output"]}
+            else:
+                response = {"text": text}
+        elif cmd == "render":
+            import metrics
+            from generate_pdf import FOOTER_TMPL, get_pool, render_dist
+            with metrics.job(kind="render", input=request["input"], output=request["output"], mode="daemon"):
+                text = _report_text(request["input"], request.get("parser"), request.get("spec", False))
+                timings = {}
+                get_pool().run(render_dist, text.encode("utf-8"), request["output"], FOOTER_TMPL,
+                               verbose=False, timings=timings)
+                response = {"output": request["output"], "timings": timings}
+        else:
+            raise ValueError(f"unknown command {cmd!r}")
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {"ok": True, "seconds": round(time.perf_counter() - started, 4), **response}
+
+# —— DAEMON —————————————————————————————————————————————————————————————
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"ok": False, "error": f"bad request: {e}"}
+        else:
+            if request.get("cmd") == "stop":
+                response = {"ok": True, "pid": os.getpid()}
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                response = handle(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def _listening(path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            s.connect(path)
+        return True
+    except OSError:
+        return False
+
+def serve(path: str = SOCKET_PATH):
+    """Warm everything up, then answer requests on `path` until stopped."""
+    if _listening(path):
+        sys.exit(f"❌ a daemon is already listening on {path}")
+    if os.path.exists(path):
+        os.unlink(path)                 # left behind by a daemon that was killed
+
+    started = time.perf_counter()
+    import extract                      # noqa: F401  bs4/lxml and the extractor, imported once
+    from generate_pdf import get_assets, get_pool
+    from dist_assets import ReportMismatch
+    assets = get_assets()               # dist/ (and print image variants) in memory
+    try:
+        assets.require_report()         # a bundled report would be in every PDF
+    except ReportMismatch as e:
+        sys.exit(f"❌ {e}")
+    get_pool()                          # Chromium launched and kept warm
+    print(f"🔥 warm in {time.perf_counter() - started:.2f}s ({len(assets.files)} dist files, "
+          f"{assets.total_bytes / 1024:.0f} KB)")
+
+    old_umask = os.umask(0o177)         # socket is rw for this user only
+    try:
+        server = _Server(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"🚀 listening on {path} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        print("👋 daemon stopped")
+
+# —— CLIENT —————————————————————————————————————————————————————————————
+def send(request: dict, path: str = SOCKET_PATH, timeout: float = TIMEOUT) -> dict:
+    """Send one request to the daemon; raises DaemonUnavailable if none is listening."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        try:
+            s.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonUnavailable(f"no daemon on {path}") from e
+        s.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with s.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError(f"daemon on {path} closed the connection")
+    return json.loads(line)
+
+def run(request: dict, path: str = SOCKET_PATH, local: bool = False) -> tuple[dict, bool]:
+    """Send `request` to the daemon, or handle it in-process if none is running; returns (response, remote)."""
+    if not local:
+        try:
+            return send(request, path), True
+        except DaemonUnavailable:
+            pass
+    return handle(request), False
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Resident extract/render daemon and its client")
+    ap.add_argument("--socket", default=SOCKET_PATH, help="Unix socket (default: $REPORT_DAEMON_SOCKET)")
+    ap.add_argument("--local", action="store_true", help="don't use the daemon, run in this process")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("serve", help="start the daemon in the foreground")
+    sub.add_parser("ping", help="check whether the daemon is running")
+    sub.add_parser("stop", help="stop the daemon")
+    p = sub.add_parser("extract", help="participant .html -> report.json")
+    p.add_argument("input")
+    p.add_argument("output", nargs="?", help="output .json (default: stdout)")
+    p.add_argument("--parser", help="BeautifulSoup tree builder")
+    p.add_argument("--spec", action="store_true", help="use the declarative extraction plan")
+    p = sub.add_parser("render", help="participant .html or report.json -> PDF")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--parser", help="BeautifulSoup tree builder")
+    p.add_argument("--spec", action="store_true", help="use the declarative extraction plan")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        serve(args.socket)
+        sys.exit(0)
+    if args.cmd in ("ping", "stop"):
+        try:
+            response = send({"cmd": args.cmd}, args.socket, timeout=5)
+        except DaemonUnavailable as e:
+            sys.exit(f"❌ {e}")
+        print(f"{'🟢 running' if args.cmd == 'ping' else '🛑 stopping'} (pid {response['pid']})")
+        sys.exit(0)
+
+    request = {"cmd": args.cmd, "input": os.path.abspath(args.input),
+               "output": os.path.abspath(args.output) if args.output else None,
+               "parser": args.parser, "spec": args.spec}
+    response, remote = run(request, args.socket, args.local)
+    if not response["ok"]:
+        sys.exit(f"❌ {response['error']}")
+    if "text" in response:
+        sys.stdout.write(response["text"])
+    via = "daemon" if remote else "in-process"
+    print(f"✅ {args.cmd}: {response['seconds']:.2f}s ({via})", file=sys.stderr)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+section_split.py
+
+Split a participant report at its section anchors and extract the
+sections in parallel.
+
+The report is a sequence of independent blocks (`#Participant`,
+`#Purpose`, `#YourStatus`, `#ActionPlan`, `#ShdMrpLifestyle`,
+`#ShdMrpNewDiet`, `#Medications`, `#OutOfRange`, ...). One regex pass
+over the raw bytes finds where each anchor's start tag begins; every
+top-level report.json section is then parsed from just the byte ranges
+it needs (plus the document <head> for the charset) instead of the whole
+file. Fragments are extracted in worker processes and merged back in
+report.json order:
+
+    report = extract_parallel(raw)          # same dict as extract_report(raw)
+
+If an anchor is missing (unexpected template), that section falls back to
+extraction from the full document.
+
+Only lxml (SPLIT_PARSERS) parses a fragment exactly as it parses the same
+markup in place. html.parser carries state across the document: after a
+bare <br>, the next <br /> is left open and swallows the elements that
+follow it, so a section cut away from the earlier <br> can come out
+different. For other parsers extract_parallel() parses the whole document
+once, in this process.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# —— SECTION MAP ——————————————————————————————————————————————————————————
+# report.json section -> [(first anchor id, anchor id that ends the range), ...]
+HEADER_RANGE = ("Participant", "Purpose")
+SECTION_RANGES = {
+    "preface":           [HEADER_RANGE, ("Purpose", "YourStatus")],
+    "healthReport":      [HEADER_RANGE, ("YourStatus", "ActionPlan")],
+    "actionPlan":        [("ActionPlan", "ShdMrpLifestyle")],
+    "lifestyle":         [("ShdMrpLifestyle", "ShdMrpNewDiet")],
+    "nutrition":         [("ShdMrpNewDiet", "ReportedProblems")],
+    "currentMedication": [("Medications", "Allergies")],
+    "cognitiveFunction": [("OutOfRange", "AhdStopbang")],
+}
+
+_ANCHOR = re.compile(rb'<(?:div|h[1-3])\b[^>]*?\bid\s*=\s*["\']([^"\']+)["\']', re.I)
+_BODY   = re.compile(rb"<body\b[^>]*>", re.I)
+
+WORKERS       = min(len(SECTION_RANGES), os.cpu_count() or 1)
+SPLIT_PARSERS = ("lxml",)   # tree builders whose fragment parses match the full parse
+
+
+def find_anchors(raw: bytes) -> dict[str, int]:
+    """Byte offset of the first start tag carrying each id."""
+    anchors = {}
+    for m in _ANCHOR.finditer(raw):
+        anchors.setdefault(m.group(1).decode("ascii", "replace"), m.start())
+    return anchors
+
+def section_fragments(raw: bytes, anchors: dict[str, int] | None = None) -> dict[str, bytes | None]:
+    """
+    Minimal standalone document for every section, or None where an anchor
+    is missing and the section has to be extracted from the full report.
+    """
+    anchors = find_anchors(raw) if anchors is None else anchors
+    body = _BODY.search(raw)
+    head = raw[:body.end()] if body else b""
+    out = {}
+    for section, ranges in SECTION_RANGES.items():
+        parts = []
+        for start_id, end_id in ranges:
+            start, end = anchors.get(start_id), anchors.get(end_id)
+            if start is None or end is None or end <= start:
+                parts = None
+                break
+            parts.append(raw[start:end])
+        out[section] = head + b"".join(parts) + b"</body></html>" if parts is not None else None
+    return out
+
+# —— PARALLEL EXTRACTION ——————————————————————————————————————————————————
+def extract_section(section: str, doc: bytes, parser: str | None = None):
+    """Parse `doc` (a fragment or the full report) and run one section's extractor."""
+    from extract import SECTIONS, DocumentIndex, parse_html
+    index = DocumentIndex(parse_html(doc, parser))
+    try:
+        return SECTIONS[section](index)
+    finally:
+        index.close()
+
+_executor = None
+
+def get_executor(workers: int = WORKERS) -> ProcessPoolExecutor:
+    """Long-lived worker pool, so interactive callers don't pay process start-up per report."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=workers)
+    return _executor
+
+def splits(parser: str | None = None) -> bool:
+    """Whether `parser` (None: extract.PARSER) can extract sections from fragments."""
+    from extract import PARSER
+    return (parser or PARSER) in SPLIT_PARSERS
+
+def extract_parallel(raw: bytes, parser: str | None = None,
+                     executor: ProcessPoolExecutor | None = None) -> dict:
+    """Extract every section of one report concurrently; same result as extract.extract_report."""
+    if not splits(parser):
+        from extract import extract_report
+        return extract_report(raw, parser)
+    executor = executor or get_executor()
+    fragments = section_fragments(raw)
+    futures = {
+        section: executor.submit(extract_section, section, frag if frag is not None else raw, parser)
+        for section, frag in fragments.items()
+    }
+    # dict order follows SECTION_RANGES, i.e. report.json order
+    return {section: fut.result() for section, fut in futures.items()}
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+static_server.py
+
+Threaded static file server for dist/, replacing
+HTTPServer + SimpleHTTPRequestHandler + os.chdir + time.sleep(1).
+
+    server = StaticServer("dist", port=5173).start()   # returns once it accepts connections
+    ...
+    server.stop()
+
+    python static_server.py [dist] [--host 0.0.0.0] [--port 5173]
+
+- serves from an absolute root: the process cwd is never changed, and
+  paths that resolve outside the root are 404s
+- one thread per connection (ThreadingHTTPServer) with HTTP/1.1
+  keep-alive, so parallel renders don't queue behind each other
+- files up to CACHE_MAX_BYTES, and JS/CSS/HTML/JSON/SVG up to
+  COMPRESS_MAX_BYTES, are held in memory, the compressible ones along
+  with gzip (and, if the brotli package is installed, br) encodings;
+  each request stats the file and reloads it if it changed
+- other large files (the PNGs) are streamed with socket.sendfile()
+  (os.sendfile where available)
+- ETag / If-None-Match -> 304, with a distinct ETag per encoding
+  ("...-gz", "...-br") and Vary: Accept-Encoding on every response for a
+  compressible file, so caches never swap one encoding for another
+- the encoding follows the q-values in Accept-Encoding: q=0 refuses a
+  coding, "*" stands for any coding not listed, br wins a tie, and a
+  client that accepts neither gets the identity body
+- hashed /assets/* are cached as immutable, everything else must
+  revalidate
+- start() binds before returning and waits for the serving thread
+  (`ready` event), so callers need no sleep; port=0 picks a free port
+"""
+
+import argparse
+import gzip
+import os
+import posixpath
+import threading
+from dataclasses import dataclass
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from dist_assets import content_type
+
+try:
+    import brotli
+except ImportError:   # optional: gzip only
+    brotli = None
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+DIST_DIR           = "dist"
+HOST, PORT         = "0.0.0.0", 5173
+CACHE_MAX_BYTES    = 256 * 1024          # bigger files are sent with sendfile instead of cached...
+COMPRESS_MAX_BYTES = 16 * 1024 * 1024    # ...unless they are compressible
+COMPRESS_MIN       = 1024
+COMPRESSIBLE       = ("text/", "application/json", "image/svg+xml")
+IMMUTABLE_DIR      = "/assets/"          # content-hashed file names from the Vite build
+READY_TIMEOUT      = 5.0
+ENCODING_ETAG      = {"gzip": "-gz", "br": "-br"}   # ETag suffix per Content-Encoding
+
+
+@dataclass
+class _Entry:
+    path: str
+    stamp: tuple                  # (size, mtime_ns) the entry was built from
+    etag: str
+    content_type: str
+    body: bytes | None = None     # None: too big to cache, sendfile from `path`
+    gzip: bytes | None = None
+    br: bytes | None = None
+
+
+class _Cache:
+    def __init__(self, root: str):
+        self.root = root
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path: str) -> str | None:
+        """Absolute file path for a URL path, or None if it's missing or outside the root."""
+        rel = posixpath.normpath(unquote(url_path)).lstrip("/")
+        path = os.path.realpath(os.path.join(self.root, rel))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        return path if os.path.isfile(path) else None
+
+    def get(self, path: str) -> _Entry:
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        entry = self.entries.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry
+        entry = _Entry(path, stamp, f'"{st.st_size:x}-{st.st_mtime_ns:x}"', content_type(path))
+        compressible = entry.content_type.startswith(COMPRESSIBLE)
+        if st.st_size <= (COMPRESS_MAX_BYTES if compressible else CACHE_MAX_BYTES):
+            with open(path, "rb") as f:
+                entry.body = f.read()
+            if compressible and len(entry.body) >= COMPRESS_MIN:
+                entry.gzip = gzip.compress(entry.body, compresslevel=9, mtime=0)
+                if brotli is not None:
+                    entry.br = brotli.compress(entry.body)
+        with self._lock:
+            self.entries[path] = entry
+        return entry
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Accept-Encoding as {coding: q}, e.g. "gzip;q=0.5, br" -> {"gzip": 0.5, "br": 1.0}; q=0 means refused."""
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "ReportStatic/1.0"
+    cache: _Cache = None          # set per server, see StaticServer
+    verbose = False
+
+    def do_GET(self):
+        self._serve(body=True)
+
+    def do_HEAD(self):
+        self._serve(body=False)
+
+    def _serve(self, body: bool):
+        url_path = urlsplit(self.path).path
+        path = self.cache.resolve(url_path)
+        if path is None:
+            self.send_response(HTTPStatus.NOT_FOUND)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        entry = self.cache.get(path)
+        cache_control = ("public, max-age=31536000, immutable" if url_path.startswith(IMMUTABLE_DIR)
+                         else "no-cache")
+
+        payload, encoding = entry.body, None
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        options = [(accepted.get(name, accepted.get("*", 0.0)), name, data)
+                   for name, data in (("br", entry.br), ("gzip", entry.gzip)) if data is not None]
+        options = [option for option in options if option[0] > 0]
+        if options:
+            _, encoding, payload = max(options, key=lambda option: option[0])   # br wins ties
+        # each encoding is a different representation, so it gets its own strong ETag
+        etag = entry.etag[:-1] + ENCODING_ETAG[encoding] + '"' if encoding else entry.etag
+
+        if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", cache_control)
+            if entry.gzip is not None:
+                self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", entry.content_type)
+        self.send_header("Content-Length", str(len(payload) if payload is not None else entry.stamp[0]))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", cache_control)
+        if entry.gzip is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if not body:
+            return
+        if payload is not None:
+            self.wfile.write(payload)
+        else:
+            self.wfile.flush()
+            with open(entry.path, "rb") as f:
+                self.connection.sendfile(f)
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+
+class StaticServer:
+    def __init__(self, directory: str = DIST_DIR, host: str = HOST, port: int = PORT, verbose: bool = False):
+        self.directory = os.path.realpath(directory)
+        handler = type("Handler", (_Handler,), {"cache": _Cache(self.directory), "verbose": verbose})
+        # binds (and listens) here, so a busy port fails fast
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.ready = threading.Event()
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    @property
+    def url(self) -> str:
+        host = self.httpd.server_address[0]
+        return f"http://{'localhost' if host in ('0.0.0.0', '') else host}:{self.port}"
+
+    def _serve(self):
+        self.ready.set()
+        self.httpd.serve_forever()
+
+    def start(self, timeout: float = READY_TIMEOUT) -> "StaticServer":
+        """Serve in a daemon thread; returns once requests are being handled."""
+        self._thread = threading.Thread(target=self._serve, name="static-server", daemon=True)
+        self._thread.start()
+        if not self.ready.wait(timeout):
+            raise RuntimeError(f"static server on {self.url} did not start within {timeout}s")
+        return self
+
+    def serve_forever(self):
+        self.ready.set()
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Serve the built viewer")
+    ap.add_argument("directory", nargs="?", default=DIST_DIR)
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = ap.parse_args()
+
+    server = StaticServer(args.directory, args.host, args.port, args.verbose)
+    print(f"🚀 Serving {server.directory} at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+synth_report.py
+
+Deterministic synthetic participant reports for load and scaling tests.
+
+    python synth_report.py out.html [--seed 7] [--factors 10] [--rows 8] [--supplements 5] [--size 5MB]
+    python synth_report.py synth/ --count 100 --size 1MB      # synth/synth_0000.html ...
+
+The bundled Report_Participant_...html is the template: every repeating
+block the extractors read is cut out of it at its source offsets and
+regenerated from that block's own rows, so the markup around and inside
+the blocks stays exactly the template's:
+
+- #Participant / #Practice values     seeded names, dates, doctor and clinic
+- Green/Yellow/Red/Gray status tables `factors` bullets spread over the four colours
+- tabSummary cognitive tables         `factors` tables of `rows` entries each
+- prescriptions, lifestyle, MIND diet, discouraged foods, nutrient
+  deficiencies, consumption, current medications
+                                      `rows` rows each
+- supplements                         `supplements` rows
+
+Rows are sampled from the template's rows and the numbers in their text
+are perturbed, all from one random.Random(seed), so the same arguments
+always give the same bytes. With --size the row count is solved for so
+the document reaches (at least) that many bytes.
+
+    python synth_report.py synth/ --count 6 --rows 20 --check
+
+--check extracts every generated report with each installed parser,
+serially, in parallel (section_split.py), through the spec plan
+(extract_spec.py) and through Report(split=True), and exits 1 if any
+mode's JSON differs from the serial extraction with the same parser.
+Rows are copied with the template's own markup, which mixes <br> and
+<br />. html.parser nests the elements after a <br /> that follows a bare
+<br>, so with many rows html.parser and lxml can extract different text
+from the same report. Those differences are listed but don't fail the
+check.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+from dataclasses import dataclass
+
+from bs4 import BeautifulSoup
+
+from extract import DocumentIndex, Report, _status_table, extract_report, parse_html
+
+# —— CONFIG —————————————————————————————————————————————————————————————
+TEMPLATE_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "Report_Participant_1-00_JANEADOE_2024-11-02.html")
+FACTORS     = 10
+ROWS        = 8
+SUPPLEMENTS = 5
+
+FIRST_NAMES = ["Ada", "Ben", "Carla", "Dev", "Elena", "Farid", "Grace", "Hiro", "Ines", "Jonas", "Kemi", "Luis"]
+LAST_NAMES  = ["Adams", "Brook", "Castillo", "Dubois", "Eriksen", "Fujita", "Garcia", "Haddad", "Ivanova", "Jensen"]
+CLINICS     = ["Precision Medical Center", "Lakeside Family Practice", "Northgate Clinic", "Harbor Health Group"]
+
+_SIZE_RE  = re.compile(r"^\s*([0-9.]+)\s*([KMG]?)B?\s*$", re.I)
+_NUMBER   = re.compile(r"(?<![&#\w.])(\d+)(?:\.(\d+))?")
+_TEXT     = re.compile(r">([^<]+)<")
+_ROW_CLASS = re.compile(r'^<tr class="(?:odd|even)"')
+_BULLET_TD = re.compile(r"(<td\b[^>]*>)(.*?)(</td>)", re.S)
+
+def parse_size(value: str) -> int:
+    """'100KB', '5MB', '1.5G', '2048' -> bytes."""
+    m = _SIZE_RE.match(value)
+    if not m:
+        raise ValueError(f"not a size: {value!r}")
+    number, unit = float(m.group(1)), m.group(2).upper()
+    return int(number * {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[unit])
+
+# —— TEMPLATE ————————————————————————————————————————————————————————————
+@dataclass
+class Block:
+    start: int          # char offsets of the regenerated span in the template
+    end: int
+    units: list[str]    # template units (rows, tables, ...) found in the span
+    sep: str            # whitespace the template puts between units
+
+class Template:
+    """The bundled report, cut into fixed text and regenerable blocks."""
+
+    def __init__(self, path: str = TEMPLATE_HTML):
+        with open(path, "rb") as f:
+            self.text = f.read().decode("utf-8")
+        self._lines = [0] + [m.end() for m in re.finditer("\n", self.text)]
+        soup = BeautifulSoup(self.text, "html.parser")   # html.parser records source positions
+        self.idx = DocumentIndex(soup)
+        self.blocks = {}
+        self._find_blocks()
+        self._cut()
+
+    # —— offsets ——
+
+    def _start(self, tag) -> int:
+        return self._lines[tag.sourceline - 1] + tag.sourcepos
+
+    def _end(self, tag) -> int:
+        depth = 0
+        for m in re.finditer(rf"<(/?){tag.name}\b[^>]*>", self.text[self._start(tag):], re.I):
+            depth += -1 if m.group(1) else 1
+            if depth == 0:
+                return self._start(tag) + m.end()
+        raise ValueError(f"unclosed <{tag.name}> at line {tag.sourceline}")
+
+    def _raw(self, tag) -> str:
+        return self.text[self._start(tag):self._end(tag)]
+
+    def _add(self, name: str, tags: list):
+        if not tags:
+            raise ValueError(f"template has no units for block {name!r}")
+        start, end = self._start(tags[0]), self._end(tags[-1])
+        sep = self.text[self._end(tags[0]):self._start(tags[1])] if len(tags) > 1 else "\n"
+        self.blocks[name] = Block(start, end, [self._raw(t) for t in tags], sep)
+
+    def _add_rows(self, name: str, table, skip: int = 1):
+        # rows are direct children unless the template wraps them in a <tbody>
+        self._add(name, table.find_all("tr", recursive=False)[skip:] or table.find_all("tr")[skip:])
+
+    # —— the report's repeating blocks (located like the extractors do) ——
+
+    def _find_blocks(self):
+        idx = self.idx
+        for key, table_id in (("participant", "Participant"), ("practice", "Practice")):
+            values = idx.within(idx.by_id(table_id), "span")
+            self._add(f"{key}_0", [v for v in values if "value" in v.get("class", [])][:1])
+            self._add(f"{key}_1", [v for v in values if "value" in v.get("class", [])][1:2])
+
+        gyrg = _status_table(idx)
+        for colour, nested in zip(("green", "yellow", "red", "gray"), idx.with_class("table", "no_border", within=gyrg)):
+            self._add_rows(f"status_{colour}", nested, skip=0)
+
+        self._add_rows("prescriptions", idx.next(idx.by_id("ShdMrpMedsPrescriptions", "h3"), "table"))
+        self._add_rows("supplements", idx.next(idx.by_id("ShdMrpMedsSupplements", "h3"), "table"))
+        self._add_rows("lifestyle", idx.next(idx.by_id("ShdMrpLifestyle", "h2"), "table"))
+
+        recommended = idx.next(idx.by_id("ShdMrpMINDDiet", "h3"), "table")
+        discouraged = idx.next(idx.next(recommended, "p"), "table")
+        self._add_rows("recommended_diet", recommended)
+        self._add_rows("discouraged_diet", discouraged)
+
+        summary = idx.next(idx.next(discouraged, "h2"), "table")
+        inner = idx.within(summary, "table")
+        self._add("deficiencies", inner)
+        # a deficiency is a (nutrient, result) pair of tables
+        block = self.blocks["deficiencies"]
+        block.units = [block.units[i] + block.sep + block.units[i + 1] for i in range(0, len(block.units) - 1, 2)]
+
+        consumption = idx.first_within(idx.next(idx.next(summary, "p"), "table"), "table")
+        self._add_rows("consumption", consumption, skip=0)
+
+        self._add_rows("current_medications", idx.next(idx.by_id("ShdMrtMedsCurrent", "h3"), "table"))
+
+        factors = idx.with_class("table", "tabSummary", within=idx.by_id("OutOfRange", "div"))
+        self._add("cognitive", factors)
+        self.factor_heads, self.factor_rows = [], []
+        for table in factors:
+            rows = table.find_all("tr", recursive=False)
+            self.factor_heads.append(self._raw(rows[0]))
+            self.factor_rows.extend(self._raw(tr) for tr in rows[1:])
+        first = self.blocks["cognitive"].units[0]
+        self.factor_open = first[:first.index(">") + 1]
+        self.factor_sep = first[len(self.factor_open):first.index("<tr")]
+        self.factor_close = first[first.rindex("</tr>") + len("</tr>"):]
+
+        # status rows are rebuilt cell by cell from the first row's cells
+        first_row = BeautifulSoup(self.blocks["status_green"].units[0], "html.parser").tr
+        cells = [str(td) for td in first_row.find_all("td")]
+        self.status_spacer, self.status_cell = cells[0], cells[1]
+        self.status_open = self.blocks["status_green"].units[0].split(">", 1)[0] + ">"
+        self.status_names = []
+        for colour in ("green", "yellow", "red", "gray"):
+            for row in self.blocks[f"status_{colour}"].units:
+                for td in BeautifulSoup(row, "html.parser").find_all("td"):
+                    text = td.get_text(" ", strip=True)
+                    if text.startswith("•"):
+                        self.status_names.append(text.lstrip("• \xa0").strip())
+
+    def _cut(self):
+        """Fixed template text between the blocks, in document order."""
+        ordered = sorted(self.blocks.items(), key=lambda kv: kv[1].start)
+        for (a, ba), (b, bb) in zip(ordered, ordered[1:]):
+            if ba.end > bb.start:
+                raise ValueError(f"template blocks {a!r} and {b!r} overlap")
+        self.order = [name for name, _ in ordered]
+        self.fixed = []
+        pos = 0
+        for _, block in ordered:
+            self.fixed.append(self.text[pos:block.start])
+            pos = block.end
+        self.fixed.append(self.text[pos:])
+
+_template = None
+
+def load_template() -> Template:
+    global _template
+    if _template is None:
+        _template = Template()
+    return _template
+
+# —— GENERATION ——————————————————————————————————————————————————————————
+_slots = {}
+
+def _number_slots(unit: str) -> tuple[list[str], list[tuple[str, str | None]]]:
+    """A unit split around the numbers in its text (not its attributes); cached per template unit."""
+    if unit not in _slots:
+        literals, numbers, pos = [], [], 0
+        for text in _TEXT.finditer(unit):
+            for m in _NUMBER.finditer(unit, text.start(1), text.end(1)):
+                literals.append(unit[pos:m.start()])
+                numbers.append((m.group(1), m.group(2)))
+                pos = m.end()
+        literals.append(unit[pos:])
+        _slots[unit] = (literals, numbers)
+    return _slots[unit]
+
+def _perturb(unit: str, rng: random.Random) -> str:
+    """Jitter every number in the text of a sampled unit."""
+    literals, numbers = _number_slots(unit)
+    out = [literals[0]]
+    for (whole, frac), literal in zip(numbers, literals[1:]):
+        if frac is not None:
+            value = float(f"{whole}.{frac}") * rng.uniform(0.6, 1.4)
+            out.append(f"{value:.{len(frac)}f}")
+        elif len(whole) < 4:
+            out.append(str(round(int(whole) * rng.uniform(0.6, 1.4))))
+        else:
+            out.append(whole)   # keep years intact
+        out.append(literal)
+    return "".join(out)
+
+def _sample(units: list[str], n: int, rng: random.Random, stripe: bool = True) -> list[str]:
+    out = []
+    for i in range(n):
+        unit = _perturb(rng.choice(units), rng)
+        if stripe:
+            unit = _ROW_CLASS.sub(f'<tr class="{"odd" if i % 2 == 0 else "even"}"', unit)
+        out.append(unit)
+    return out
+
+def _status_rows(tpl: Template, names: list[str]) -> list[str]:
+    rows = []
+    for i in range(0, len(names), 3):
+        cells = [tpl.status_spacer]
+        for name in names[i:i + 3] + [None] * (3 - len(names[i:i + 3])):
+            content = f"&bull;&nbsp;{name}" if name is not None else "&nbsp;"
+            cells.append(_BULLET_TD.sub(lambda m: m.group(1) + content + m.group(3), tpl.status_cell, count=1))
+        rows.append(tpl.status_open + "\n" + "\n".join(cells) + "\n</tr>")
+    return rows
+
+def _units(tpl: Template, seed: int, factors: int, rows: int, supplements: int) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    doctor = f"{rng.choice(FIRST_NAMES)} {rng.choice('ABCDEFGHJKLMN')}. {rng.choice(LAST_NAMES)}, M.D."
+    created = f"{rng.randint(1, 12)}/{rng.randint(1, 28):02d}/{rng.randint(2020, 2025)}"
+    span = '<span class="value">{}</span>'
+    units = {
+        "participant_0": [span.format(f"{last}, {first} {rng.choice('ABCDEFGHJKLMN')}.")],
+        "participant_1": [span.format(created)],
+        "practice_0": [span.format(doctor)],
+        "practice_1": [span.format(rng.choice(CLINICS))],
+    }
+
+    # split the factor bullets over the four colours
+    cuts = sorted(rng.randint(0, factors) for _ in range(3))
+    counts = [b - a for a, b in zip([0] + cuts, cuts + [factors])]
+    for colour, n in zip(("green", "yellow", "red", "gray"), counts):
+        units[f"status_{colour}"] = _status_rows(tpl, [rng.choice(tpl.status_names) for _ in range(n)])
+
+    for name in ("prescriptions", "lifestyle", "recommended_diet", "discouraged_diet",
+                 "current_medications", "consumption"):
+        units[name] = _sample(tpl.blocks[name].units, rows, rng)
+    units["supplements"] = _sample(tpl.blocks["supplements"].units, supplements, rng)
+    units["deficiencies"] = _sample(tpl.blocks["deficiencies"].units, rows, rng, stripe=False)
+
+    sep = tpl.factor_sep
+    units["cognitive"] = [
+        tpl.factor_open + sep + rng.choice(tpl.factor_heads) + sep
+        + sep.join(_sample(tpl.factor_rows, rows, rng, stripe=False)) + tpl.factor_close
+        for _ in range(factors)
+    ]
+    return units
+
+def _assemble(tpl: Template, units: dict[str, list[str]]) -> str:
+    parts = [tpl.fixed[0]]
+    for name, fixed in zip(tpl.order, tpl.fixed[1:]):
+        parts.append(tpl.blocks[name].sep.join(units[name]))
+        parts.append(fixed)
+    return "".join(parts)
+
+def generate(seed: int = 0, factors: int = FACTORS, rows: int = ROWS, supplements: int = SUPPLEMENTS,
+             size: int | None = None) -> bytes:
+    """
+    One synthetic report as UTF-8 bytes. With `size`, `rows` is raised
+    (never lowered below 1) until the document is at least `size` bytes.
+    """
+    tpl = load_template()
+    if size:
+        # document size is linear in the row count: solve from two samples
+        lo = len(_assemble(tpl, _units(tpl, seed, factors, 1, supplements)).encode())
+        hi = len(_assemble(tpl, _units(tpl, seed, factors, 9, supplements)).encode())
+        per_row = max(1.0, (hi - lo) / 8)
+        rows = max(1, 1 + math.ceil((size - lo) / per_row))
+        raw = _assemble(tpl, _units(tpl, seed, factors, rows, supplements)).encode()
+        while len(raw) < size:
+            # sampling noise: top up in small steps
+            rows += max(1, math.ceil((size - len(raw)) / per_row))
+            raw = _assemble(tpl, _units(tpl, seed, factors, rows, supplements)).encode()
+        return raw
+    return _assemble(tpl, _units(tpl, seed, factors, rows, supplements)).encode()
+
+def write_reports(out: str, count: int = 1, seed: int = 0, **knobs) -> list[str]:
+    """Write `count` reports (seeds seed..seed+count-1) to a file or a directory."""
+    if count == 1 and out.lower().endswith((".html", ".htm")):
+        paths = [out]
+    else:
+        os.makedirs(out, exist_ok=True)
+        paths = [os.path.join(out, f"synth_{seed + i:04d}.html") for i in range(count)]
+    for i, path in enumerate(paths):
+        with open(path, "wb") as f:
+            f.write(generate(seed + i, **knobs))
+    return paths
+
+# —— PARITY CHECK ——————————————————————————————————————————————————————————
+def _modes(raw: bytes, parser: str) -> dict:
+    from extract_spec import PLAN
+    from section_split import extract_parallel
+    with Report(raw, parser, split=True) as report:
+        split = report.to_dict()
+    soup = parse_html(raw, parser)
+    try:
+        spec = PLAN.run(soup)
+    finally:
+        soup.decompose()
+    return {"parallel": extract_parallel(raw, parser), "spec": spec, "split": split}
+
+def check_parity(paths: list[str], parsers: tuple[str, ...] = ("html.parser", "lxml")) -> dict:
+    """
+    Extract every report in every mode with every installed parser.
+    Returns {"modes": [...], "parsers": [...]}: "path: parser mode" for
+    each mode that differs from serial extraction, and the paths on which
+    the parsers' serial extractions differ from each other.
+    """
+    mismatches, disagree = [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+        serial = {}
+        for parser in parsers:
+            try:
+                serial[parser] = extract_report(raw, parser)
+            except ValueError:      # parser not installed
+                continue
+            for mode, report in _modes(raw, parser).items():
+                if report != serial[parser]:
+                    mismatches.append(f"{path}: {parser} {mode}")
+        if len({json.dumps(r, sort_keys=True) for r in serial.values()}) > 1:
+            disagree.append(path)
+    return {"modes": mismatches, "parsers": disagree}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate synthetic participant reports from the bundled template")
+    ap.add_argument("output", help="output .html, or a directory for --count reports")
+    ap.add_argument("--count", type=int, default=1, help="number of reports (seeds seed, seed+1, ...)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--factors", type=int, default=FACTORS, help="status bullets and cognitive factor tables")
+    ap.add_argument("--rows", type=int, default=ROWS, help="rows per table")
+    ap.add_argument("--supplements", type=int, default=SUPPLEMENTS, help="supplement rows")
+    ap.add_argument("--size", type=parse_size, help="minimum document size, e.g. 100KB, 5MB (overrides --rows)")
+    ap.add_argument("--check", action="store_true", help="check that every extraction mode agrees with serial")
+    args = ap.parse_args()
+
+    paths = write_reports(args.output, args.count, args.seed, factors=args.factors, rows=args.rows,
+                          supplements=args.supplements, size=args.size)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"✅ {len(paths)} report(s), {total / 1024:.0f} KB -> {args.output}", file=sys.stderr)
+    if args.check:
+        result = check_parity(paths)
+        for path in result["parsers"]:
+            print(f"ℹ️  html.parser and lxml extract different text from {path}", file=sys.stderr)
+        for line in result["modes"]:
+            print(f"❌ differs from serial: {line}", file=sys.stderr)
+        if result["modes"]:
+            sys.exit(1)
+        print(f"✅ serial/parallel/spec/split extraction identical on {len(paths)} report(s)", file=sys.stderr)
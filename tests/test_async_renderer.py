@@ -0,0 +1,131 @@
+"""AsyncRenderer.render_all queueing, without a browser."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+from async_renderer import AsyncRenderer, RenderJob, RenderResult  # noqa: E402
+
+
+class FakeRenderer(AsyncRenderer):
+    def __init__(self, fail_on: str | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_on = fail_on
+
+    async def render(self, job):
+        await asyncio.sleep(0)
+        if job.output == self.fail_on:
+            raise RuntimeError("worker died")
+        return RenderResult(job, 0.0)
+
+
+def _jobs(n: int):
+    return (RenderJob("<html></html>", f"{i}.pdf") for i in range(n))
+
+
+def test_renders_every_job():
+    results = asyncio.run(FakeRenderer(concurrency=3).render_all(_jobs(20)))
+    assert sorted(r.job.output for r in results) == sorted(f"{i}.pdf" for i in range(20))
+
+
+def test_dead_worker_does_not_deadlock_the_producer():
+    renderer = FakeRenderer(fail_on="0.pdf", concurrency=1)
+    with pytest.raises(ExceptionGroup):
+        asyncio.run(asyncio.wait_for(renderer.render_all(_jobs(100)), timeout=10))
+
+
+# —— raw HTML sources ——
+from async_renderer import with_ready_script  # noqa: E402
+from generate_pdf import READY_SCRIPT  # noqa: E402
+
+INLINE = '<!doctype html><html lang="en"><head><script>app()</script></head><body><p>report</p></body></html>'
+
+
+def test_ready_script_goes_before_the_documents_scripts():
+    html = with_ready_script(INLINE)
+    assert html.startswith('<!doctype html><html lang="en"><head><script>')
+    assert html.index(READY_SCRIPT) < html.index("app()")
+    assert with_ready_script("<p>x</p>").startswith("<script>")
+    assert with_ready_script("<!DOCTYPE html><p>x</p>").startswith("<!DOCTYPE html><script>")
+
+
+class FakePage:
+    def __init__(self):
+        self.ready = None
+
+    async def emulate_media(self, **kwargs):
+        pass
+
+    async def add_init_script(self, script):
+        pass        # like Chromium: only applies to later navigations
+
+    async def set_content(self, html, **kwargs):
+        if READY_SCRIPT in html:
+            self.ready = "settled"
+
+    async def wait_for_function(self, expression, timeout):
+        page = self
+
+        class Handle:
+            async def json_value(self):
+                return page.ready
+        if self.ready is None:
+            from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+            raise PlaywrightTimeoutError("window.__reportReady never set")
+        return Handle()
+
+    async def wait_for_load_state(self, state):
+        self.ready = state
+
+    async def add_style_tag(self, **kwargs):
+        pass
+
+    async def pdf(self, **kwargs):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.page = FakePage()
+
+    async def new_context(self, **kwargs):
+        browser = self
+
+        class Context:
+            async def new_page(self):
+                return browser.page
+
+            async def close(self):
+                pass
+        return Context()
+
+
+def test_inline_source_signals_ready():
+    async def run():
+        renderer = AsyncRenderer(concurrency=1)
+        renderer._browser = FakeBrowser()
+        renderer._idle = asyncio.Condition()
+        result = await renderer.render(RenderJob(INLINE, "out.pdf"))
+        return result, renderer._browser.page.ready
+    result, ready = asyncio.run(run())
+    assert result.ok, result.error
+    assert ready == "settled"       # not the networkidle fallback
+
+
+def test_inline_source_signals_ready_in_chromium():
+    from playwright.async_api import Error as PlaywrightError, async_playwright
+
+    async def run():
+        async with async_playwright() as pw:
+            try:
+                browser = await pw.chromium.launch()
+            except PlaywrightError as e:
+                pytest.skip(f"Chromium can't start: {str(e).splitlines()[0]}")
+            page = await browser.new_page()
+            html = with_ready_script('<html><head></head><body><script>reportReady()</script></body></html>')
+            await page.set_content(html)
+            ready = await page.evaluate("() => window.__reportReady")
+            await browser.close()
+            return ready
+    assert asyncio.run(run()) == "app"
@@ -0,0 +1,75 @@
+"""Batch output naming and worker process handling."""
+
+import json
+import shutil
+
+from batch import output_names
+
+
+def test_unique_stems_are_kept():
+    assert output_names(["a/one.html", "b/two.htm"]) == ["one", "two"]
+
+
+def test_shared_stems_get_a_path_hash():
+    names = output_names(["a/report.html", "b/report.html", "c/other.html"])
+    assert names[2] == "other"
+    assert names[0] != names[1]
+    assert all(n.startswith("report-") for n in names[:2])
+    assert output_names(["b/report.html", "a/report.html"]) == names[1::-1]   # stable per path
+
+
+def test_case_insensitive_and_repeated_paths():
+    assert len({n.lower() for n in output_names(["a/Report.html", "b/report.html"])}) == 2
+    assert len(set(output_names(["a/r.html", "a/r.html"]))) == 2
+
+
+# —— worker processes ——
+
+KILL_ON_OPEN = '''
+import builtins, os
+_open = builtins.open
+def open(file, *args, **kwargs):
+    if isinstance(file, str) and "poison" in file:
+        os.kill(os.getpid(), 9)          # as the OOM killer would
+    return _open(file, *args, **kwargs)
+builtins.open = open
+'''
+
+
+def _inputs(directory, count: int) -> list[str]:
+    from synth_report import write_reports
+    return write_reports(str(directory), count=count, factors=2, rows=2, supplements=1)
+
+
+def test_job_limit_is_per_worker(tmp_path):
+    from batch import run_batch
+    inputs = _inputs(tmp_path / "in", 4)
+    summary = run_batch(inputs, str(tmp_path / "out"), workers=2, shard_size=4, render=False, max_jobs=1)
+    assert summary["succeeded"] == 4
+    pids = [json.loads(line)["pid"] for line in open(tmp_path / "out" / "memory.jsonl")]
+    assert len(pids) == 4 and len(set(pids)) == 4
+
+
+def test_no_job_limit_keeps_workers(tmp_path):
+    from batch import run_batch
+    inputs = _inputs(tmp_path / "in", 6)
+    summary = run_batch(inputs, str(tmp_path / "out"), workers=1, shard_size=2, render=False, max_jobs=0)
+    assert summary["succeeded"] == 6
+    pids = {json.loads(line)["pid"] for line in open(tmp_path / "out" / "memory.jsonl")}
+    assert len(pids) == 1
+
+
+def test_dead_worker_fails_only_its_report(tmp_path, monkeypatch):
+    from batch import MAX_ATTEMPTS, run_batch
+    (tmp_path / "hook").mkdir()
+    (tmp_path / "hook" / "sitecustomize.py").write_text(KILL_ON_OPEN)
+    monkeypatch.setenv("PYTHONPATH", str(tmp_path / "hook"))     # spawned workers only
+    inputs = _inputs(tmp_path / "in", 3)
+    poison = str(tmp_path / "in" / "poison.html")
+    shutil.copy(inputs[0], poison)
+
+    summary = run_batch(inputs + [poison], str(tmp_path / "out"), workers=2, shard_size=2, render=False)
+    assert summary["reports"] == 4 and summary["succeeded"] == 3
+    assert [f["input"] for f in summary["failures"]] == [poison]
+    assert f"died {MAX_ATTEMPTS} times" in summary["failures"][0]["error"]
+    assert len(summary["worker_crashes"]) >= MAX_ATTEMPTS
@@ -0,0 +1,81 @@
+"""BrowserPool slot recovery, with a fake Playwright driver instead of Chromium."""
+
+import pytest
+
+pytest.importorskip("playwright")
+import browser_pool  # noqa: E402
+from browser_pool import BrowserPool, PlaywrightError  # noqa: E402
+
+
+class FakeContext:
+    def new_page(self):
+        return "page"
+
+    def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, launches: list):
+        self.connected = True
+        self.fail_next = None       # error new_context() raises once
+        launches.append(self)
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **kwargs):
+        if not self.connected:
+            raise PlaywrightError("Target page, context or browser has been closed")
+        if self.fail_next:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        return FakeContext()
+
+    def close(self):
+        if not self.connected:
+            raise PlaywrightError("Browser has been closed")
+
+
+class FakeDriver:
+    def __init__(self, launches: list):
+        self.chromium = self
+        self.launches = launches
+
+    def start(self):
+        return self
+
+    def launch(self, **kwargs):
+        return FakeBrowser(self.launches)
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    launches = []
+    monkeypatch.setattr(browser_pool, "sync_playwright", lambda: FakeDriver(launches))
+    with BrowserPool(size=1, max_rss_mb=0) as pool:
+        yield pool, launches
+
+
+def test_disconnected_browser_is_replaced(pool):
+    pool, launches = pool
+    assert pool.run(lambda page: page) == "page"
+    launches[0].connected = False           # crashed between jobs
+    assert pool.run(lambda page: page) == "page"
+    assert len(launches) == 2 and pool.launches == 2
+
+def test_target_closed_on_new_context_relaunches(pool):
+    pool, launches = pool
+    launches[0].fail_next = PlaywrightError("Target closed")
+    assert pool.run(lambda page: page) == "page"
+    assert len(launches) == 2
+
+def test_other_new_context_errors_fail_the_job(pool):
+    pool, launches = pool
+    launches[0].fail_next = PlaywrightError("bad viewport")
+    with pytest.raises(PlaywrightError, match="bad viewport"):
+        pool.run(lambda page: page)
+    assert pool.run(lambda page: page) == "page" and len(launches) == 1
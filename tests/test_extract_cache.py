@@ -0,0 +1,80 @@
+"""ExtractionCache: keys, LRU eviction, atomic writes, and extract_text hits."""
+
+import os
+
+import pytest
+
+from extract import EXTRACTOR_VERSION, extract_text
+from extract_cache import ExtractionCache
+
+REPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "Report_Participant_1-00_JANEADOE_2024-11-02.html")
+
+
+def test_key_covers_version_parser_mode_and_bytes():
+    base = ExtractionCache.key(b"<html>", "1", "lxml")
+    assert base == ExtractionCache.key(b"<html>", "1", "lxml", "serial")
+    others = {
+        ExtractionCache.key(b"<html> ", "1", "lxml"),
+        ExtractionCache.key(b"<html>", "2", "lxml"),
+        ExtractionCache.key(b"<html>", "1", "html.parser"),
+        ExtractionCache.key(b"<html>", "1", "lxml", "parallel"),
+        ExtractionCache.key(b"<html>", "1", "lxml", "spec"),
+    }
+    assert base not in others and len(others) == 5
+
+def test_get_put(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    key = ExtractionCache.key(b"x", "1", "lxml")
+    assert cache.get(key) is None
+    cache.put(key, '{"a": "é"}')
+    assert cache.get(key) == '{"a": "é"}'
+    assert os.path.exists(tmp_path / key[:2] / f"{key}.json")
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "writes": 1, "evictions": 0}
+
+def test_rewriting_a_key_does_not_grow_the_estimate(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+    keys = [ExtractionCache.key(bytes([i]), "1", "lxml") for i in range(2)]
+    for key in keys:
+        cache.put(key, "x" * 100)
+    for _ in range(5):
+        cache.put(keys[0], "y" * 100)
+    assert cache._approx_bytes == 200 and cache.evictions == 0
+    assert cache.get(keys[1]) is not None
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=250)
+    keys = [ExtractionCache.key(bytes([i]), "1", "lxml") for i in range(3)]
+    for age, key in zip((300, 200, 100), keys):
+        cache.put(key, "x" * 100)
+        os.utime(cache._path(key), (0, os.path.getmtime(cache._path(key)) - age))
+    # over the limit after the third put: the oldest entry went
+    assert cache.get(keys[0]) is None and cache.evictions == 1
+    cache.get(keys[1])      # now the most recently used
+    cache.put(ExtractionCache.key(b"new", "1", "lxml"), "x" * 100)
+    assert cache.get(keys[1]) is not None
+    assert cache.get(keys[2]) is None
+
+def test_failed_write_leaves_nothing_behind(tmp_path, monkeypatch):
+    cache = ExtractionCache(str(tmp_path))
+    key = ExtractionCache.key(b"x", "1", "lxml")
+    cache.put(key, "old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        cache.put(key, "new")
+    monkeypatch.undo()
+    assert cache.get(key) == "old"
+    assert [name for name in os.listdir(tmp_path / key[:2])] == [f"{key}.json"]
+
+def test_extract_text_hit_skips_extraction(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    text = extract_text(REPORT, "lxml", cache=cache)
+    with open(REPORT, "rb") as f:
+        key = ExtractionCache.key(f.read(), EXTRACTOR_VERSION, "lxml")
+    cache.put(key, "cached")
+    assert extract_text(REPORT, "lxml", cache=cache) == "cached"
+    # a different mode is a different entry
+    assert extract_text(REPORT, "lxml", cache=cache, spec=True) == text
@@ -0,0 +1,19 @@
+"""Every extraction mode gives the same report.json as the serial extractor, per parser."""
+
+from section_split import splits
+from synth_report import check_parity, write_reports
+
+# enough action plan rows that html.parser's bare <br>s reach into
+# cognitiveFunction (see section_split.py)
+KNOBS = {"factors": 10, "rows": 20}
+
+
+def test_synth_corpus_parity(tmp_path):
+    paths = write_reports(str(tmp_path), count=2, seed=0, **KNOBS)
+    result = check_parity(paths)
+    assert result["modes"] == []
+
+
+def test_only_lxml_splits():
+    assert splits("lxml")
+    assert not splits("html.parser")
@@ -0,0 +1,49 @@
+"""Print image variants keep their format and a missing Pillow is reported once."""
+
+import io
+import random
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+import image_assets
+from dist_assets import Asset
+
+
+def _png(alpha: int = 255, size: int = 256) -> bytes:
+    rng = random.Random(0)
+    img = Image.new("RGBA", (size, size))
+    img.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256), alpha)] * (size * size // 2)
+                + [(rng.randrange(256), 0, 0, alpha) for _ in range(size * size // 2)])
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    return out.getvalue()
+
+
+def test_opaque_png_stays_png(tmp_path):
+    body = _png()
+    variants = image_assets.print_variants({"/card.png": Asset.from_bytes(body, "image/png")}, str(tmp_path))
+    variant = variants["/card.png"]
+    assert variant.content_type == "image/png"
+    assert variant.body.startswith(b"\x89PNG") and len(variant.body) < len(body)
+    with Image.open(io.BytesIO(variant.body)) as img:
+        assert img.mode == "P"
+    # second call is served from the cache
+    assert image_assets.print_variant(body, str(tmp_path)) == (variant.body, "image/png")
+
+def test_transparent_png_keeps_alpha():
+    body, ctype = image_assets.encode(_png(alpha=128))
+    assert ctype == "image/png"
+    with Image.open(io.BytesIO(body)) as img:
+        assert img.mode == "RGBA"
+
+def test_missing_pillow_warns_once(tmp_path, monkeypatch, capsys):
+    def no_pillow():
+        raise ValueError("print-optimized images need Pillow")
+    monkeypatch.setattr(image_assets, "_require_pillow", no_pillow)
+    monkeypatch.setattr(image_assets, "_warned", False)
+    files = {"/card.png": Asset.from_bytes(_png(), "image/png")}
+    assert image_assets.print_variants(files, str(tmp_path)) == {}
+    assert image_assets.print_variants(files, str(tmp_path)) == {}
+    assert capsys.readouterr().err.count("served as built") == 1
@@ -0,0 +1,25 @@
+"""incremental_render cache keys."""
+
+import pytest
+
+pytest.importorskip("playwright")
+from incremental_render import participant_key  # noqa: E402
+
+
+def _report(name, clinic="Brain Health Clinic"):
+    return {"preface": {"header": {"name": name, "clinic": clinic}}}
+
+
+def test_participant_key_has_no_name_in_it():
+    key = participant_key(_report("Doe, Jane A."))
+    assert len(key) == 32 and int(key, 16) >= 0
+    assert "doe" not in key and "jane" not in key
+
+def test_participant_key_normalizes_case_and_whitespace():
+    assert participant_key(_report("Doe, Jane A.")) == participant_key(_report("  doe,\n JANE  a. "))
+    assert participant_key(_report("Doe, Jane A.")) != participant_key(_report("Doe, Jane B."))
+    assert participant_key(_report("Doe, Jane A.")) != participant_key(_report("Doe, Jane A.", "Other Clinic"))
+
+def test_participant_key_needs_a_header():
+    with pytest.raises(ValueError):
+        participant_key({"preface": {"header": {}}})
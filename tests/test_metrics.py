@@ -0,0 +1,92 @@
+"""metrics: Prometheus text output, job records and the disabled fast path."""
+
+import json
+import os
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def on(monkeypatch, tmp_path):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "PROM_PATH", None)
+    monkeypatch.setattr(metrics, "JSONL_PATH", str(tmp_path / "jobs.jsonl"))
+    return tmp_path
+
+
+def test_histogram_is_cumulative(on):
+    metrics.observe("parse", 0.003)
+    metrics.observe("parse", 0.2)
+    metrics.observe("parse", 120)
+    lines = metrics.prometheus_text().splitlines()
+    assert lines[:2] == ["# HELP report_span_seconds Time spent in instrumented spans.",
+                         "# TYPE report_span_seconds histogram"]
+    assert 'report_span_seconds_bucket{span="parse",le="0.001"} 0' in lines
+    assert 'report_span_seconds_bucket{span="parse",le="0.005"} 1' in lines
+    assert 'report_span_seconds_bucket{span="parse",le="0.25"} 2' in lines
+    assert 'report_span_seconds_bucket{span="parse",le="60.0"} 2' in lines
+    assert 'report_span_seconds_bucket{span="parse",le="+Inf"} 3' in lines
+    assert 'report_span_seconds_sum{span="parse"} 120.203000' in lines
+    assert 'report_span_seconds_count{span="parse"} 3' in lines
+
+def test_counters_and_label_escaping(on):
+    metrics.count("cache_hits")
+    metrics.count("cache_hits", 2)
+    metrics.count("jobs", kind='say "hi"\\')
+    text = metrics.prometheus_text()
+    assert "# TYPE report_cache_hits_total counter\nreport_cache_hits_total 3\n" in text
+    assert 'report_jobs_total{kind="say \\"hi\\"\\\\"} 1\n' in text
+
+def test_job_record(on):
+    with metrics.job(kind="render", input="a.html") as job:
+        with metrics.span("render.pdf"):
+            pass
+        with metrics.job(kind="extract", output="out.pdf") as inner:     # joins the outer job
+            inner.set(pages=3)
+        metrics.count("sections_reused", 2)
+    with pytest.raises(ValueError), metrics.job(kind="render"):
+        raise ValueError("boom")
+
+    first, second = [json.loads(line) for line in (on / "jobs.jsonl").read_text().splitlines()]
+    assert first["kind"] == "render" and first["input"] == "a.html"
+    assert first["output"] == "out.pdf" and first["pages"] == 3 and job.fields["pages"] == 3
+    assert set(first["spans"]) == {"render.pdf"} and first["counters"] == {"sections_reused": 2}
+    assert second["error"] == "ValueError: boom"
+    snap = metrics.snapshot()
+    assert snap["counters"]["jobs{kind=render}"] == 2
+    assert snap["counters"]["failures{kind=render}"] == 1
+    assert snap["spans"]["job.render"]["count"] == 2
+
+def test_write_prometheus_per_pid(on):
+    metrics.count("jobs", kind="extract")
+    metrics.write_prometheus(str(on / "prom" / "report-{pid}.prom"))
+    path = on / "prom" / f"report-{os.getpid()}.prom"
+    assert path.read_text() == metrics.prometheus_text()
+    assert os.listdir(on / "prom") == [path.name]
+    assert path.stat().st_mode & 0o777 == 0o644         # readable by the collector's user
+
+def test_prometheus_temp_file_is_not_collected(on, monkeypatch):
+    seen = []
+
+    def replace(src, dst):
+        seen.append((src, os.stat(src).st_mode & 0o777))
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", replace)
+    with pytest.raises(OSError):
+        metrics.write_prometheus(str(on / "report.prom"))
+    (tmp, mode), = seen
+    assert not tmp.endswith(".prom") and mode == 0o644
+    assert not any(name.endswith((".prom", ".tmp")) for name in os.listdir(on))     # cleaned up
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", False)
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    assert metrics.span("parse") is metrics.job(kind="x") is metrics.current_job() is metrics._NOOP
+    metrics.observe("parse", 1.0)
+    metrics.count("jobs")
+    assert metrics.snapshot() == {"spans": {}, "counters": {}}
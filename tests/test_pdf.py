@@ -0,0 +1,83 @@
+"""pdf_merge page numbering and pdf_optimize deduplication (need pikepdf)."""
+
+import pytest
+
+pikepdf = pytest.importorskip("pikepdf")
+
+import pdf_optimize
+from pdf_merge import merge, unnumbered_footer
+from pdf_optimize import dedupe, optimize_pdf
+
+IMAGE = bytes(range(256)) * 12          # 32x32 RGB
+
+
+def _image(pdf):
+    return pdf.make_stream(IMAGE, Type=pikepdf.Name.XObject, Subtype=pikepdf.Name.Image,
+                           Width=32, Height=32, ColorSpace=pikepdf.Name.DeviceRGB, BitsPerComponent=8)
+
+def write_pdf(path, pages, image=False):
+    """`pages` A4 pages, each drawing its own copy of the same image if `image`."""
+    with pikepdf.new() as pdf:
+        for _ in range(pages):
+            pdf.add_blank_page(page_size=(595.28, 841.89))
+            page = pdf.pages[-1]
+            if image:
+                name = page.add_resource(_image(pdf), pikepdf.Name.XObject)
+                page.contents_add(pdf.make_stream(f"q 32 0 0 32 10 10 cm {name} Do Q".encode()))
+        pdf.save(path)
+
+def _text(page) -> bytes:
+    return b"".join(pikepdf.unparse_content_stream([op]) for op in pikepdf.parse_content_stream(page))
+
+def _images(pdf) -> set:
+    return {page.Resources.XObject[key].objgen for page in pdf.pages for key in page.Resources.XObject}
+
+
+def test_merge_numbers_pages_across_parts(tmp_path):
+    parts = [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    write_pdf(parts[0], 2)
+    write_pdf(parts[1], 1)
+    out = str(tmp_path / "out.pdf")
+    assert merge(parts, out) == [2, 1]
+    with pikepdf.open(out) as pdf:
+        texts = [_text(page) for page in pdf.pages]
+    assert [b"(%d / 3)" % n in text for n, text in enumerate(texts, 1)] == [True] * 3
+    assert not list(tmp_path.glob(".tmp-*"))
+
+def test_merge_without_numbers(tmp_path):
+    part = str(tmp_path / "a.pdf")
+    write_pdf(part, 1)
+    merge([part], str(tmp_path / "out.pdf"), number=False)
+    with pikepdf.open(tmp_path / "out.pdf") as pdf:
+        assert b"Tj" not in _text(pdf.pages[0])
+
+def test_merge_dedupes_images_across_parts(tmp_path):
+    parts = [str(tmp_path / "a.pdf"), str(tmp_path / "b.pdf")]
+    for path in parts:
+        write_pdf(path, 1, image=True)
+    merge(parts, str(tmp_path / "out.pdf"))
+    with pikepdf.open(tmp_path / "out.pdf") as pdf:
+        assert len(_images(pdf)) == 1
+
+def test_unnumbered_footer():
+    footer = '<div><span class="pageNumber"></span> / <span class="totalPages"></span></div>'
+    assert unnumbered_footer(footer) == "<div>&nbsp;</div>"
+    with pytest.raises(ValueError):
+        unnumbered_footer("<div></div>")
+
+
+def test_dedupe(tmp_path):
+    write_pdf(tmp_path / "in.pdf", 3, image=True)
+    with pikepdf.open(tmp_path / "in.pdf") as pdf:
+        assert len(_images(pdf)) == 3
+        assert dedupe(pdf) == 2
+        assert len(_images(pdf)) == 1
+
+def test_optimize_restores_flate_level(tmp_path, monkeypatch):
+    levels = []
+    monkeypatch.setattr(pikepdf.settings, "set_flate_compression_level", levels.append)
+    write_pdf(tmp_path / "in.pdf", 3, image=True)
+    stats = optimize_pdf(str(tmp_path / "in.pdf"), str(tmp_path / "out.pdf"))
+    assert levels == [pdf_optimize.FLATE_LEVEL, pdf_optimize.DEFAULT_FLATE]
+    assert stats["deduped"] == 2
+    assert (tmp_path / "out.pdf").stat().st_size == stats["after"] <= stats["before"]
@@ -0,0 +1,54 @@
+"""procinfo: finding a marked process tree and walking it without a /proc scan."""
+
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+
+import procinfo
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+
+# parent (carrying the marker) -> child -> grandchild, all sleeping
+TREE = ("import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', "
+        "'import subprocess, sys, time; subprocess.Popen([sys.executable, \"-c\", \"import time; time.sleep(60)\"]); time.sleep(60)']); "
+        "time.sleep(60)")
+
+
+@pytest.fixture
+def tree():
+    marker = f"--test-marker={uuid.uuid4().hex}"
+    proc = subprocess.Popen([sys.executable, "-c", TREE, marker])
+    try:
+        deadline = time.monotonic() + 10
+        while len(procinfo.descendants(proc.pid)) < 2:
+            assert time.monotonic() < deadline, "process tree did not start"
+            time.sleep(0.05)
+        yield proc.pid, marker
+    finally:
+        for pid in procinfo.descendants(proc.pid):
+            subprocess.run(["kill", "-9", str(pid)], check=False)
+        proc.kill()
+        proc.wait()
+
+
+def test_marked_roots(tree):
+    root, marker = tree
+    assert procinfo.marked_roots(marker) == [root]
+    assert procinfo.has_marker(root, marker)
+    assert not procinfo.has_marker(root, marker + "-other")
+
+@pytest.mark.parametrize("walk", [True, False])
+def test_tree_pids(tree, monkeypatch, walk):
+    root, marker = tree
+    if walk and not procinfo.HAS_CHILDREN:
+        pytest.skip("kernel has no /proc/<pid>/task/<tid>/children")
+    monkeypatch.setattr(procinfo, "HAS_CHILDREN", walk)
+    pids = procinfo.tree_pids(root)
+    assert pids[0] == root and sorted(pids[1:]) == sorted(procinfo.descendants(root))
+    assert len(pids) == 3
+    # no exact RSS comparison: the children may still be starting up
+    assert all(procinfo.process_rss(pid) > 0 for pid in pids) and procinfo.marked_tree_rss(marker) > 0
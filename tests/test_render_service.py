@@ -0,0 +1,84 @@
+"""JobStore queue state transitions."""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+from render_service import JobStore  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path))
+
+
+def test_submit_claim_finish(store):
+    job = store.submit("json", b"{}")
+    assert job["status"] == "queued" and job["attempts"] == 0
+    assert os.path.exists(store.paths(job["id"])["json"])
+
+    row = store.claim(timeout=0)
+    assert row["id"] == job["id"]
+    assert store.get(job["id"])["status"] == "running"
+    assert store.get(job["id"])["attempts"] == 1
+    assert store.claim(timeout=0) is None
+
+    store.finish(job["id"], render_s=0.5)
+    done = store.get(job["id"])
+    assert done["status"] == "done" and done["render_s"] == 0.5
+    assert store.depth() == {"queued": 0, "running": 0, "done": 1, "failed": 0}
+
+
+def test_error_fails_the_job(store):
+    job = store.submit("html", b"<html></html>")
+    store.claim(timeout=0)
+    store.finish(job["id"], "ValueError: bad")
+    assert store.get(job["id"])["status"] == "failed"
+    assert store.get(job["id"])["error"] == "ValueError: bad"
+
+
+def test_claims_oldest_first(store):
+    first = store.submit("json", b"{}")
+    store.submit("json", b"{}")
+    assert store.claim(timeout=0)["id"] == first["id"]
+
+
+def test_interrupted_job_requeued_until_max_attempts(tmp_path):
+    store = JobStore(str(tmp_path))
+    job_id = store.submit("json", b"{}", max_attempts=2)["id"]
+    store.claim(timeout=0)                    # service dies while the job runs
+
+    store = JobStore(str(tmp_path))           # restart: queued again
+    assert store.get(job_id)["status"] == "queued"
+    store.claim(timeout=0)                    # ...and dies again
+
+    store = JobStore(str(tmp_path))           # attempts used up: failed, not requeued
+    job = store.get(job_id)
+    assert job["status"] == "failed" and job["attempts"] == 2
+    assert "interrupted" in job["error"]
+    assert store.claim(timeout=0) is None
+
+
+def test_purge_deletes_old_finished_jobs(store):
+    old = store.submit("json", b"{}")["id"]
+    store.claim(timeout=0)
+    store.finish(old)
+    queued = store.submit("json", b"{}")["id"]
+    assert store.purge(time.time() + 1) == 1
+    assert store.get(old) is None and not os.path.exists(store.job_dir(old))
+    assert store.get(queued)["status"] == "queued"
+
+
+def test_old_database_gets_max_attempts(tmp_path):
+    db = sqlite3.connect(os.path.join(tmp_path, "jobs.db"))
+    db.execute("CREATE TABLE jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+               "created REAL NOT NULL, started REAL, finished REAL, extract_s REAL, render_s REAL, "
+               "attempts INTEGER NOT NULL DEFAULT 0, error TEXT)")
+    db.execute("INSERT INTO jobs (id, kind, status, created, attempts) VALUES ('a', 'json', 'running', 0, 5)")
+    db.commit()
+    db.close()
+    store = JobStore(str(tmp_path))
+    assert store.get("a")["status"] == "failed"
@@ -0,0 +1,84 @@
+"""A viewer build has to fetch /report.json, and the page has to show the report it was served."""
+
+import os
+
+import pytest
+
+from dist_assets import DistAssets, ReportMismatch
+
+DIST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dist")
+
+
+def _build(tmp_path, entry: bytes) -> str:
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "main.js").write_bytes(entry)
+    (tmp_path / "index.html").write_bytes(
+        b'<html><head><script type="module" src="./assets/main.js"></script></head><body></body></html>')
+    return str(tmp_path)
+
+
+def test_shipped_build_is_refused():
+    assets = DistAssets(DIST, print_images=False)
+    assert not assets.reads_report
+    with pytest.raises(ReportMismatch):
+        assets.require_report()
+
+
+def test_build_that_fetches_report(tmp_path):
+    assets = DistAssets(_build(tmp_path, b'fetch("/report.json").then(r=>r.json())'), print_images=False)
+    assert assets.reads_report
+    assets.require_report()
+
+
+def test_report_fetched_from_imported_module(tmp_path):
+    path = _build(tmp_path, b'import "./chunk.js";')
+    (tmp_path / "assets" / "chunk.js").write_bytes(b'fetch("report.json")')
+    assert DistAssets(path, print_images=False).reads_report
+
+
+def test_unloaded_script_does_not_count(tmp_path):
+    path = _build(tmp_path, b'const report = {"name": "Doe"};')
+    (tmp_path / "assets" / "stale.js").write_bytes(b'fetch("/report.json")')
+    assert not DistAssets(path, print_images=False).reads_report
+
+
+def test_check_report():
+    pytest.importorskip("playwright")
+    from generate_pdf import check_report, report_name
+    report = {"preface": {"header": {"name": "Doe,\n   Jane A."}}}
+    assert report_name(report) == "Doe, Jane A."
+    assert report_name({"actionPlan": {}}) is None
+    check_report({"fetches": 1, "shown": True}, "Doe, Jane A.")
+    with pytest.raises(ReportMismatch):
+        check_report({"fetches": 0, "shown": True}, "Doe, Jane A.")
+    with pytest.raises(ReportMismatch):
+        check_report({"fetches": 1, "shown": False}, "Doe, Jane A.")
+    with pytest.raises(ReportMismatch):
+        check_report({"fetches": 2, "shown": True}, None, fetches=2)
+
+
+def test_bundled_render_needs_a_participant_name(tmp_path):
+    pytest.importorskip("playwright")
+    from generate_pdf import render_bundled
+    with pytest.raises(ReportMismatch):
+        render_bundled(None, {"actionPlan": {}}, str(tmp_path / "out.pdf"), "")
+
+
+def test_bundled_check_skips_the_fetch_count():
+    pytest.importorskip("playwright")
+    from generate_pdf import check_report
+    check_report({"fetches": 0, "shown": True}, "Doe, Jane A.", fetches=-1)
+    with pytest.raises(ReportMismatch):
+        check_report({"fetches": 0, "shown": False}, "Doe, Jane A.", fetches=-1)
+
+
+def test_daemon_refuses_a_build_without_report_json(monkeypatch, tmp_path):
+    pytest.importorskip("playwright")
+    import generate_pdf
+    import report_daemon
+    pools = []
+    monkeypatch.setattr(generate_pdf, "get_assets", lambda: DistAssets(DIST, print_images=False))
+    monkeypatch.setattr(generate_pdf, "get_pool", lambda: pools.append(1))
+    with pytest.raises(SystemExit, match="report.json"):
+        report_daemon.serve(str(tmp_path / "daemon.sock"))
+    assert pools == [] and not (tmp_path / "daemon.sock").exists()
@@ -0,0 +1,84 @@
+"""static_server: per-encoding ETags, 304s, Vary and path traversal."""
+
+import gzip
+import http.client
+
+import pytest
+
+import static_server
+from static_server import StaticServer, accepted_encodings
+
+SCRIPT = b"console.log('report');\n" * 200
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "dist"
+    (root / "assets").mkdir(parents=True)
+    (root / "index.html").write_text("<!doctype html><title>report</title>")
+    (root / "assets" / "index-abc123.js").write_bytes(SCRIPT)
+    (tmp_path / "secret.txt").write_text("outside the root")
+    with StaticServer(str(root), host="127.0.0.1", port=0) as server:
+        yield server
+
+def get(server, path, **headers):
+    conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        return response, response.read()
+    finally:
+        conn.close()
+
+
+def test_etag_per_encoding(server):
+    plain, body = get(server, "/assets/index-abc123.js")
+    gz, gz_body = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": "gzip"})
+    assert body == SCRIPT and gzip.decompress(gz_body) == SCRIPT
+    assert gz.getheader("Content-Encoding") == "gzip"
+    assert gz.getheader("ETag") == plain.getheader("ETag")[:-1] + '-gz"'
+    assert plain.getheader("Vary") == gz.getheader("Vary") == "Accept-Encoding"
+    assert "immutable" in plain.getheader("Cache-Control")
+
+def test_not_modified_only_for_the_same_encoding(server):
+    first, _ = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": "gzip"})
+    etag = first.getheader("ETag")
+    again, body = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status == 304 and body == b""
+    assert again.getheader("ETag") == etag and again.getheader("Vary") == "Accept-Encoding"
+    # the identity representation doesn't match the gzip ETag
+    plain, body = get(server, "/assets/index-abc123.js", **{"If-None-Match": etag})
+    assert plain.status == 200 and body == SCRIPT
+
+def test_index_and_revalidation(server):
+    response, body = get(server, "/")
+    assert response.status == 200 and b"<title>report</title>" in body
+    assert response.getheader("Cache-Control") == "no-cache"
+    assert response.getheader("Vary") is None          # too small to compress
+
+@pytest.mark.parametrize("path", ["/../secret.txt", "/%2e%2e/secret.txt", "/assets/../../secret.txt", "/missing.js"])
+def test_outside_root_is_404(server, path):
+    response, body = get(server, path)
+    assert response.status == 404 and b"outside" not in body
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip": 1.0, "deflate": 1.0, "br": 1.0}
+    assert accepted_encodings("GZIP;q=0.5, br;q=0") == {"gzip": 0.5, "br": 0.0}
+    assert accepted_encodings("gzip;q=junk, *;q=0.1") == {"gzip": 0.0, "*": 0.1}
+    assert accepted_encodings("") == {}
+
+@pytest.mark.parametrize("accept", ["gzip;q=0", "identity", "x-gzipped", "*;q=0", "br;q=0, gzip;q=0"])
+def test_refused_or_unknown_encodings_get_identity(server, accept):
+    response, body = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": accept})
+    assert response.getheader("Content-Encoding") is None and body == SCRIPT
+    assert response.getheader("Vary") == "Accept-Encoding"
+
+@pytest.mark.parametrize("accept", ["br;q=0, *", "deflate, gzip;q=0.2", "br;q=0.1, gzip;q=0.2"])
+def test_q_values_pick_gzip(server, accept):
+    response, body = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": accept})
+    assert response.getheader("Content-Encoding") == "gzip" and gzip.decompress(body) == SCRIPT
+
+def test_wildcard_prefers_br(server):
+    response, _ = get(server, "/assets/index-abc123.js", **{"Accept-Encoding": "*"})
+    assert response.getheader("Content-Encoding") == ("br" if static_server.brotli else "gzip")